@@ -1,5 +1,7 @@
 import gpib
 import serial as ser
+from .utils import latency
+from .utils import trace
 
 class AgilentLightWaveConnection():
     def __init__(self, serial_port=None, gpib_num=None, gpib_dev_num=None):
@@ -11,6 +13,7 @@ class AgilentLightWaveConnection():
             self._dev = ser.Serial('/dev/'+serial_port, 38400)
             self._gpib_used = False
 
+    @trace.traced('lightwave', lambda a: '%s %s' % (type(a[0]).__name__, latency.scpi_header(a[1])))
     def _write(self, cmd):
         if self._gpib_used:
             gpib.write(self._dev, cmd)
@@ -31,11 +34,15 @@ class AgilentLightWaveConnection():
             data = self._dev.read(num_bytes)
         return data
 
+    @trace.traced('lightwave', lambda a: '%s %s' % (type(a[0]).__name__, latency.scpi_header(a[1])))
+    @latency.instrument('agilent_lightwave.query',
+                        lambda args, kwargs, result: latency.scpi_header(args[1]))
     def _query(self, cmd, num_bytes=100):
         self._write(cmd)
         data = self._read(num_bytes)
         return data
 
+    @trace.traced('lightwave', lambda a: '%s %s' % (type(a[0]).__name__, latency.scpi_header(a[1])))
     def _query_raw(self, cmd, num_bytes=100):
         self._write(cmd)
         data = self._read_raw(num_bytes)
@@ -0,0 +1,357 @@
+'''
+Asyncio facades over the stage, power meter and laser drivers.
+
+The drivers are synchronous, so each facade runs the driver\'s
+calls on the single worker thread of the driver\'s transport
+(see `stage.Axis.submit`) and awaits the result.  Calls to
+instruments on different transports overlap, while calls on one
+transport still run in order, so a single event loop can drive
+every instrument of a station:
+
+    async def align(stages, power_meter):
+        inp = AsyncStage(stages.input)
+        out = AsyncStage(stages.output)
+        await asyncio.gather(inp.move_abs_um(250., 250., 240.),
+                             out.move_abs_um(250., 250., 240.))
+        return await AsyncPowerMeter(power_meter).get_power_W()
+'''
+import asyncio
+import functools
+import numpy as np
+from .stages import stage as st
+from .stages import trajectory
+
+class _AsyncInstrument(object):
+    def __init__(self, instrument, transport=None):
+        self.instrument = instrument
+        self._transport = transport if transport is not None else instrument
+
+    async def run(self, func, *args, **kwargs):
+        '''
+        Runs a blocking call on the instrument\'s transport thread.
+
+        Args:
+            func (function): The call, normally a method of the
+                instrument.
+
+        Returns:
+            The result of `func(*args, **kwargs)`.
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(st._get_executor(self._transport),
+                                          functools.partial(func, *args, **kwargs))
+
+class AsyncAxis(_AsyncInstrument):
+    '''
+    Asyncio facade over an `Axis`.  Positions are in [um] for
+    linear axes and [degree] for rotational axes.
+
+    Args:
+        axis (Axis): The axis.
+    '''
+    def __init__(self, axis):
+        super().__init__(axis, axis._get_transport())
+        self.axis = axis
+        self.linear = issubclass(type(axis), st.AxisLinear)
+
+    async def move_abs(self, position):
+        '''
+        Moves to an absolute position.
+
+        Returns:
+            float: The position after the move.
+        '''
+        if self.linear:
+            return await self.run(self.axis.move_abs_um, position)
+        return await self.run(self.axis.move_abs_degree, position)
+
+    async def move_rel(self, distance):
+        '''
+        Moves a relative distance.
+
+        Returns:
+            float: The position after the move.
+        '''
+        if self.linear:
+            return await self.run(self.axis.move_rel_um, distance)
+        return await self.run(self.axis.move_rel_degree, distance)
+
+    async def get_position(self, cached=False):
+        '''
+        Args:
+            cached (bool): If `True`, the position cache of the
+                axis is used unless stale.
+
+        Returns:
+            float: The current position.
+        '''
+        if self.linear:
+            return await self.run(self.axis.get_current_position_um, cached)
+        return await self.run(self.axis.get_current_position_degree, cached)
+
+    async def sweep(self, positions, power_meter):
+        '''
+        Moves to each position in turn and reads the power there.
+
+        Args:
+            positions (list(float)): The absolute positions.
+            power_meter (AsyncPowerMeter): The power meter to read.
+
+        Returns:
+            np.array: The power in [W] at each position.
+        '''
+        powers = []
+        for position in positions:
+            await self.move_abs(position)
+            powers.append(await power_meter.get_power_W())
+        return np.array(powers)
+
+class AsyncStage(object):
+    '''
+    Asyncio facade over a `Stage`.
+
+    Args:
+        stage (Stage): The stage.
+
+    Attributes:
+        axes (dict): An `AsyncAxis` for each physical axis of the
+            stage, also available as attributes, eg `x`.
+    '''
+    def __init__(self, stage):
+        self.stage = stage
+        self.axes = {}
+        for name, axis in stage.axes_physical.items():
+            if axis:
+                self.axes[name] = AsyncAxis(axis)
+                setattr(self, name, self.axes[name])
+
+    async def move_abs_um(self, pos_x, pos_y, pos_z):
+        '''
+        Moves x, y and z concurrently to absolute positions in
+        [um].  Axes whose position is `None` are not moved.
+
+        Returns:
+            list(float): The (x, y, z) positions after the move,
+                `None` for the axes not moved.
+        '''
+        positions = (pos_x, pos_y, pos_z)
+        moves = [axis.move_abs(position) for axis, position in zip((self.x, self.y, self.z), positions)
+                 if position is not None]
+        results = iter(await asyncio.gather(*moves))
+        return [None if position is None else next(results) for position in positions]
+
+    async def get_current_position_um(self, cached=False):
+        '''
+        Args:
+            cached (bool): If `True`, the position caches of the
+                axes are used unless stale.
+
+        Returns:
+            list(float): The (x, y, z) positions in [um].
+        '''
+        return await asyncio.gather(self.x.get_position(cached), self.y.get_position(cached),
+                                    self.z.get_position(cached))
+
+    async def move_many(self, groups, relative=False):
+        '''
+        Asyncio version of `Stage.move_many`.
+        '''
+        groups_axes = [{self.stage.axes[name]: position for name, position in group.items()}
+                       for group in groups]
+        results = await move_many(groups_axes, relative)
+        return [{name: r[self.stage.axes[name]] for name in group}
+                for group, r in zip(groups, results)]
+
+class AsyncStages3(object):
+    '''
+    Asyncio facade over `Stages3`.
+
+    Args:
+        stages (Stages3): The stages.
+
+    Attributes:
+        input (AsyncStage): The input stage.
+        output (AsyncStage): The output stage.
+        chip (AsyncStage): The chip stage.
+    '''
+    def __init__(self, stages):
+        self.stages = stages
+        self.input = AsyncStage(stages.input)
+        self.output = AsyncStage(stages.output)
+        self.chip = AsyncStage(stages.chip)
+
+    async def move_many(self, groups, relative=False):
+        '''
+        Asyncio version of `Stages.move_many`.
+        '''
+        return await move_many(groups, relative)
+
+    async def push_pos_xyz_stack(self):
+        '''
+        Asyncio version of `Stages3.push_pos_xyz_stack`.
+        '''
+        xyz = {}
+        xyz['in'], xyz['out'], xyz['chip'] = await asyncio.gather(
+            self.input.get_current_position_um(cached=True),
+            self.output.get_current_position_um(cached=True),
+            self.chip.get_current_position_um(cached=True))
+        stack = self.stages.pos_xyz_um_stack
+        stack.append(xyz)
+        return stack
+
+    async def pop_pos_xyz_stack(self, retract_fibres=True):
+        '''
+        Asyncio version of `Stages3.pop_pos_xyz_stack`.  The moves
+        run on the axes\' transports, like those of `AsyncAxis`.
+        '''
+        stack = self.stages.pos_xyz_um_stack
+        xyz = stack.pop()
+        x_in, y_in, z_in = xyz['in']
+        x_out, y_out, z_out = xyz['out']
+        x_chip, y_chip, z_chip = xyz['chip']
+        inp, out, chip = self.stages.input, self.stages.output, self.stages.chip
+
+        # Pull fibres away from chip.
+        if retract_fibres:
+            await move_many([{inp.z: -50, out.z: -50}], relative=True)
+
+        # Move everything into place, then move input and output
+        # fibres to their correct position.
+        await move_many([{inp.x: x_in, inp.y: y_in, out.x: x_out, out.y: y_out,
+                          chip.x: x_chip, chip.y: y_chip, chip.z: z_chip},
+                         {inp.z: z_in, out.z: z_out}])
+        return stack
+
+class AsyncPowerMeter(_AsyncInstrument):
+    '''
+    Asyncio facade over a `PowerMeter`.
+
+    Args:
+        power_meter (PowerMeter): The power meter.
+        transport (object, None): The transport the power meter is
+            read over.  Pass the same object for instruments that
+            share a connection, such as the modules of a lightwave
+            mainframe.  If `None`, the power meter is assumed to
+            have a connection of its own.
+    '''
+    def __init__(self, power_meter, transport=None):
+        super().__init__(power_meter, transport)
+        self.power_meter = power_meter
+
+    async def get_power_W(self, average=1, read_period_ms=250.):
+        if average > 1:
+            # Wait between readings without holding the transport.
+            powers = []
+            for _ in range(average):
+                powers.append(await self.run(self.power_meter.get_power_W))
+                await asyncio.sleep(read_period_ms / 1000.)
+            return sum(powers) / float(len(powers))
+        return await self.run(self.power_meter.get_power_W)
+
+    async def get_power_uW(self, average=1, read_period_ms=250.):
+        return await self.get_power_W(average, read_period_ms) * 1.e6
+
+    async def get_power_dbm(self, average=1, read_period_ms=250.):
+        return self.power_meter.watts_to_dbm(await self.get_power_W(average, read_period_ms))
+
+    async def get_wavelength_m(self):
+        return await self.run(self.power_meter.get_wavelength_m)
+
+    async def set_wavelength_m(self, wavelength_m):
+        return await self.run(self.power_meter.set_wavelength_m, wavelength_m)
+
+class AsyncLaserTunable(_AsyncInstrument):
+    '''
+    Asyncio facade over a `LaserTunable`.
+
+    Args:
+        laser (LaserTunable): The laser.
+        transport (object, None): The transport the laser is
+            controlled over.  See `AsyncPowerMeter`.
+    '''
+    def __init__(self, laser, transport=None):
+        super().__init__(laser, transport)
+        self.laser = laser
+
+    async def turn_on(self):
+        return await self.run(self.laser.turn_on)
+
+    async def turn_off(self):
+        return await self.run(self.laser.turn_off)
+
+    async def set_power_W(self, power_W):
+        return await self.run(self.laser.set_power_W, power_W)
+
+    async def get_power_W(self):
+        return await self.run(self.laser.get_power_W)
+
+    async def set_wavelength_nm(self, wavelength_nm):
+        return await self.run(self.laser.set_wavelength_nm, wavelength_nm)
+
+    async def get_wavelength_nm(self):
+        return await self.run(self.laser.get_wavelength_nm)
+
+    async def sweep(self, wavelengths_nm, power_meters, delay_wavelength_changes_s=1.):
+        '''
+        Steps the laser through wavelengths, reading every power
+        meter concurrently at each.
+
+        Asyncio version of `LaserTunable.get_wavelength_power_scan_manual`
+        taking the wavelengths explicitly.
+
+        Args:
+            wavelengths_nm (list(float)): The wavelengths in [nm].
+            power_meters (list(AsyncPowerMeter)): The power meters
+                to read.
+            delay_wavelength_changes_s (float): The time in [s] to
+                wait after each wavelength change.
+
+        Returns:
+            list: The wavelengths, followed by the readings in [W]
+                of each power meter.
+        '''
+        powers = []
+        for w in wavelengths_nm:
+            await self.set_wavelength_nm(w)
+            await asyncio.sleep(delay_wavelength_changes_s)
+            powers.append(await asyncio.gather(*[pm.get_power_W() for pm in power_meters]))
+        r = [np.array(wavelengths_nm)]
+        r.extend([np.array(p) for p in zip(*powers)])
+        return r
+
+async def move_many(groups, relative=False):
+    '''
+    Asyncio version of `stage.move_many`.
+
+    Args:
+        groups (list(dict)): Groups of moves, each mapping an
+            `Axis` to its position.  The groups are moved one after
+            another and the axes within a group concurrently.
+        relative (bool): If `True`, the moves are relative.
+
+    Every move is checked against the limits of its axis before
+    the first group is moved, as by `stage.move_many`.
+
+    Returns:
+        list(dict): For each group, the position of each axis after
+            its move.
+    '''
+    trajectory.validate_moves(groups, relative)
+    results = []
+    for group in groups:
+        axes = [axis for axis in group if axis]
+        moves = []
+        for axis in axes:
+            a = AsyncAxis(axis)
+            if relative:
+                moves.append(a.move_rel(group[axis]))
+            else:
+                moves.append(a.move_abs(group[axis]))
+        # Let every move of the group finish before raising any
+        # error, so no axis is left moving.
+        r = await asyncio.gather(*moves, return_exceptions=True)
+        for v in r:
+            if isinstance(v, BaseException):
+                raise v
+        results.append(dict(zip(axes, r)))
+    return results
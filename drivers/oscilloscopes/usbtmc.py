@@ -30,6 +30,7 @@ import time
 import os
 import re
 import sys
+from ..utils import latency
 
 # constants
 USBTMC_bInterfaceClass    = 0xFE
@@ -614,6 +615,9 @@ class Instrument(object):
         if not self.connected:
             self.open()
 
+        # read_raw() latency is filed under the command it answers
+        self._last_command = data
+
         eom = False
 
         num = len(data)
@@ -640,6 +644,8 @@ class Instrument(object):
                 self._abort_bulk_out()
             raise
 
+    @latency.instrument('usbtmc.read_raw',
+                        lambda args, kwargs, result: latency.scpi_header(getattr(args[0], '_last_command', b'')))
     def read_raw(self, num=-1):
         "Read binary data from instrument"
 
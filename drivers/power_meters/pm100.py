@@ -1,5 +1,6 @@
 from . import power_meter as pm
 from ..usb_usbtmc_info import usbtmc_from_serial
+from ..utils import latency
 import os
 
 class _Usbtmc(object):
@@ -40,6 +41,8 @@ class _Usbtmc(object):
         resp = os.read(self._dev, number_of_characters)
         return resp
 
+    @latency.instrument('pm100.ask',
+                        lambda args, kwargs, result: latency.scpi_header(args[1]))
     def ask(self, command, number_of_characters=16):
         '''
         Write to, and then read from the USBTMC device.
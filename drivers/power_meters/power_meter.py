@@ -1,6 +1,7 @@
 import abc
 import time
 import math
+from ..utils import trace
 
 class PowerMeter(object, metaclass=abc.ABCMeta):
     '''
@@ -84,6 +85,7 @@ class PowerMeter(object, metaclass=abc.ABCMeta):
     def set_wavelength_nm(self, wavelength_nm):
         return self.set_wavelength_m(wavelength_nm * 1.e-9)
 
+    @trace.traced('power_meter', lambda a: type(a[0]).__name__ + '.get_power_W')
     def get_power_W(self, average=1, read_period_ms=250.):
         '''
         Read the power meter.
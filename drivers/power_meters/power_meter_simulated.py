@@ -0,0 +1,84 @@
+import random
+import numpy as np
+from . import power_meter as pm
+
+class SimulatedPowerMeter(pm.PowerMeter):
+    '''
+    A simulated power meter reading the coupling of Gaussian
+    modes, to test and benchmark alignment routines without
+    hardware.
+
+    The power is `max_power_W * exp(-2 * sum(((p - c) / w)^2))`
+    over the axes, where `p` is the true position of each axis,
+    `c` its aligned position and `w` the mode radius along it.
+    Moving any axis away from its aligned position reduces the
+    power, so the input and output stages can be simulated
+    together.
+
+    Args:
+        axes (list(Axis)): Simulated axes (see `stage_simulated`),
+            whose true positions are read.
+        centres (list(float)): The aligned position of each axis in
+            [um] or [degree].
+        waists (float, list(float)): The mode radius along each
+            axis in [um] or [degree].
+        max_power_W (float): The power in [W] when aligned.
+        noise_W (float): The standard deviation in [W] of additive
+            noise on each reading.
+        transport (SimulatedTransport, None): The transport the
+            power meter is read over.  If `None`, readings are
+            instantaneous and not counted.
+        read_s (float): The time in [s] a reading takes, on top of
+            the transport latency.  The power is taken at the end
+            of it, so the axes may move on during the reply.
+    '''
+    def __init__(self, axes, centres, waists=3., max_power_W=1.e-3, noise_W=0.,
+                 transport=None, read_s=0., wavelength_m=1550.e-9):
+        assert len(axes) == len(centres), 'Incorrect number of centres.'
+        self.axes = axes
+        self.centres = np.array(centres, dtype=float)
+        self.waists = np.broadcast_to(np.array(waists, dtype=float), self.centres.shape)
+        self.max_power_W = max_power_W
+        self.noise_W = noise_W
+        self.transport = transport
+        self.read_s = read_s
+        self.wavelength_m = wavelength_m
+        self.readings = 0
+
+    def get_coupling(self):
+        '''
+        The noiseless power in [W] at the current axes positions.
+        '''
+        positions = []
+        for axis in self.axes:
+            if hasattr(axis, 'simulated_position_um'):
+                positions.append(axis.simulated_position_um())
+            else:
+                positions.append(axis.simulated_position_degree())
+        d = (np.array(positions) - self.centres) / self.waists
+        return self.max_power_W * np.exp(-2.*np.sum(d**2))
+
+    def _get_power_W(self):
+        # The power is latched at the end of the integration time,
+        # before the reply comes back over the transport.
+        if self.transport:
+            power_W = self.transport.command(self.read_s, self.get_coupling)
+        else:
+            power_W = self.get_coupling()
+        self.readings += 1
+        if self.noise_W:
+            power_W += random.gauss(0., self.noise_W)
+        return power_W
+
+    def get_analogue_current_A(self, analogue_voltage_V):
+        return analogue_voltage_V
+
+    def get_responsivity_A_W(self):
+        return 1.
+
+    def get_wavelength_m(self):
+        return self.wavelength_m
+
+    def set_wavelength_m(self, wavelength_m):
+        self.wavelength_m = wavelength_m
+        return self.wavelength_m
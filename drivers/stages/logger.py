@@ -1,8 +1,21 @@
 import abc
+import array
+import atexit
+import collections
+import json
+import os
+import struct
+import threading
+import time
+import weakref
+import numpy as np
+from ..utils import trace
 
 class Logger(object, metaclass=abc.ABCMeta):
     def __init__(self, filename, stage):
         self.fs = open(filename, 'w')
+        # Axes moving concurrently log from several threads.
+        self._lock = threading.Lock()
         header = ('#input x + chip z [um],input y [um],input z [um],'
                   'output x + chip z [um],output y [um],output z [um]')
         self.fs.write(header+'\n')
@@ -21,6 +34,7 @@ class LoggerStages3(Logger):
         self.output = stages.output
         self.chip = stages.chip
 
+    @trace.traced('io', 'log')
     def log(self):
         x_in_nm = self.input.x._position_absolute
         y_in_nm = self.input.y._position_absolute
@@ -41,7 +55,8 @@ class LoggerStages3(Logger):
         xyz_out_str = ','.join([str(v/1000.) for v in xyz_out])
 
         fs_str = '%s,%s\n' % (xyz_in_str, xyz_out_str)
-        self.fs.write(fs_str)
+        with self._lock:
+            self.fs.write(fs_str)
 
         return fs_str
 
@@ -51,6 +66,7 @@ class LoggerStages2(Logger):
         self.input = stages.input
         self.output = stages.output
 
+    @trace.traced('io', 'log')
     def log(self):
         x_in_nm = self.input.x._position_absolute
         y_in_nm = self.input.y._position_absolute
@@ -67,7 +83,8 @@ class LoggerStages2(Logger):
         xyz_out_str = ','.join([str(v/1000.) for v in xyz_out])
 
         fs_str = '%s,%s\n' % (xyz_in_str, xyz_out_str)
-        self.fs.write(fs_str)
+        with self._lock:
+            self.fs.write(fs_str)
 
         return fs_str
 
@@ -76,6 +93,7 @@ class LoggerStage(Logger):
         super().__init__(filename, stage)
         self.stage = stage
 
+    @trace.traced('io', 'log')
     def log(self):
         x_st_nm = self.stage.x._position_absolute
         y_st_nm = self.stage.y._position_absolute
@@ -86,7 +104,262 @@ class LoggerStage(Logger):
         xyz_st_str = ','.join([str(v/1000.) for v in xyz_st])
 
         fs_str = '%s\n' % xyz_st_str
-        self.fs.write(fs_str)
+        with self._lock:
+            self.fs.write(fs_str)
 
         return fs_str
 
+
+class LoggerBinary(object):
+    '''
+    Logs the positions of axes as fixed-size binary records,
+    written in batches by a background thread.
+
+    `log` only appends a record, a monotonic timestamp, the
+    wall-clock time the monotonic clock counts from and the
+    position of every axis, to a queue, so logging costs the
+    moving thread next to nothing.  The writer thread empties the
+    queue every `flush_period_s`.  Read the log back with
+    `read_binary_log`.
+
+    The file starts with a header: the magic bytes `STGLOG1` and
+    a newline, the length of the rest of the header as a little-endian
+    uint32, and JSON giving the record fields and the wall-clock
+    and monotonic times the log started at.  Records of one
+    little-endian float64 per field follow.
+
+    An existing log is appended to, so restarting a script
+    logging to, say, a daily file keeps the day\'s earlier
+    records.  Its fields must match those logged.  Each record
+    holds its own `t0`, as the monotonic clock of another session
+    counts from another time.
+
+    Args:
+        filename (str): The file to log to.  It may contain
+            `time.strftime` codes, eg \'stages_%Y-%m-%d.bin\', to
+            start a new file each day.  If the file exists, it is
+            appended to.
+        stages (dict): The stages to log, by the prefix of their
+            fields, eg `{\'input\': stages.input}` logs the
+            fields \'input_x\', \'input_y\' and so on.  The prefix
+            may be `None` for no prefix.  Every physical axis is
+            logged, in [nm] for linear axes and [arc second] for
+            rotational axes, relative to home and not reversed.
+        flush_period_s (float): How often in [s] the queue is
+            written out.
+    '''
+    magic = b'STGLOG1\n'
+
+    def __init__(self, filename, stages, flush_period_s=0.5):
+        self.filename = filename
+        self.fields = ['t', 't0']
+        for prefix, stage in stages.items():
+            self.fields += [prefix + '_' + name if prefix else name for name in stage.state.names]
+        # The wall-clock time the monotonic clock counts from.
+        self._t0 = time.time() - time.monotonic()
+        # Raise now, rather than on the writer thread, if the log
+        # can\'t be appended to.
+        _check_binary_log(time.strftime(filename), self.fields)
+        # The positions are copied straight out of the stages\'
+        # `StageState` arrays.
+        self._buffers = [stage.state._buffer for stage in stages.values()]
+        self.flush_period_s = flush_period_s
+        # `deque.append` and `deque.popleft` are atomic, so threads
+        # logging and the writer need no lock.
+        self._queue = collections.deque()
+        # Keeps `flush` and the writer from writing at once.
+        self._write_lock = threading.Lock()
+        self._fs = None
+        self._fs_name = None
+        self._wake = threading.Event()
+        self._stop = False
+        # The writer only holds a weak reference, so an unused
+        # logger is still closed when it is garbage collected.
+        self._writer = threading.Thread(target=LoggerBinary._write_loop,
+                                        args=(weakref.ref(self), self._wake, flush_period_s),
+                                        daemon=True)
+        self._writer.start()
+        _binary_loggers_open.add(self)
+
+    def __del__(self):
+        # `__init__` may have raised before starting the writer.
+        if getattr(self, '_writer', None):
+            self.close()
+
+    @trace.traced('io', 'log')
+    def log(self):
+        record = array.array('d', (time.monotonic(), self._t0))
+        for buffer in self._buffers:
+            record += buffer
+        self._queue.append(record)
+
+    def flush(self):
+        '''
+        Writes out the records logged so far.
+        '''
+        self._write()
+        with self._write_lock:
+            if self._fs:
+                self._fs.flush()
+
+    def close(self):
+        '''
+        Writes out the remaining records and stops the writer.
+        '''
+        if self._stop:
+            return
+        self._stop = True
+        self._wake.set()
+        if self._writer is not threading.current_thread():
+            self._writer.join()
+        self._write()
+        if self._fs:
+            self._fs.close()
+            self._fs = None
+
+    @staticmethod
+    def _write_loop(ref, wake, flush_period_s):
+        while True:
+            wake.wait(flush_period_s)
+            logger = ref()
+            if logger is None or logger._stop:
+                return
+            logger._write()
+            del logger
+
+    def _write(self):
+        with self._write_lock:
+            n = len(self._queue)
+            if not n:
+                return
+            records = b''.join([self._queue.popleft().tobytes() for _ in range(n)])
+            self._open(time.strftime(self.filename))
+            self._fs.write(records)
+            # Put the records on disk each period, not when the
+            # buffer fills, so a running log can be read and a crash
+            # loses at most a period.
+            self._fs.flush()
+
+    def _open(self, name):
+        # Starts a new file if the name has changed, eg at midnight,
+        # or appends to the file if it exists.
+        if name == self._fs_name:
+            return
+        if self._fs:
+            self._fs.close()
+            self._fs = None
+        offset = _check_binary_log(name, self.fields)
+        if offset:
+            self._fs = open(name, 'r+b')
+            # Drop a record cut short by a crash, so the records
+            # appended stay aligned.
+            record_size = 8 * len(self.fields)
+            size = self._fs.seek(0, os.SEEK_END)
+            self._fs.truncate(size - (size - offset) % record_size)
+            self._fs.seek(0, os.SEEK_END)
+        else:
+            t0_monotonic_s = time.monotonic()
+            header = json.dumps({'fields': self.fields,
+                                 't0_epoch_s': self._t0 + t0_monotonic_s,
+                                 't0_monotonic_s': t0_monotonic_s}).encode()
+            # Pad so the records start 8-byte aligned.
+            header += b' ' * (-(len(self.magic) + 4 + len(header)) % 8)
+            self._fs = open(name, 'wb')
+            self._fs.write(self.magic + struct.pack('<I', len(header)) + header)
+            self._fs.flush()
+        self._fs_name = name
+
+class LoggerBinaryStages3(LoggerBinary):
+    def __init__(self, filename, stages, flush_period_s=0.5):
+        super().__init__(filename, {'input': stages.input, 'output': stages.output,
+                                    'chip': stages.chip}, flush_period_s)
+
+class LoggerBinaryStages2(LoggerBinary):
+    def __init__(self, filename, stages, flush_period_s=0.5):
+        super().__init__(filename, {'input': stages.input, 'output': stages.output},
+                         flush_period_s)
+
+class LoggerBinaryStage(LoggerBinary):
+    def __init__(self, filename, stage, flush_period_s=0.5):
+        super().__init__(filename, {None: stage}, flush_period_s)
+
+# Flush open binary loggers when the interpreter exits, as their
+# writers are daemon threads.
+_binary_loggers_open = weakref.WeakSet()
+
+@atexit.register
+def _close_binary_loggers():
+    for logger in list(_binary_loggers_open):
+        logger.close()
+
+# The loggers for `.bin` files, by the logger they replace.
+_binary_loggers = {
+    LoggerStages3: LoggerBinaryStages3,
+    LoggerStages2: LoggerBinaryStages2,
+    LoggerStage: LoggerBinaryStage,
+}
+
+def get_logger(logger, filename, stage):
+    '''
+    Creates a logger, binary if `filename` ends in `.bin`.
+
+    Args:
+        logger (class): The text logger, eg `LoggerStages3`.
+        filename (str): The file to log to.
+        stage (Stage, Stages): The stage(s) to log.
+
+    Returns:
+        Logger, LoggerBinary: The logger.
+    '''
+    if isinstance(filename, str) and filename.endswith('.bin'):
+        logger = _binary_loggers[logger]
+    return logger(filename, stage)
+
+def _read_binary_log_header(filename, fs):
+    # The header of a binary log and the offset of its records.
+    magic = fs.read(len(LoggerBinary.magic))
+    if magic != LoggerBinary.magic:
+        raise ValueError('`%s` is not a binary stage log.' % filename)
+    header_len, = struct.unpack('<I', fs.read(4))
+    header = json.loads(fs.read(header_len).decode())
+    return header, len(LoggerBinary.magic) + 4 + header_len
+
+def _check_binary_log(filename, fields):
+    # The offset of the records of an existing binary log with
+    # `fields`, or 0 if there is no log to append to.
+    if not os.path.exists(filename) or not os.path.getsize(filename):
+        return 0
+    with open(filename, 'rb') as fs:
+        header, offset = _read_binary_log_header(filename, fs)
+    if header['fields'] != fields:
+        raise ValueError('Cannot append to `%s`: it logs the fields %s, not %s.'
+                         % (filename, header['fields'], fields))
+    return offset
+
+def read_binary_log(filename):
+    '''
+    Loads a log written by `LoggerBinary`, memory-mapped so even
+    a large log loads at once.
+
+    Args:
+        filename (str): The log file.
+
+    Returns:
+        (np.memmap, dict): The records, with a field for each name
+            in the header\'s `fields`, and the header.  `t` is the
+            monotonic time in [s] and `t0` the wall-clock time in [s]
+            the monotonic clock of the session that logged the
+            record counts from, so `t0 + t` is the wall-clock time
+            of each record, even in a log appended to by several
+            sessions.  The header gives the times of the first.
+    '''
+    with open(filename, 'rb') as fs:
+        header, offset = _read_binary_log_header(filename, fs)
+
+    dtype = np.dtype([(field, '<f8') for field in header['fields']])
+    # Ignore a record cut short by a crash.
+    num_records = (os.path.getsize(filename) - offset) // dtype.itemsize
+    if not num_records:
+        return np.zeros(0, dtype=dtype), header
+    records = np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=(num_records,))
+    return records, header
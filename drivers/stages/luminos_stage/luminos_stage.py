@@ -6,6 +6,7 @@ import numpy as np
 import time
 import abc
 import copy
+import functools
 
 def find_stages(num_com_ports_check=10, num_motors=6, restore_default_settings=False):
     ports_found = []
@@ -36,38 +37,51 @@ class LuminosStages(st.Stages3):
                  chip_x_axis_motor='x', chip_y_axis_motor='y', chip_z_axis_motor='z',
                  ctr_in_out_xy_axes=False, update_position_absolute=100, restore_default_settings=False,
                  reverse_output_x_axis=True, home_input=False,
-                 home_chip=False, home_output=False):
+                 home_chip=False, home_output=False, pipelined=False):
         self.pos_xyz_um_stack = []
 
-        self.input  = LuminosStage(com_port_number_input, C1=C1_input, C2=C2_input,
-                                   C1_z_chip=C1_z_chip, C2_z_chip=C2_z_chip,
-                                   c1_c2_distance_mask_um=c1_c2_distance_mask_um,
-                                   update_position_absolute=update_position_absolute,
-                                   filename=filename, x_axis_motor=input_x_axis_motor,
-                                   y_axis_motor=input_y_axis_motor, z_axis_motor=input_z_axis_motor,
-                                   restore_default_settings=restore_default_settings,
-                                   home=home_input)
-        self.output = LuminosStage(com_port_number_output, C1=C1_output, C2=C2_output,
-                                   C1_z_chip=C1_z_chip, C2_z_chip=C2_z_chip,
-                                   c1_c2_distance_mask_um=c1_c2_distance_mask_um,
-                                   update_position_absolute=update_position_absolute,
-                                   filename=filename, x_axis_motor=output_x_axis_motor,
-                                   y_axis_motor=output_y_axis_motor, z_axis_motor=output_z_axis_motor,
-                                   reverse_axis_x=reverse_output_x_axis, restore_default_settings=restore_default_settings,
-                                   home=home_output)
-        self.chip   = LuminosStage(com_port_number_chip, filename=filename,
-                                   update_position_absolute=update_position_absolute,
-                                   x_axis_motor=chip_x_axis_motor, y_axis_motor=chip_y_axis_motor,
-                                   z_axis_motor=chip_z_axis_motor,
-                                   restore_default_settings=restore_default_settings,
-                                   home=home_chip)
-
-        stages_dict = {'input': self.input, 'output': self.output, 'chip': self.chip}
+        # Each stage has its own serial port, so set them up (and
+        # home them) in parallel.
+        stages_dict = st.run_parallel({
+            'input': functools.partial(LuminosStage, com_port_number_input, C1=C1_input, C2=C2_input,
+                                       C1_z_chip=C1_z_chip, C2_z_chip=C2_z_chip,
+                                       c1_c2_distance_mask_um=c1_c2_distance_mask_um,
+                                       update_position_absolute=update_position_absolute,
+                                       filename=filename, x_axis_motor=input_x_axis_motor,
+                                       y_axis_motor=input_y_axis_motor, z_axis_motor=input_z_axis_motor,
+                                       restore_default_settings=restore_default_settings,
+                                       home=home_input, pipelined=pipelined),
+            'output': functools.partial(LuminosStage, com_port_number_output, C1=C1_output, C2=C2_output,
+                                        C1_z_chip=C1_z_chip, C2_z_chip=C2_z_chip,
+                                        c1_c2_distance_mask_um=c1_c2_distance_mask_um,
+                                        update_position_absolute=update_position_absolute,
+                                        filename=filename, x_axis_motor=output_x_axis_motor,
+                                        y_axis_motor=output_y_axis_motor, z_axis_motor=output_z_axis_motor,
+                                        reverse_axis_x=reverse_output_x_axis,
+                                        restore_default_settings=restore_default_settings,
+                                        home=home_output, pipelined=pipelined),
+            'chip': functools.partial(LuminosStage, com_port_number_chip, filename=filename,
+                                      update_position_absolute=update_position_absolute,
+                                      x_axis_motor=chip_x_axis_motor, y_axis_motor=chip_y_axis_motor,
+                                      z_axis_motor=chip_z_axis_motor,
+                                      restore_default_settings=restore_default_settings,
+                                      home=home_chip, pipelined=pipelined),
+        }, 'Initialising stages', cleanup=lambda name, stage: stage.close())
+        self.input = stages_dict['input']
+        self.output = stages_dict['output']
+        self.chip = stages_dict['chip']
+
         super().__init__(stages_dict=stages_dict, filename=filename, ctr_in_out_xy_axes=ctr_in_out_xy_axes)
 
     def home(self):
-        for stage in self.stages_dict.values():
-            stage.home()
+        '''
+        Homes every stage, in parallel.
+
+        Returns:
+            dict: The replies of each stage\'s axes, by stage name.
+        '''
+        return st.run_parallel({name: stage.home for name, stage in self.stages_dict.items()},
+                               'Homing stages')
 
 class LuminosStage(st.Stage):
     def __init__(self, com_port_number, C1=None, C2=None,
@@ -76,16 +90,21 @@ class LuminosStage(st.Stage):
                  filename=None, reverse_axis_x=False,
                  x_axis_motor='x', y_axis_motor='y', z_axis_motor='z',
                  reverse_axis_y=False, reverse_axis_z=False,
-                 restore_default_settings=False, home=False):
+                 restore_default_settings=False, home=False, pipelined=False):
 
         self._com_port_number = com_port_number
         self._set_serial_connection(com_port_number)
+        self._pipelined = pipelined
 
+        # Home all the axes with one broadcast, rather than each in
+        # turn as they are set up.
         axes_idx, axes_dict = self._get_axes_dict(update_position_absolute=update_position_absolute,
                                                   reverse_axis_x=reverse_axis_x,
                                                   reverse_axis_y=reverse_axis_y,
                                                   reverse_axis_z=reverse_axis_z,
-                                                  home=home)
+                                                  home=False)
+        if home:
+            self._home(axes_dict.values())
 
         if restore_default_settings:
             self.set_default_settings()
@@ -101,6 +120,13 @@ class LuminosStage(st.Stage):
             a = axis.set_acceleration(22)
             r = axis.set_microstep_resolution(128)
 
+        # Pipelined, the axes\' commands can be in flight together,
+        # so the axes of the stage can move at the same time.  Only
+        # once the axes have written their device modes, which would
+        # otherwise turn message IDs off again.
+        if pipelined:
+            self._port.set_pipelined(True)
+
         super().__init__(axes_dict=axes_dict, C1=C1, C2=C2,
                          C1_z_chip=C1_z_chip, C2_z_chip=C2_z_chip,
                          c1_c2_distance_mask_um=c1_c2_distance_mask_um,
@@ -149,13 +175,10 @@ class LuminosStage(st.Stage):
 
     def set_computer_mode(self):
         self._set_serial_connection(self._com_port_number)
-        for axis_label, axis in self.axes.items():
-            if axis_label in ('x', 'y', 'z'):
-                axis._position_absolute = axis.get_current_position_nm()
-                if axis.axis_reversed == True:
-                    axis._position_absolute = axis._position_absolute_max_nm - axis._position_absolute
-            elif axis_label in ('roll', 'yaw', 'pitch'):
-                axis._position_absolute = axis.get_current_position_arc_second()
+        if self._pipelined:
+            self._port.set_pipelined(True)
+        for axis in self.axes_physical.values():
+            axis.sync_position()
         return self._port
 
     def _binary_command(self, command_name, command_data=None):
@@ -192,11 +215,79 @@ class LuminosStage(st.Stage):
         return r
 
     def home(self):
-        r = self._send_command('Home')
-        for axis in self.axes_physical.values():
-            axis._position_absolute = 0.
+        return self._home(self.axes_physical.values())
+
+    def _home(self, axes):
+        # The 'Home' broadcast replies once every axis is home.
+        axes = [axis for axis in axes if axis]
+        tla.send_command(self._port, 0, 'Home')
+        r = [eval(self._port.read().__str__()) for _ in axes]
+        for axis in axes:
+            axis._set_position_cache(0.)
         return r
 
+    def close(self):
+        '''
+        Closes the serial connection to the stage, and the worker
+        threads of its non-blocking commands.
+        '''
+        if self._port:
+            self.release_executors()
+            st.release_executor(self._port)
+            self._port.close()
+
+    def get_all_positions(self):
+        '''
+        Reads the position of every axis in one round trip, by
+        broadcasting \'Return Current Position\' to device 0, and
+        updates the axes\' position caches.
+
+        Returns:
+            dict: The position of each axis (relative to home), in
+                [nm] for x, y and z and [arc second] for roll,
+                pitch and yaw.
+        '''
+        axes = {axis.device_index: (name, axis) for name, axis in self.axes_physical.items()
+                if axis}
+        tla.send_command(self._port, 0, 'Return Current Position')
+        replies = [self._port.read() for _ in axes]
+
+        positions = {}
+        for r in replies:
+            if r.device_number not in axes:
+                raise RuntimeError('Reply from unexpected device %i.' % r.device_number)
+            name, axis = axes[r.device_number]
+            if isinstance(axis, st.AxisLinear):
+                pos_abs = r.data * axis.nm_per_step
+                in_range = axis._position_absolute_min_nm <= pos_abs <= \
+                    axis._position_absolute_max_nm
+            else:
+                pos_abs = r.data * axis.arc_second_per_step
+                in_range = axis._position_absolute_min_arc_second <= pos_abs <= \
+                    axis._position_absolute_max_arc_second
+            if in_range:
+                axis.position_cache_misses += 1
+                axis._set_position_cache(pos_abs)
+            else:
+                # Let the axis retry or raise as it does for its own
+                # reads.
+                axis.sync_position()
+            positions[name] = axis._position_absolute
+        if len(positions) != len(axes):
+            raise RuntimeError('Not every axis replied.')
+
+        for name, axis in self.axes_physical.items():
+            if axis and axis.axis_reversed:
+                if isinstance(axis, st.AxisLinear):
+                    positions[name] = axis._position_absolute_max_nm - positions[name]
+                else:
+                    positions[name] = axis._position_absolute_max_arc_second - positions[name]
+        return positions
+
+    def sync_position(self, axes_names=None):
+        # A single broadcast reads every axis.
+        self.get_all_positions()
+
     def flash_leds(self, num_flashes=5, delay_flashes_sec=1.):
         on = True
         for i in range(num_flashes):
@@ -211,7 +302,11 @@ class LuminosStage(st.Stage):
             for axis in self.axes_physical:
                 axis.turn_leds_on()
 
-class LuminosAxis(st.Axis, zs.BinaryDevice):
+class LuminosAxis(st.Axis, zs.BinaryDeviceBase):
+    # The attributes are slots of `LuminosAxisLinear` and
+    # `LuminosAxisRotate`, as only one base of a class can add slots.
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False, config_mask_set=0x08A0, config_mask_unset=0xC35F):
         assert 0 < device_index < 20, 'The suggested motor ID is probably wrong.'
@@ -219,7 +314,7 @@ class LuminosAxis(st.Axis, zs.BinaryDevice):
         self.device_index = device_index
         self._port = port
 
-        zs.BinaryDevice.__init__(self, port, device_index)
+        zs.BinaryDeviceBase.__init__(self, port, device_index)
         super().__init__(reverse_axis, update_position_absolute=update_position_absolute)
 
         if home:
@@ -236,6 +331,10 @@ class LuminosAxis(st.Axis, zs.BinaryDevice):
         # Mask for target setting.
         target_mask_set = config_mask_set
         target_mask_unset = config_mask_unset ^ 0xFFFF
+        # Keep message IDs (bit 6) on if the port is pipelined.
+        if self._port.pipelined:
+            target_mask_set |= 1 << 6
+            target_mask_unset |= 1 << 6
 
         # Combine
         target_status_word = current_status_word | target_mask_set
@@ -245,6 +344,13 @@ class LuminosAxis(st.Axis, zs.BinaryDevice):
         if current_status_word != target_status_word:
             self._set_device_mode(target_status_word)
 
+    def _get_transport(self):
+        # The axes of a stage share its serial port, which can carry
+        # commands to several axes at once when pipelined.
+        if self._port.pipelined:
+            return self
+        return self._port
+
     def move_rel(self):
         raise AttributeError('Don\'t call this function.')
 
@@ -363,6 +469,7 @@ class LuminosAxis(st.Axis, zs.BinaryDevice):
 
 class LuminosAxisLinear(LuminosAxis, st.AxisLinear):
     __metaclass__ = abc.ABCMeta
+    __slots__ = ('device_index', '_port', 'port', 'number')
 
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False, config_mask_set=0x08A0, config_mask_unset=0xC35F):
@@ -378,6 +485,18 @@ class LuminosAxisLinear(LuminosAxis, st.AxisLinear):
         r = self._move_abs_steps(steps)
         return r.data * self.nm_per_step
 
+    def _move_vel_nm_s(self, velocity_nm_s):
+        speed = velocity_nm_s / self.nm_per_step / tla.microsteps_s_per_speed_data
+        r = self._send_command('Move At Constant Speed', int(round(speed)))
+        return r.data * tla.microsteps_s_per_speed_data * self.nm_per_step
+
+    def _stop(self):
+        r = self._send_command('Stop')
+        return r.data * self.nm_per_step
+
+    def _get_acceleration_nm_s2(self):
+        return self.get_acceleration() * tla.microsteps_s2_per_acceleration_data * self.nm_per_step
+
     def _get_current_position_nm(self):
         pos_abs_steps = self._send_command('Return Current Position').data
         pos_abs_nm = pos_abs_steps * self.nm_per_step
@@ -395,6 +514,7 @@ class LuminosAxisLinear(LuminosAxis, st.AxisLinear):
 
 class LuminosAxisRotate(LuminosAxis, st.AxisRotate):
     __metaclass__ = abc.ABCMeta
+    __slots__ = ('device_index', '_port', 'port', 'number')
 
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False, config_mask_set=0x08A0, config_mask_unset=0xC35F):
@@ -435,6 +555,8 @@ class LuminosAxisRotate(LuminosAxis, st.AxisRotate):
         return self._set_maximum_position_arc_second(angle_from_home_degree*3600.)
 
 class LuminosAxisX(LuminosAxisLinear, st.AxisX):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False, config_mask_set=0x08A0, config_mask_unset=0xC35F):
                  super().__init__(port, device_index, reverse_axis, update_position_absolute=update_position_absolute,
@@ -453,6 +575,8 @@ class LuminosAxisX(LuminosAxisLinear, st.AxisX):
         return 524.288e3
 
 class LuminosAxisY(LuminosAxisLinear, st.AxisY):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False, config_mask_set=0x08A0, config_mask_unset=0xC35F):
         super().__init__(port, device_index, reverse_axis, update_position_absolute=update_position_absolute,
@@ -471,6 +595,8 @@ class LuminosAxisY(LuminosAxisLinear, st.AxisY):
         return 524.288e3
 
 class LuminosAxisZ(LuminosAxisLinear, st.AxisZ):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False, config_mask_set=0x08A0, config_mask_unset=0xC35F):
         super().__init__(port, device_index, reverse_axis, update_position_absolute=update_position_absolute,
@@ -489,6 +615,8 @@ class LuminosAxisZ(LuminosAxisLinear, st.AxisZ):
         return 16000.e3
 
 class LuminosAxisRoll(LuminosAxisRotate, st.AxisRoll):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False, config_mask_set=0x08A0, config_mask_unset=0xC35F):
         super().__init__(port, device_index, reverse_axis, update_position_absolute=update_position_absolute,
@@ -507,6 +635,8 @@ class LuminosAxisRoll(LuminosAxisRotate, st.AxisRoll):
         return 3.9*3600.
 
 class LuminosAxisYaw(LuminosAxisRotate, st.AxisYaw):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False, config_mask_set=0x08A0, config_mask_unset=0xC35F):
         super().__init__(port, device_index, reverse_axis, update_position_absolute=update_position_absolute,
@@ -525,6 +655,8 @@ class LuminosAxisYaw(LuminosAxisRotate, st.AxisYaw):
         return 3.9*3600.
 
 class LuminosAxisPitch(LuminosAxisRotate, st.AxisPitch):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False, config_mask_set=0x08A0, config_mask_unset=0xC35F):
         super().__init__(port, device_index, reverse_axis, update_position_absolute=update_position_absolute,
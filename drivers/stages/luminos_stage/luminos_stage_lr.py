@@ -103,6 +103,8 @@ class LuminosStageLR(ls.LuminosStage):
             return axes_idx, axes_dict
 
 class LuminosAxisLR(ls.LuminosAxis):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False):
 
@@ -110,6 +112,8 @@ class LuminosAxisLR(ls.LuminosAxis):
                         home=home)
 
 class LuminosAxisLinearLR(ls.LuminosAxisLinear):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False):
 
@@ -117,6 +121,8 @@ class LuminosAxisLinearLR(ls.LuminosAxisLinear):
                          home=False)
 
 class LuminosAxisRotateLR(ls.LuminosAxisRotate):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False):
 
@@ -124,6 +130,8 @@ class LuminosAxisRotateLR(ls.LuminosAxisRotate):
                          home=False)
 
 class LuminosAxisXLR(ls.LuminosAxisX):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False):
         # todo home variable is not used - should it be passed with the super?
@@ -142,6 +150,8 @@ class LuminosAxisXLR(ls.LuminosAxisX):
         return 2621.440e3
 
 class LuminosAxisYLR(ls.LuminosAxisY):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False):
 
@@ -160,6 +170,8 @@ class LuminosAxisYLR(ls.LuminosAxisY):
         return 2621.440e3
 
 class LuminosAxisZLR(ls.LuminosAxisZ):
+    __slots__ = ('absolute_max_nm',)
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False, absolute_max_nm=16000e3):
         self.absolute_max_nm = absolute_max_nm
@@ -180,6 +192,8 @@ class LuminosAxisZLR(ls.LuminosAxisZ):
         return self.absolute_max_nm
 
 class LuminosAxisRollLR(ls.LuminosAxisRoll):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False):
 
@@ -198,6 +212,8 @@ class LuminosAxisRollLR(ls.LuminosAxisRoll):
         return 3. * 3600.
 
 class LuminosAxisYawLR(ls.LuminosAxisYaw):
+    __slots__ = ()
+
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False):
 
@@ -216,6 +232,7 @@ class LuminosAxisYawLR(ls.LuminosAxisYaw):
         return 3. * 3600.
 
 class LuminosAxisPitchLR(ls.LuminosAxisPitch):
+    __slots__ = ()
 
     def __init__(self, port, device_index, reverse_axis=False, update_position_absolute=100,
                  home=False):
@@ -50,6 +50,11 @@ commands = (
     ('Error','255','n/a','Reply','Error Code')
 )
 
+# Conversion of the binary speed and acceleration data values
+# to [microstep/s] and [microstep/s^2] respectively.
+microsteps_s_per_speed_data = 9.375
+microsteps_s2_per_acceleration_data = 11250.
+
 def get_command_names():
     command_names = tuple(c[0] for c in commands)
     return command_names
@@ -94,8 +99,11 @@ def send_command(port, device_index, command_name, command_data=None):
     bc = binary_command(device_index, command_name, command_data)
 
     # Clear the buffer before sending command to avoid unexpected responses.
-    bytes_in_buffer = port._ser.in_waiting
-    if bytes_in_buffer:
-        port._ser.read(bytes_in_buffer)
+    # In pipelined mode the port's reader thread owns the buffer and
+    # unexpected responses are discarded by message ID.
+    if not port.pipelined:
+        bytes_in_buffer = port._ser.in_waiting
+        if bytes_in_buffer:
+            port._ser.read(bytes_in_buffer)
 
     port.write(bc)
@@ -1,3 +1,3 @@
 from .ascii import AsciiAxis, AsciiDevice, AsciiCommand, AsciiReply, AsciiSerial
-from .binary import BinaryCommand, BinaryDevice, BinaryReply, BinarySerial
+from .binary import BinaryCommand, BinaryDevice, BinaryDeviceBase, BinaryReply, BinarySerial
 from .exceptions import TimeoutError, UnexpectedReplyError
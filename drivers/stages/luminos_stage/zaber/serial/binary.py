@@ -6,14 +6,23 @@ import serial
 import struct
 import logging
 import sys
+import threading
+import collections
+import queue
+from concurrent import futures
 
 from .exceptions import TimeoutError, UnexpectedReplyError
+from .....utils import latency
 
 # See https://docs.python.org/2/howto/logging.html#configuring-logging-
 # for-a-library for info on why we have these two lines here.
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+# The device mode bit (setting 40) that puts a device in message ID
+# mode.
+_DEVICE_MODE_MESSAGE_IDS = 1 << 6
+
 class BinaryCommand(object):
     """Models a single command in Zaber's Binary protocol.
 
@@ -79,14 +88,15 @@ class BinaryCommand(object):
         return "[{:d}, {:d}, {:d}]".format(self.device_number,
                 self.command_number, self.data)
 
-class BinaryDevice(object):
-    """A class to represent a Zaber device in the Binary protocol.
+class BinaryDeviceBase(object):
+    """The commands of a Zaber device in the Binary protocol.
 
-    Attributes:
-        port: A BinarySerial object which represents the port to which
-            this device is connected.
-        number: The integer number of this device. 1-255.
+    The class has no instance attributes of its own, so classes with
+    __slots__ of another base, eg the axes of a stage, can derive from
+    it too. They must provide the ``port`` and ``number`` slots.
     """
+    __slots__ = ()
+
     def __init__(self, port, number):
         """
         Args:
@@ -222,6 +232,16 @@ class BinaryDevice(object):
         return self.send(54).data
 
 
+class BinaryDevice(BinaryDeviceBase):
+    """A class to represent a Zaber device in the Binary protocol.
+
+    Attributes:
+        port: A BinarySerial object which represents the port to which
+            this device is connected.
+        number: The integer number of this device. 1-255.
+    """
+    __slots__ = ("port", "number")
+
 
 class BinaryReply(object):
     """Models a single reply in Zaber's Binary protocol.
@@ -297,11 +317,65 @@ class BinaryReply(object):
         return "[{:d}, {:d}, {:d}]".format(self.device_number, 
                 self.command_number, self.data)
 
+class _PendingReplies(object):
+    """The replies awaited for one message ID in pipelined mode.
+
+    A command to a single device resolves one future. A command to
+    device 0 is answered by every device, so its replies are queued
+    instead.
+    """
+    def __init__(self, device_number):
+        self.device_number = device_number
+        if device_number == 0:
+            self.replies = queue.Queue()
+            self.future = None
+        else:
+            self.replies = None
+            self.future = futures.Future()
+
+    def put(self, reply):
+        if self.replies is not None:
+            self.replies.put(reply)
+        elif not self.future.done():
+            self.future.set_result(reply)
+
+    def get(self, timeout):
+        if self.replies is not None:
+            try:
+                return self.replies.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError("read timed out.")
+        try:
+            return self.future.result(timeout)
+        except futures.TimeoutError:
+            raise TimeoutError("read timed out.")
+
+def _command_number(args):
+    """The command number of the arguments of BinarySerial.write(),
+    used to file its latency."""
+    message = args[0] if len(args) == 1 else args
+    if isinstance(message, BinaryCommand):
+        return message.command_number
+    if isinstance(message, str):
+        return ord(message[1]) if len(message) > 1 else None
+    try:
+        return message[1]
+    except (IndexError, TypeError):
+        return None
+
+
 class BinarySerial(object):
     """A class for interacting with Zaber devices using the Binary protocol.
 
     This class defines a few simple methods for writing to and reading
     from a device connected over the serial port.
+
+    In pipelined mode (see `set_pipelined`) the devices tag each
+    reply with the message ID of the command, and a reader thread
+    routes the replies to the commands awaiting them. Several
+    threads can then each write commands and read their replies
+    over the one port, so devices on the same daisy chain execute
+    commands, such as moves, at the same time.
     """
 
     def __init__(self, port, baud = 9600, timeout = 5, inter_char_timeout = 0.01):
@@ -341,6 +415,171 @@ class BinarySerial(object):
             # serial_for_url not supported; use fallback
             self._ser = serial.Serial(port, baud, timeout = timeout, interCharTimeout = inter_char_timeout)
 
+        self._pipelined = False
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._reader = None
+        self._reply_timeout = timeout
+        self._next_message_id = 1
+
+    @property
+    def pipelined(self):
+        """True if the port is in pipelined mode."""
+        return self._pipelined
+
+    def set_pipelined(self, pipelined = True, settle_time = 0.1):
+        """Turns pipelined mode on or off.
+
+        Turning it on puts every device on the port in message ID
+        mode, by setting bit 6 of its device mode (Set Device Mode,
+        command 40), and starts the reader thread; turning it off
+        does the reverse.
+
+        Args:
+            pipelined: True to turn pipelined mode on.
+            settle_time: The number of seconds to wait for the
+                devices to reply to the mode change before the
+                replies are discarded.
+
+        Notes:
+            The devices' other settings can rewrite the device mode
+            and so clear bit 6, eg Restore Settings or a device mode
+            written whole; pipelined mode should be turned on after
+            the devices are set up.
+
+            In pipelined mode each thread reads the replies to its
+            own commands, in the order it wrote them. A command to
+            device 0 is answered by every device; its replies are
+            read until the thread writes its next command.
+
+            Reply data are 24 bit in message ID mode.
+
+        Returns:
+            True if pipelined mode is on.
+        """
+        if pipelined == self._pipelined:
+            return self._pipelined
+        if pipelined:
+            if not self._set_message_ids(True, settle_time):
+                raise RuntimeError("No devices replied on the port.")
+            self._pipelined = True
+            self._ser.timeout = min(self._reply_timeout, 0.1)
+            self._reader = threading.Thread(target=self._read_replies,
+                    name="BinarySerial reader", daemon=True)
+            self._reader.start()
+        else:
+            self._pipelined = False
+            self._reader.join()
+            self._reader = None
+            self._ser.timeout = self._reply_timeout
+            self._set_message_ids(False, settle_time)
+            with self._pending_lock:
+                self._pending.clear()
+        return self._pipelined
+
+    def _set_message_ids(self, message_ids, settle_time):
+        # Sets or clears the message ID bit of the device mode of
+        # every device on the port, keeping the other bits.  The
+        # modes are read with one broadcast, as the number of devices
+        # isn't known.  The command data fit in 24 bits and are sent
+        # with message ID 0, so they are read the same in either mode,
+        # as are the replies.
+        self._ser.reset_input_buffer()
+        self._ser.write(BinaryCommand(0, 53, 40).encode())
+        threading.Event().wait(settle_time)
+        buffer = self._ser.read(self._ser.in_waiting)
+        device_modes = {}
+        for i in range(0, len(buffer) - 5, 6):
+            reply = BinaryReply(buffer[i:i+6], True)
+            if reply.command_number == 53:
+                device_modes[reply.device_number] = reply.data
+
+        for device_number, device_mode in device_modes.items():
+            if message_ids:
+                target = device_mode | _DEVICE_MODE_MESSAGE_IDS
+            else:
+                target = device_mode & ~_DEVICE_MODE_MESSAGE_IDS
+            if target != device_mode:
+                self._ser.write(BinaryCommand(device_number, 40, target).encode())
+        # The replies to the mode changes are discarded.
+        threading.Event().wait(settle_time)
+        self._ser.reset_input_buffer()
+        return len(device_modes)
+
+    def _read_replies(self):
+        buffer = b""
+        while self._pipelined:
+            try:
+                buffer += self._ser.read(6 - len(buffer))
+            except serial.SerialException:
+                logger.exception("Reader thread stopped.")
+                self._pipelined = False
+                break
+            if len(buffer) < 6:
+                continue
+            reply = BinaryReply(buffer, True)
+            buffer = b""
+            logger.debug("< %s", reply)
+            with self._pending_lock:
+                pending = self._pending.get(reply.message_id)
+            if pending is None:
+                # Eg replies to manual moves, which have no message ID.
+                logger.debug("Discarding unrequested reply %s", reply)
+            else:
+                pending.put(reply)
+
+    def _register(self, command):
+        # Tags a command with a free message ID.  IDs 0 and 255 are
+        # left out, as devices reply with them unprompted.
+        with self._pending_lock:
+            for _ in range(254):
+                message_id = self._next_message_id
+                self._next_message_id = self._next_message_id % 254 + 1
+                if message_id not in self._pending:
+                    break
+            else:
+                raise RuntimeError("Too many commands awaiting replies.")
+            pending = _PendingReplies(command.device_number)
+            self._pending[message_id] = pending
+        command.message_id = message_id
+
+        replies = getattr(self._local, "replies", None)
+        if replies is None:
+            replies = self._local.replies = collections.deque()
+        # The thread has finished reading the replies to an earlier
+        # command to device 0 by now.
+        while replies and replies[0][1].device_number == 0:
+            self._release(*replies.popleft())
+        replies.append((message_id, pending))
+        return pending
+
+    def _release(self, message_id, pending):
+        with self._pending_lock:
+            if self._pending.get(message_id) is pending:
+                del self._pending[message_id]
+
+    def request(self, command):
+        """Writes a command in pipelined mode, without waiting for its
+        reply.
+
+        Args:
+            command: A BinaryCommand to a single device.
+
+        Returns:
+            A concurrent.futures.Future resolving to the BinaryReply.
+        """
+        if not self._pipelined:
+            raise RuntimeError("request() needs pipelined mode.")
+        if command.device_number == 0:
+            raise ValueError("request() can't be used with device 0.")
+        self.write(command)
+        message_id, pending = self._local.replies.pop()
+        pending.future.add_done_callback(lambda f: self._release(message_id, pending))
+        return pending.future
+
+    @latency.instrument('zaber.write', lambda args, kwargs, result: _command_number(args[1:]))
     def write(self, *args):
         r"""Writes a command to the port.
 
@@ -386,6 +625,8 @@ class BinarySerial(object):
                     "arguments ({0:d} given)".format(len(args)))
 
         if isinstance(message, str):
+            if self._pipelined:
+                raise TypeError("write() of a string can't be pipelined.")
             logger.debug("> %s", message)
             if len(message) != 6:
                 raise ValueError("write of a string expects length 6.")
@@ -397,6 +638,8 @@ class BinarySerial(object):
                 data = bytes(message) 
 
         elif isinstance(message, BinaryCommand):
+            if self._pipelined:
+                self._register(message)
             data = message.encode()
             logger.debug("> %s", message)
 
@@ -404,14 +647,22 @@ class BinarySerial(object):
             raise TypeError("write must be passed several integers, or a "
                     "string, list, or BinaryCommand.")
 
-        self._ser.write(data)
+        with self._write_lock:
+            self._ser.write(data)
 
+    @latency.instrument('zaber.read',
+                        lambda args, kwargs, result: result.command_number if result else None)
     def read(self, message_id = False):
         """Reads six bytes from the port and returns a BinaryReply.
 
         Args:
             message_id: True if the response is expected to have a 
-                message ID. Defaults to False.
+                message ID. Defaults to False. Ignored in pipelined
+                mode, where replies always have one.
+
+        Notes:
+            In pipelined mode this returns the next reply to a command
+            written by the calling thread.
 
         Returns:
             A BinaryCommand containing all of the information read from
@@ -421,6 +672,22 @@ class BinarySerial(object):
             zaber.serial.TimeoutError: No data was read before the 
                 specified timeout elapsed.
         """
+        if self._pipelined:
+            replies = getattr(self._local, "replies", None)
+            if not replies:
+                raise RuntimeError("No command awaiting a reply.")
+            message_id, pending = replies[0]
+            try:
+                reply = pending.get(self._reply_timeout)
+            except TimeoutError:
+                replies.popleft()
+                self._release(message_id, pending)
+                raise
+            if pending.device_number != 0:
+                replies.popleft()
+                self._release(message_id, pending)
+            return reply
+
         reply = self._ser.read(6)
         if len(reply) != 6:
             logger.debug("< Receive timeout!")
@@ -439,13 +706,15 @@ class BinarySerial(object):
 
     def close(self):
         """Closes the serial port."""
+        if self._pipelined:
+            self.set_pipelined(False)
         self._ser.close()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self._ser.close()
+        self.close()
 
     @property
     def timeout(self):
@@ -454,11 +723,13 @@ class BinarySerial(object):
         The ``timeout`` property accepts floating point numbers for
         fractional wait times.
         """
-        return self._ser.timeout
+        return self._reply_timeout
 
     @timeout.setter
     def timeout(self, t):
-        self._ser.timeout = t
+        self._reply_timeout = t
+        if not self._pipelined:
+            self._ser.timeout = t
 
     @property
     def baudrate(self):
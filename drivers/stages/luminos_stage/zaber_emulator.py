@@ -0,0 +1,543 @@
+'''
+Emulates a daisy chain of Zaber devices speaking the Binary
+protocol on a pseudo-terminal, so `LuminosStage`, `LuminosAxis`
+and `zaber.serial.binary` can be benchmarked and tested without
+hardware.
+
+The commands of `tla_constants.commands` are emulated, with the
+device mode bits that change how a device replies, including
+message IDs (bit 6), which `BinarySerial.set_pipelined` turns on.
+Other commands are answered with error 64, as by a T-LA.  Moves
+take the time of a trapezoidal speed profile given by the target
+speed and acceleration settings, positions are in microsteps of
+the current microstep resolution, commands to device 0 are
+answered by every device, and every reply is delayed by the
+processing latency and, at the given baud rate, the time taken to
+send it.
+
+The drivers run unmodified against the emulator, through a symlink
+from the device name they open to the pseudo-terminal:
+
+    python -m drivers.stages.luminos_stage.zaber_emulator \\
+        --link /dev/luminos_input --link /dev/luminos_output \\
+        --link /dev/luminos_chip
+
+or, from Python:
+
+    with ZaberBinaryEmulator(link='/dev/ttyUSB0') as emulator:
+        print(ls.find_stages())
+'''
+import argparse
+import heapq
+import math
+import os
+import pty
+import select
+import struct
+import threading
+import time
+import tty
+from . import tla_constants as tla
+
+# Binary protocol error codes, returned as the data of an Error
+# (255) reply.
+ERROR_MOVE_ABSOLUTE_INVALID = 20
+ERROR_MOVE_RELATIVE_INVALID = 21
+ERROR_SPEED_INVALID = 22
+ERROR_RESOLUTION_INVALID = 37
+ERROR_SETTING_INVALID = 53
+ERROR_COMMAND_INVALID = 64
+ERROR_BUSY = 255
+
+# The commands that return data, which are still replied to with
+# auto-reply disabled (device mode bit 0).
+_return_commands = (17, 50, 51, 52, 53, 54, 55, 60)
+
+# The settings `Return Setting` reads, by the command that sets
+# them.
+_settings = (37, 38, 39, 40, 41, 42, 43, 44, 46, 47, 48, 49)
+
+_DEVICE_MODE_HOME_STATUS = 1 << 7
+_DEVICE_MODE_DISABLE_AUTO_REPLY = 1 << 0
+_DEVICE_MODE_MOVE_TRACKING = 1 << 4
+_DEVICE_MODE_MESSAGE_IDS = 1 << 6
+
+class _Motion(object):
+    # A motion as segments of constant acceleration,
+    # `(t_0, x_0, v_0, a)`, ending at rest at `x_end` at `t_end`
+    # (or at `t_end` for moves at constant speed, at a limit).
+    def __init__(self, segments, t_end, x_end, status):
+        self.segments = segments
+        self.t_end = t_end
+        self.x_end = x_end
+        self.status = status
+
+    def _segment(self, t):
+        for segment in reversed(self.segments):
+            if segment[0] <= t:
+                return segment
+        return self.segments[0]
+
+    def position(self, t):
+        if t >= self.t_end or not self.segments:
+            return self.x_end
+        t_0, x_0, v_0, a = self._segment(t)
+        dt = t - t_0
+        return x_0 + v_0*dt + 0.5*a*dt**2
+
+    def velocity(self, t):
+        if t >= self.t_end or not self.segments:
+            return 0.
+        t_0, _, v_0, a = self._segment(t)
+        return v_0 + a*(t - t_0)
+
+def _trapezoid(t_0, x_0, x_1, speed, acceleration):
+    # The segments of a move from rest to rest.
+    d = abs(x_1 - x_0)
+    s = 1. if x_1 >= x_0 else -1.
+    if d == 0.:
+        return [], t_0
+    if not acceleration:
+        return [(t_0, x_0, s*speed, 0.)], t_0 + d/speed
+    if d <= speed**2 / acceleration:
+        t_p = math.sqrt(d/acceleration)
+        return [(t_0, x_0, 0., s*acceleration),
+                (t_0 + t_p, x_0 + s*d/2., s*acceleration*t_p, -s*acceleration)], t_0 + 2.*t_p
+    t_a = speed / acceleration
+    d_a = 0.5 * speed**2 / acceleration
+    t_c = (d - 2.*d_a) / speed
+    return [(t_0, x_0, 0., s*acceleration),
+            (t_0 + t_a, x_0 + s*d_a, s*speed, 0.),
+            (t_0 + t_a + t_c, x_1 - s*d_a, s*speed, -s*acceleration)], t_0 + 2.*t_a + t_c
+
+class EmulatedDevice(object):
+    '''
+    A single Zaber device, eg one axis of a Luminos stage.
+
+    Positions, the maximum position and speeds are in microsteps
+    of the current microstep resolution, as the protocol has them,
+    and are rescaled when it changes.
+
+    Args:
+        number (int): The device number on the daisy chain.
+        travel_microsteps (int): The range of the device, in
+            microsteps at a microstep resolution of 128.
+        device_id (int): The Return Device Id reply.
+        position_microsteps (float, None): The starting position,
+            in microsteps at a resolution of 128.  If `None`, the
+            middle of the range.  The device starts unhomed.
+        resolution (int): The microstep resolution at power up.
+        speed (int): The target speed setting at power up, in
+            units of `tla_constants.microsteps_s_per_speed_data`.
+        acceleration (int): The acceleration setting at power up,
+            in units of `tla_constants.microsteps_s2_per_acceleration_data`.
+
+    Attributes:
+        number (int): The device number.
+        moves (int): The number of moves made.
+    '''
+    def __init__(self, number, travel_microsteps, device_id=1013, position_microsteps=None,
+                 resolution=64, speed=600, acceleration=22):
+        self.number = number
+        self.device_id = device_id
+        self._travel_128 = travel_microsteps
+        self._position_128 = travel_microsteps/2. if position_microsteps is None \
+                             else position_microsteps
+        self._power_up = {37: resolution, 38: 10, 39: 0, 40: 0, 41: speed, 42: speed,
+                          43: acceleration, 46: 0, 47: 0, 48: 0, 49: 0}
+        self.moves = 0
+        self.motion_id = 0
+        self._restore_settings()
+        self._stored = [0.] * 16
+        self._memory = bytearray(128)
+
+    def _restore_settings(self):
+        self.settings = dict(self._power_up)
+        self.settings[44] = self._travel_128 * self.settings[37] // 128
+        self._position = self._position_128 * self.settings[37] / 128.
+        self._motion = None
+        self.motion_id += 1
+
+    @property
+    def message_ids(self):
+        '''
+        bool: Whether the device is in message ID mode (device
+        mode bit 6).
+        '''
+        return bool(self.settings[40] & _DEVICE_MODE_MESSAGE_IDS)
+
+    def position(self, t):
+        '''
+        The position in microsteps at time `t`.
+        '''
+        if self._motion is None:
+            return self._position
+        return self._motion.position(t)
+
+    def _status(self, t):
+        if self._motion is None or t >= self._motion.t_end:
+            return 0
+        return self._motion.status
+
+    def _speed(self):
+        return self.settings[42] * tla.microsteps_s_per_speed_data
+
+    def _acceleration(self):
+        return self.settings[43] * tla.microsteps_s2_per_acceleration_data
+
+    def _settle(self, t):
+        # Forgets a motion that has finished by `t`.
+        if self._motion is not None and t >= self._motion.t_end:
+            self._position = self._motion.x_end
+            self._motion = None
+
+    def _stop_segments(self, t):
+        # Decelerates from the motion at `t` to rest.
+        x = self.position(t)
+        v = self._motion.velocity(t) if self._motion else 0.
+        a = self._acceleration()
+        if v == 0. or not a:
+            return [], t, x
+        t_stop = abs(v) / a
+        return [(t, x, v, -math.copysign(a, v))], t + t_stop, x + 0.5*v*t_stop
+
+    def _start_motion(self, t, target, speed, status):
+        # Moves to `target`, first stopping any motion in progress.
+        segments, t_0, x_0 = self._stop_segments(t)
+        move, t_end = _trapezoid(t_0, x_0, target, speed, self._acceleration())
+        self._motion = _Motion(segments + move, t_end, float(target), status)
+        self.motion_id += 1
+        self.moves += 1
+        return t_end
+
+    def command(self, t, command_number, data):
+        '''
+        Carries out a command.
+
+        Args:
+            t (float): The time the command arrived in [s], on the
+                clock of `time.monotonic`.
+            command_number (int): The command.
+            data (int): The command data.
+
+        Returns:
+            list((float, int, int, bool)): The replies, as the time
+                they are ready, the command number, the data and
+                whether they are to a move that a later move
+                cancels.
+        '''
+        self._settle(t)
+        c = command_number
+        s = self.settings
+        maximum = s[44]
+
+        def reply(data, t_ready=t, command=c, motion=False):
+            if s[40] & _DEVICE_MODE_DISABLE_AUTO_REPLY and command not in _return_commands:
+                return []
+            return [(t_ready, command, int(round(data)), motion)]
+
+        def move(target, error):
+            if not 0 <= target <= maximum:
+                return [(t, 255, error, False)]
+            t_end = self._start_motion(t, target, self._speed(), c)
+            replies = []
+            if s[40] & _DEVICE_MODE_MOVE_TRACKING:
+                t_track = t + 0.25
+                while t_track < t_end:
+                    replies.append((t_track, 8, int(round(self._motion.position(t_track))), True))
+                    t_track += 0.25
+            return replies + reply(target, t_end, motion=True)
+
+        if c == 0:
+            # Reset: back to power up, with no reply.
+            self._position_128 = self.position(t) * 128. / s[37]
+            self._restore_settings()
+            return []
+        elif c == 1:
+            speed = s[41] * tla.microsteps_s_per_speed_data
+            t_end = self._start_motion(t, 0., speed, 1)
+            s[40] |= _DEVICE_MODE_HOME_STATUS
+            return reply(0, t_end, motion=True)
+        elif c == 2:
+            return reply(self.number)
+        elif c == 16:
+            if not 0 <= data < len(self._stored):
+                return [(t, 255, ERROR_SETTING_INVALID, False)]
+            self._stored[data] = self.position(t)
+            return reply(data)
+        elif c == 17:
+            if not 0 <= data < len(self._stored):
+                return [(t, 255, ERROR_SETTING_INVALID, False)]
+            return reply(self._stored[data])
+        elif c == 18:
+            if not 0 <= data < len(self._stored):
+                return [(t, 255, ERROR_SETTING_INVALID, False)]
+            return move(self._stored[data], ERROR_MOVE_ABSOLUTE_INVALID)
+        elif c == 20:
+            return move(data, ERROR_MOVE_ABSOLUTE_INVALID)
+        elif c == 21:
+            return move(self.position(t) + data, ERROR_MOVE_RELATIVE_INVALID)
+        elif c == 22:
+            # Constant speed, without acceleration, until a limit or
+            # a stop.
+            v = data * tla.microsteps_s_per_speed_data
+            x = self.position(t)
+            self.motion_id += 1
+            if v == 0.:
+                self._position, self._motion = x, None
+                return reply(data)
+            limit = float(maximum) if v > 0. else 0.
+            t_end = t + (limit - x) / v
+            self._motion = _Motion([(t, x, v, 0.)], t_end, limit, 22)
+            self.moves += 1
+            return reply(data) + reply(limit, t_end, 9, motion=True)
+        elif c == 23:
+            segments, t_end, x_end = self._stop_segments(t)
+            self._motion = _Motion(segments, t_end, x_end, 23)
+            self.motion_id += 1
+            return reply(x_end, t_end)
+        elif c == 35:
+            # Read or write one byte of memory: byte 3 is the
+            # address (bit 7 set to write), byte 4 the data.
+            address = data & 0x7F
+            if data & 0x80:
+                self._memory[address] = (data >> 8) & 0xFF
+            return reply(address | self._memory[address] << 8)
+        elif c == 36:
+            self._position_128 = self.position(t) * 128. / s[37]
+            self._restore_settings()
+            return reply(data)
+        elif c == 37:
+            if data not in (1, 2, 4, 8, 16, 32, 64, 128):
+                return [(t, 255, ERROR_RESOLUTION_INVALID, False)]
+            if self._status(t):
+                return [(t, 255, ERROR_BUSY, False)]
+            scale = data / s[37]
+            self._position *= scale
+            self._stored = [p*scale for p in self._stored]
+            s[44] = int(round(s[44]*scale))
+            s[37] = data
+            return reply(data)
+        elif c == 40:
+            # The home status bit is read-only.
+            s[40] = (data & ~_DEVICE_MODE_HOME_STATUS) | (s[40] & _DEVICE_MODE_HOME_STATUS)
+            return reply(s[40])
+        elif c in (41, 42):
+            if data <= 0:
+                return [(t, 255, ERROR_SPEED_INVALID, False)]
+            s[c] = data
+            return reply(data)
+        elif c in (38, 39, 43, 44, 46, 47, 48, 49):
+            s[c] = data
+            return reply(data)
+        elif c == 45:
+            self._position = float(data)
+            self._motion = None
+            return reply(data)
+        elif c == 50:
+            return reply(self.device_id)
+        elif c == 51:
+            return reply(530)
+        elif c == 52:
+            return reply(120)
+        elif c == 53:
+            if data in _settings:
+                return reply(s[data])
+            if data in (50, 51, 52, 54, 60):
+                return [(t_ready, 53, d, False) for t_ready, _, d, _ in self.command(t, data, 0)]
+            return [(t, 255, ERROR_SETTING_INVALID, False)]
+        elif c == 54:
+            return reply(self._status(t))
+        elif c == 55:
+            return reply(data)
+        elif c == 60:
+            return reply(self.position(t))
+        return [(t, 255, ERROR_COMMAND_INVALID, False)]
+
+def luminos_devices(**kwargs):
+    '''
+    The devices of a Luminos stage, numbered as `LuminosStage`
+    expects: z (1), x (2), y (3), roll (4), yaw (5) and pitch (6),
+    with the ranges of `LuminosAxisX` and friends.
+
+    The devices power up at the microstep resolution of 128 the
+    driver sets and assumes, as Luminos stages are configured;
+    the position the driver reads before it sets the resolution
+    would otherwise be at the wrong scale.
+
+    Args:
+        **kwargs: Passed on to every `EmulatedDevice`.
+
+    Returns:
+        list(EmulatedDevice): The devices.
+    '''
+    kwargs.setdefault('resolution', 128)
+    travel_microsteps = (160000, 131072, 131072, 140400, 70200, 70200)
+    return [EmulatedDevice(number, travel, **kwargs)
+            for number, travel in enumerate(travel_microsteps, 1)]
+
+class ZaberBinaryEmulator(object):
+    '''
+    A daisy chain of emulated Zaber devices on a pseudo-terminal.
+
+    Args:
+        devices (list(EmulatedDevice)): The devices on the chain.
+            If `None`, those of a Luminos stage.
+        link (str): A path to symlink to the pseudo-terminal, eg
+            `'/dev/ttyUSB0'` for `find_stages`.  An existing symlink
+            is replaced; it is removed by `close`.
+        latency_s (float): The time in [s] a device takes to
+            process a command before replying.
+        baud (int, None): The baud rate; commands and replies take
+            the time to send 6 bytes at it, and replies queue on
+            the line.  If `None`, sending takes no time.
+        packet_timeout_s (float): The gap between bytes in [s]
+            after which a partial command is discarded.
+
+    Attributes:
+        port (str): The path to open, `link` if given, else the
+            pseudo-terminal.
+        devices (list(EmulatedDevice)): The devices.
+        commands (int): The number of commands received.
+    '''
+    def __init__(self, devices=None, link=None, latency_s=1.e-3, baud=9600, packet_timeout_s=0.1):
+        self.devices = luminos_devices() if devices is None else devices
+        self.latency_s = latency_s
+        self.byte_s = 10. / baud if baud else 0.
+        self.packet_timeout_s = packet_timeout_s
+        self.commands = 0
+
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.pty = os.ttyname(self._slave)
+        self.link = link
+        if link:
+            if os.path.islink(link):
+                os.remove(link)
+            os.symlink(self.pty, link)
+        self.port = link or self.pty
+
+        self._replies = []
+        self._seq = 0
+        self._line_free = 0.
+        self._lock = threading.Condition()
+        self._running = True
+        self._threads = [threading.Thread(target=self._read_commands, name='Zaber emulator reader',
+                                          daemon=True),
+                         threading.Thread(target=self._send_replies, name='Zaber emulator writer',
+                                          daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        '''
+        Stops the emulator, closes the pseudo-terminal and removes
+        the symlink.
+        '''
+        if not self._running:
+            return
+        with self._lock:
+            self._running = False
+            self._lock.notify()
+        for thread in self._threads:
+            thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+        if self.link and os.path.islink(self.link):
+            os.remove(self.link)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _read_commands(self):
+        buffer = b''
+        t_last = 0.
+        while self._running:
+            r, _, _ = select.select([self._master], [], [], 0.05)
+            if not r:
+                continue
+            data = os.read(self._master, 1024)
+            t = time.monotonic()
+            if buffer and t - t_last > self.packet_timeout_s:
+                buffer = b''
+            t_last = t
+            buffer += data
+            while len(buffer) >= 6:
+                packet, buffer = buffer[:6], buffer[6:]
+                self._handle(t + 6*self.byte_s, packet)
+
+    def _handle(self, t, packet):
+        device_number, command_number, data = struct.unpack('<2Bl', packet)
+        self.commands += 1
+        with self._lock:
+            for device in self.devices:
+                if device_number not in (0, device.number, device.settings[48] or -1):
+                    continue
+                message_id = None
+                d = data
+                if device.message_ids:
+                    message_id = (data >> 24) & 0xFF
+                    d = data & 0x00FFFFFF
+                    if d & 0x00800000:
+                        d -= 1 << 24
+                for t_ready, c, reply_data, motion in device.command(t, command_number, d):
+                    if message_id is not None:
+                        reply_data = (reply_data & 0x00FFFFFF) | (message_id << 24)
+                        if reply_data & 0x80000000:
+                            reply_data -= 1 << 32
+                    else:
+                        reply_data = max(min(reply_data, 2**31 - 1), -2**31)
+                    reply = struct.pack('<2Bl', device.number, c, reply_data)
+                    motion_id = device.motion_id if motion else None
+                    heapq.heappush(self._replies, (t_ready + self.latency_s, self._seq, device,
+                                                   motion_id, reply))
+                    self._seq += 1
+            self._lock.notify()
+
+    def _send_replies(self):
+        with self._lock:
+            while self._running:
+                # Drop the replies of moves a later command replaced.
+                while self._replies and self._replies[0][3] is not None and \
+                        self._replies[0][3] != self._replies[0][2].motion_id:
+                    heapq.heappop(self._replies)
+                if not self._replies:
+                    self._lock.wait(0.1)
+                    continue
+                t_ready = self._replies[0][0]
+                t_sent = max(t_ready, self._line_free) + 6*self.byte_s
+                wait = t_sent - time.monotonic()
+                if wait > 0.:
+                    self._lock.wait(wait)
+                    continue
+                reply = heapq.heappop(self._replies)[4]
+                self._line_free = t_sent
+                os.write(self._master, reply)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Emulates Luminos stages (Zaber Binary '
+                                                 'protocol) on pseudo-terminals.')
+    parser.add_argument('--link', action='append', default=[],
+                        help='Path to symlink to a stage\'s pseudo-terminal, eg '
+                             '/dev/luminos_input.  Repeat for more stages.')
+    parser.add_argument('--latency-s', type=float, default=1.e-3,
+                        help='Time a device takes to process a command [s].')
+    parser.add_argument('--baud', type=int, default=9600,
+                        help='Baud rate of the emulated line; 0 for no transmission time.')
+    args = parser.parse_args()
+
+    emulators = [ZaberBinaryEmulator(link=link, latency_s=args.latency_s, baud=args.baud)
+                 for link in args.link or [None]]
+    for emulator in emulators:
+        print('%s -> %s' % (emulator.port, emulator.pty))
+    try:
+        while True:
+            time.sleep(1.)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for emulator in emulators:
+            emulator.close()
@@ -0,0 +1,316 @@
+import abc
+import functools
+import numpy as np
+from . import stage as st
+from ..utils import trace
+
+class _MoveBudgetExhausted(Exception):
+    pass
+
+class Optimiser(metaclass=abc.ABCMeta):
+    '''
+    The general interface of a direct-search optimiser.
+
+    An optimiser moves a set of axes to maximise the power
+    meter reading without scanning a full grid.  Linear axes
+    are moved in [um] and rotational axes in [degree].
+
+    Optimisers have the same `scan` interface as `Scan`, so
+    they can be used wherever a scan is used to find the
+    maximum power.
+
+    Args:
+        axes (list(Axis)): The axes to optimise.
+        power_meter (PowerMeter): The power meter to maximise.
+        steps (float, list(float)): The initial step size of
+            each axis.  A single value is used for all axes.
+        tolerances (float, list(float)): The search stops once
+            the step size of every axis is below its tolerance.
+        max_moves (int): The maximum number of moves (power
+            readings) the search may use.
+        bounds (list((float, float)), None): For each axis, the
+            (min, max) region relative to the starting position
+            to search in.  If `None`, only the axes\' limits
+            apply.
+
+    Attributes:
+        moves (int): The number of moves used by the last search.
+    '''
+    def __init__(self, axes, power_meter, steps=1., tolerances=0.05,
+                 max_moves=100, bounds=None):
+        for axis in axes:
+            assert issubclass(type(axis), st.Axis)
+
+        self.axes = axes
+        self.power_meter = power_meter
+        self.dimensions = len(axes)
+        self.steps = np.broadcast_to(np.array(steps, dtype=float), (self.dimensions,)).copy()
+        self.tolerances = np.broadcast_to(np.array(tolerances, dtype=float), (self.dimensions,)).copy()
+        self.max_moves = max_moves
+        assert bounds is None or len(bounds) == self.dimensions, 'Incorrect bounds length.'
+        self.bounds = bounds
+        self.moves = 0
+
+        self._move_funcs = []
+        self._get_pos_funcs = []
+        self._min_max = []
+        for axis in axes:
+            if issubclass(type(axis), st.AxisLinear):
+                self._move_funcs.append(axis.move_abs_um)
+                self._get_pos_funcs.append(functools.partial(axis.get_current_position_um, cached=True))
+                self._min_max.append((axis.get_position_absolute_min_um(),
+                                      axis.get_position_absolute_max_um()))
+            elif issubclass(type(axis), st.AxisRotate):
+                self._move_funcs.append(axis.move_abs_degree)
+                self._get_pos_funcs.append(functools.partial(axis.get_current_position_degree, cached=True))
+                self._min_max.append((axis.get_position_absolute_min_degree(),
+                                      axis.get_position_absolute_max_degree()))
+
+    @abc.abstractmethod
+    def _search(self, x0, p0):
+        '''
+        An implementation of the search.
+
+        The search should call `_evaluate` to measure the power
+        at a point; `_evaluate` raises once the move budget is
+        used up, which ends the search.
+
+        Args:
+            x0 (np.array): The absolute starting coordinates.
+            p0 (float): The power at `x0`.
+        '''
+        pass
+
+    def _clip(self, coord):
+        lo = np.array([mm[0] for mm in self._min_max])
+        hi = np.array([mm[1] for mm in self._min_max])
+        if self.bounds is not None:
+            lo = np.maximum(lo, self._x0 + [b[0] for b in self.bounds])
+            hi = np.minimum(hi, self._x0 + [b[1] for b in self.bounds])
+        return np.clip(coord, lo, hi)
+
+    def _evaluate(self, coord):
+        '''
+        Moves to `coord` and reads the power.  Points that have
+        already been measured are not measured again.
+
+        Returns:
+            (np.array, float): The (clipped) coordinates and the
+                power measured there.
+        '''
+        coord = self._clip(np.asarray(coord, dtype=float))
+        key = tuple(np.round(coord, 6))
+        if key in self._measured:
+            # Stop searches that only revisit points (say, stuck
+            # against a bound) from spinning forever.
+            self._revisits += 1
+            if self._revisits > 10*self.max_moves:
+                raise _MoveBudgetExhausted()
+            return coord, self._measured[key]
+
+        if self.moves >= self.max_moves:
+            raise _MoveBudgetExhausted()
+        self._move_abs(coord)
+        self.moves += 1
+        power = self.power_meter.get_power_W()
+
+        self._measured[key] = power
+        self._coords.append(coord)
+        self._powers.append(power)
+        return coord, power
+
+    def _move_abs(self, coord):
+        for point, move_abs in zip(coord, self._move_funcs):
+            move_abs(point)
+
+    @trace.traced('scan', lambda a: type(a[0]).__name__ + '.scan')
+    def scan(self, goto_max=True):
+        '''
+        Runs the search.
+
+        Args:
+            goto_max(bool): If `True`, move the axes to the maximum
+                power reading found.  If `False`, return the axes to
+                their original positions.
+
+        Returns:
+            ((np.array, np.array), (np.array, float)): The
+                coordinates of every point measured and their power
+                readings, followed by the coordinates of the maximum
+                power and the maximum power.
+        '''
+        pos_init = np.array([get_pos() for get_pos in self._get_pos_funcs])
+        self._x0 = pos_init
+        self._measured = {}
+        self._coords = []
+        self._powers = []
+        self._revisits = 0
+        self.moves = 0
+
+        # The starting point costs a reading but no move.
+        p0 = self.power_meter.get_power_W()
+        self._measured[tuple(np.round(pos_init, 6))] = p0
+        self._coords.append(pos_init)
+        self._powers.append(p0)
+
+        try:
+            self._search(np.copy(pos_init), p0)
+        except _MoveBudgetExhausted:
+            pass
+
+        coords = np.array(self._coords)
+        powers = np.array(self._powers)
+        idx = np.argmax(powers)
+        coord_max_power = (coords[idx], powers[idx])
+
+        if goto_max:
+            self._move_abs(coord_max_power[0])
+        else:
+            self._move_abs(pos_init)
+
+        return (coords, powers), coord_max_power
+
+    def __str__(self):
+        return self.__class__.__name__ + ': dim ' + str(self.dimensions) \
+            + '; axes ' + ','.join([axis.__class__.__name__ for axis in self.axes])
+
+class CoordinateAscent(Optimiser):
+    '''
+    Optimises one axis at a time.
+
+    Each axis is stepped in the direction that increases the
+    power until the power drops.  Once a pass over all the axes
+    gives no improvement, the steps are halved.
+    '''
+    def _search(self, x0, p0):
+        x, p = x0, p0
+        steps = np.copy(self.steps)
+        while np.any(steps >= self.tolerances):
+            improved = False
+            for i in range(self.dimensions):
+                if steps[i] < self.tolerances[i]:
+                    continue
+                for direction in (1., -1.):
+                    moved = False
+                    while True:
+                        x_try = np.copy(x)
+                        x_try[i] += direction*steps[i]
+                        x_try, p_try = self._evaluate(x_try)
+                        if p_try > p and not np.array_equal(x_try, x):
+                            x, p = x_try, p_try
+                            moved = improved = True
+                        else:
+                            break
+                    if moved:
+                        break
+            if not improved:
+                steps *= 0.5
+
+class PatternSearch(Optimiser):
+    '''
+    Hooke-Jeeves pattern search.
+
+    The points one step either side of the current best point
+    are polled along every axis.  After a successful poll, the
+    search tries to jump again in the same direction.  If no
+    poll point improves on the best point, the steps are halved.
+    '''
+    def _explore(self, x, p, steps):
+        for i in range(self.dimensions):
+            if steps[i] < self.tolerances[i]:
+                continue
+            for direction in (1., -1.):
+                x_try = np.copy(x)
+                x_try[i] += direction*steps[i]
+                x_try, p_try = self._evaluate(x_try)
+                if p_try > p:
+                    x, p = x_try, p_try
+                    break
+        return x, p
+
+    def _search(self, x0, p0):
+        x, p = x0, p0
+        steps = np.copy(self.steps)
+        while np.any(steps >= self.tolerances):
+            x_new, p_new = self._explore(x, p, steps)
+            if p_new <= p:
+                steps *= 0.5
+                continue
+
+            # Pattern moves: keep going in the successful direction.
+            while True:
+                x_pattern = x_new + (x_new - x)
+                x, p = x_new, p_new
+                x_try, p_try = self._evaluate(x_pattern)
+                x_try, p_try = self._explore(x_try, p_try, steps)
+                if p_try > p:
+                    x_new, p_new = x_try, p_try
+                else:
+                    break
+
+class NelderMead(Optimiser):
+    '''
+    Nelder-Mead downhill simplex (maximising).
+
+    The initial simplex is the starting point plus one point a
+    step away along each axis.  The search stops once every
+    axis\' extent of the simplex is below its tolerance.
+    '''
+    def _search(self, x0, p0):
+        simplex = [x0]
+        powers = [p0]
+        for i in range(self.dimensions):
+            x = np.copy(x0)
+            x[i] += self.steps[i]
+            x, p = self._evaluate(x)
+            simplex.append(x)
+            powers.append(p)
+
+        simplex = np.array(simplex)
+        powers = np.array(powers)
+        while True:
+            order = np.argsort(powers)[::-1]
+            simplex = simplex[order]
+            powers = powers[order]
+            if np.all(np.ptp(simplex, axis=0) < self.tolerances):
+                break
+
+            centroid = np.mean(simplex[:-1], axis=0)
+            x_r, p_r = self._evaluate(centroid + (centroid - simplex[-1]))
+            if p_r > powers[0]:
+                x_e, p_e = self._evaluate(centroid + 2.*(centroid - simplex[-1]))
+                if p_e > p_r:
+                    simplex[-1], powers[-1] = x_e, p_e
+                else:
+                    simplex[-1], powers[-1] = x_r, p_r
+            elif p_r > powers[-2]:
+                simplex[-1], powers[-1] = x_r, p_r
+            else:
+                x_c, p_c = self._evaluate(centroid + 0.5*(simplex[-1] - centroid))
+                if p_c > powers[-1]:
+                    simplex[-1], powers[-1] = x_c, p_c
+                else:
+                    # Shrink towards the best point.
+                    for i in range(1, len(simplex)):
+                        x_s = simplex[0] + 0.5*(simplex[i] - simplex[0])
+                        simplex[i], powers[i] = self._evaluate(x_s)
+
+optimisers = {
+    'coordinate': CoordinateAscent,
+    'pattern': PatternSearch,
+    'nelder-mead': NelderMead,
+}
+
+def get_optimiser(method):
+    '''
+    Gets an optimiser class by name.
+
+    Args:
+        method (str): One of \'coordinate\', \'pattern\' or
+            \'nelder-mead\'.
+
+    Returns:
+        class: The `Optimiser` class.
+    '''
+    assert method in optimisers, 'Unknown optimiser `%s`.' % method
+    return optimisers[method]
@@ -0,0 +1,173 @@
+import numpy as np
+
+class AxisCostModel(object):
+    '''
+    Model of the time an axis takes to make a move.
+
+    Moves accelerate to `speed_um_s` and decelerate back to rest
+    (a trapezoidal, or for short moves triangular, profile).
+    Rotational axes use the same model with [degree] in place
+    of [um].
+
+    Args:
+        speed_um_s (float): The maximum speed in [um/s].
+        acceleration_um_s2 (float, None): The acceleration in
+            [um/s^2].  If `None`, the axis reaches its maximum
+            speed instantly.
+        reversal_penalty_s (float): The extra time in [s] taken
+            when the axis moves in the opposite direction to its
+            previous move, say, to take up backlash.
+        overhead_s (float): The fixed time in [s] of issuing a
+            move, such as the serial round trip.  Not charged when
+            the axis doesn\'t move.
+    '''
+    __slots__ = ('speed_um_s', 'acceleration_um_s2', 'reversal_penalty_s', 'overhead_s')
+
+    def __init__(self, speed_um_s, acceleration_um_s2=None, reversal_penalty_s=0.,
+                 overhead_s=0.):
+        assert speed_um_s > 0., 'Speed must be positive.'
+        self.speed_um_s = speed_um_s
+        self.acceleration_um_s2 = acceleration_um_s2
+        self.reversal_penalty_s = reversal_penalty_s
+        self.overhead_s = overhead_s
+
+    def move_time_s(self, distance_um):
+        '''
+        The time taken to move a distance, ignoring reversals.
+
+        Args:
+            distance_um (float, np.array): Distance(s) in [um]; the
+                sign is ignored.
+
+        Returns:
+            float, np.array: The move time(s) in [s].
+        '''
+        d = np.abs(np.asarray(distance_um, dtype=float))
+        v = self.speed_um_s
+        a = self.acceleration_um_s2
+        if a:
+            d_accel = v**2 / a
+            t = np.where(d < d_accel, 2.*np.sqrt(d/a), d/v + v/a)
+        else:
+            t = d / v
+        return t + np.where(d > 0., self.overhead_s, 0.)
+
+class PathPlanner(object):
+    '''
+    Reorders a set of points to minimise the time taken to visit
+    them all.
+
+    The axes are assumed to move one after another, as `Scan`
+    moves them, so the cost of a move is the sum of the axes\'
+    move times.  Reversal penalties depend on the direction each
+    axis last moved in, so the cost of a path is evaluated along
+    the whole path.
+
+    A greedy nearest-neighbour path is built first and then
+    improved with 2-opt segment reversals.
+
+    Args:
+        cost_models (AxisCostModel, list(AxisCostModel)): The
+            cost model of each axis, or a single model used for
+            every axis.
+        max_passes (int): The maximum number of 2-opt passes.
+        two_opt_max_points (int): 2-opt is skipped for patterns
+            with more points than this, since its cost grows with
+            the cube of the number of points.
+    '''
+    def __init__(self, cost_models, max_passes=10, two_opt_max_points=150):
+        self.cost_models = cost_models
+        self.max_passes = max_passes
+        self.two_opt_max_points = two_opt_max_points
+
+    def _models(self, dimensions):
+        if isinstance(self.cost_models, AxisCostModel):
+            return [self.cost_models]*dimensions
+        assert len(self.cost_models) == dimensions, 'Incorrect number of cost models.'
+        return self.cost_models
+
+    def path_time_s(self, points, start=None):
+        '''
+        The time taken to visit `points` in order.
+
+        Args:
+            points (np.array): (N, dimensions) coordinates.
+            start (np.array, None): Where the axes start.  If
+                `None`, the first point.
+
+        Returns:
+            float: The time in [s].
+        '''
+        points = np.asarray(points, dtype=float)
+        if start is None:
+            start = points[0]
+        deltas = np.diff(np.vstack((start, points)), axis=0)
+        models = self._models(points.shape[1])
+
+        t = 0.
+        for delta, model in zip(deltas.T, models):
+            t += np.sum(model.move_time_s(delta))
+            if model.reversal_penalty_s:
+                signs = np.sign(delta[delta != 0.])
+                t += model.reversal_penalty_s * np.count_nonzero(signs[1:] != signs[:-1])
+        return t
+
+    def _nearest_neighbour(self, points, start):
+        n, dimensions = points.shape
+        models = self._models(dimensions)
+        unvisited = np.ones(n, dtype=bool)
+        order = np.empty(n, dtype=int)
+        pos = start
+        last_dir = np.zeros(dimensions)
+        for k in range(n):
+            deltas = points - pos
+            cost = np.zeros(n)
+            for i, model in enumerate(models):
+                cost += model.move_time_s(deltas[:, i])
+                if model.reversal_penalty_s and last_dir[i]:
+                    cost += model.reversal_penalty_s * (np.sign(deltas[:, i]) == -last_dir[i])
+            cost[~unvisited] = np.inf
+            idx = int(np.argmin(cost))
+            order[k] = idx
+            unvisited[idx] = False
+            moved = deltas[idx] != 0.
+            last_dir[moved] = np.sign(deltas[idx][moved])
+            pos = points[idx]
+        return order
+
+    def _two_opt(self, points, start, order):
+        best = self.path_time_s(points[order], start)
+        n = len(order)
+        for _ in range(self.max_passes):
+            improved = False
+            for i in range(n-1):
+                for j in range(i+2, n+1):
+                    candidate = np.concatenate((order[:i], order[i:j][::-1], order[j:]))
+                    t = self.path_time_s(points[candidate], start)
+                    if t < best - 1.e-12:
+                        order, best = candidate, t
+                        improved = True
+            if not improved:
+                break
+        return order
+
+    def plan(self, points, start=None):
+        '''
+        Plans the order to visit `points` in.
+
+        Args:
+            points (np.array): (N, dimensions) coordinates.
+            start (np.array, None): Where the axes start.  If
+                `None`, the origin.
+
+        Returns:
+            np.array: The indices of `points` in the order they
+                should be visited.
+        '''
+        points = np.asarray(points, dtype=float)
+        if start is None:
+            start = np.zeros(points.shape[1])
+        order = self._nearest_neighbour(points, start)
+        if len(order) <= self.two_opt_max_points:
+            order = self._two_opt(points, start, order)
+        return order
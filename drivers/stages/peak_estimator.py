@@ -0,0 +1,155 @@
+import numpy as np
+
+def argmax(coords, powers):
+    '''
+    The measured point with the highest power.
+
+    Args:
+        coords (np.array): (N, dimensions) coordinates.
+        powers (np.array): The N power readings.
+
+    Returns:
+        (np.array, float): The coordinates of the maximum and the
+            maximum power.
+    '''
+    idx = np.argmax(powers)
+    return coords[idx], powers[idx]
+
+def _steps(coords):
+    # The grid step of each axis is the smallest non-zero spacing
+    # between its coordinates.
+    steps = []
+    for c in np.asarray(coords, dtype=float).T:
+        d = np.diff(np.unique(np.round(c, 9)))
+        steps.append(np.min(d) if d.size else 1.)
+    return np.array(steps)
+
+def _fit_quadratic(coords, values, idx_max):
+    '''
+    Fits a quadratic to the points around `idx_max`.
+
+    Returns:
+        (np.array, float, np.array): The normalised offset of
+            the peak from `coords[idx_max]`, the fitted value there
+            and the steps used to normalise, or `None` if the fit
+            has no maximum near `idx_max`.
+    '''
+    steps = _steps(coords)
+    x = (coords - coords[idx_max]) / steps
+    near = np.all(np.abs(x) <= 1. + 1.e-6, axis=1)
+    x = x[near]
+    v = values[near]
+    dimensions = x.shape[1]
+    if not np.all(np.isfinite(v)):
+        return None
+
+    # Full quadratic if there are enough points, otherwise one
+    # without the cross terms (eg `Cross` patterns).
+    cross_terms = [(i, j) for i in range(dimensions) for j in range(i+1, dimensions)]
+    if len(v) < 1 + 2*dimensions + len(cross_terms):
+        cross_terms = []
+    if len(v) < 1 + 2*dimensions:
+        return None
+
+    columns = [np.ones(len(v))] + [x[:, i] for i in range(dimensions)] \
+        + [x[:, i]**2 for i in range(dimensions)] \
+        + [x[:, i]*x[:, j] for i, j in cross_terms]
+    a = np.array(columns).T
+    try:
+        p, _, rank, _ = np.linalg.lstsq(a, v, rcond=None)
+    except np.linalg.LinAlgError:
+        return None
+    if rank < a.shape[1]:
+        return None
+
+    b = p[1:1+dimensions]
+    h = np.diag(2.*p[1+dimensions:1+2*dimensions])
+    for (i, j), c in zip(cross_terms, p[1+2*dimensions:]):
+        h[i, j] = h[j, i] = c
+
+    # The peak must be a maximum inside the fitted region.
+    if np.any(np.linalg.eigvalsh(h) >= 0.):
+        return None
+    x_peak = np.linalg.solve(h, -b)
+    if np.any(np.abs(x_peak) > 1.):
+        return None
+    v_peak = p[0] + b.dot(x_peak) + 0.5*x_peak.dot(h).dot(x_peak)
+    return x_peak, v_peak, steps
+
+def paraboloid(coords, powers):
+    '''
+    Fits a paraboloid to the points around the maximum reading
+    and returns its peak.
+
+    Only the maximum and its neighbours one step either side
+    along each axis are fitted.  Falls back to `argmax` if the
+    fit has no maximum within one step of the maximum reading.
+
+    Args:
+        coords (np.array): (N, dimensions) coordinates.
+        powers (np.array): The N power readings.
+
+    Returns:
+        (np.array, float): The coordinates of the estimated peak
+            and the fitted power there.
+    '''
+    coords = np.asarray(coords, dtype=float)
+    powers = np.asarray(powers, dtype=float)
+    idx = np.argmax(powers)
+    r = _fit_quadratic(coords, powers, idx)
+    if r is None:
+        return argmax(coords, powers)
+    x_peak, p_peak, steps = r
+    return coords[idx] + x_peak*steps, p_peak
+
+def gaussian(coords, powers):
+    '''
+    Fits a Gaussian to the points around the maximum reading and
+    returns its peak.
+
+    The overlap of two Gaussian modes is Gaussian in their
+    misalignment, so this is the better model for coupling into
+    a fibre or waveguide.  The fit is a paraboloid fitted to the
+    logarithm of the power.  Falls back to `argmax` if any of the
+    powers fitted isn\'t positive or if the fit fails.
+
+    Args:
+        coords (np.array): (N, dimensions) coordinates.
+        powers (np.array): The N power readings.
+
+    Returns:
+        (np.array, float): The coordinates of the estimated peak
+            and the fitted power there.
+    '''
+    coords = np.asarray(coords, dtype=float)
+    powers = np.asarray(powers, dtype=float)
+    idx = np.argmax(powers)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_powers = np.log(powers)
+    r = _fit_quadratic(coords, log_powers, idx)
+    if r is None:
+        return argmax(coords, powers)
+    x_peak, log_p_peak, steps = r
+    return coords[idx] + x_peak*steps, np.exp(log_p_peak)
+
+estimators = {
+    'argmax': argmax,
+    'paraboloid': paraboloid,
+    'gaussian': gaussian,
+}
+
+def get_estimator(method):
+    '''
+    Gets a peak estimator by name.
+
+    Args:
+        method (str): One of \'argmax\', \'paraboloid\' or
+            \'gaussian\'.
+
+    Returns:
+        function: The estimator, taking the coordinates and powers
+            of a scan and returning the coordinates of the peak and
+            the power there.
+    '''
+    assert method in estimators, 'Unknown peak estimator `%s`.' % method
+    return estimators[method]
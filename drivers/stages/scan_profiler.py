@@ -0,0 +1,191 @@
+'''
+Breaks the wall time of a scan down into where it went, to show
+which optimisation will pay off on a rig: pipelining (move
+command time), fly-scanning (waiting for motion), shorter power
+meter averaging (detector reads) or less logging and plotting
+(I/O).
+
+The scan is traced (see `utils.trace`) and every instant of it is
+put down to what the thread running the scan was doing, or, while
+it was only waiting on other threads, to what they were doing:
+
+    (coords, powers), profile = scan.scan(profile=True)
+    print(profile)
+
+Moves are split into the command, taken to last the round trip
+of a position query to the axes, and the wait for the motion to
+finish, the rest of the move.
+'''
+import threading
+import time
+import numpy as np
+from . import stage as st
+from ..utils import trace
+
+# What the categories of the trace events are put down to; other
+# categories, eg the commands of a power meter\'s reads, are
+# attributed to the events they are made within.
+_categories = {'stage': 'move', 'power_meter': 'detector', 'io': 'io'}
+
+# Which of the other threads\' activity is shown while the scan\'s
+# thread only waits on them.
+_priority = ('detector', 'motion_wait', 'move_command', 'io')
+
+class ScanProfile(object):
+    '''
+    Where the wall time of a scan went.
+
+    The times add up to the wall time.
+
+    Attributes:
+        wall_s (float): The wall time of the scan in [s].
+        move_command_s (float): The time issuing moves in [s].
+        motion_wait_s (float): The time waiting for moves to
+            finish in [s].
+        detector_s (float): The time reading the power meter in
+            [s], including averaging.
+        io_s (float): The time logging positions and plotting in
+            [s].
+        overhead_s (float): The rest of the time, in Python, in
+            [s].
+        moves (int): The number of moves made.
+        read_calls (int): The number of calls to read the power
+            meter; a call averaging several readings counts once.
+        round_trip_s (float): The round trip time in [s] of a
+            command to the axes, as moves are split by.
+    '''
+    fields = ('move_command_s', 'motion_wait_s', 'detector_s', 'io_s', 'overhead_s')
+
+    def __init__(self, wall_s, times_s, moves, read_calls, round_trip_s):
+        self.wall_s = wall_s
+        self.move_command_s = times_s['move_command']
+        self.motion_wait_s = times_s['motion_wait']
+        self.detector_s = times_s['detector']
+        self.io_s = times_s['io']
+        self.overhead_s = times_s['overhead']
+        self.moves = moves
+        self.read_calls = read_calls
+        self.round_trip_s = round_trip_s
+
+    def as_dict(self):
+        '''
+        Returns:
+            dict: The attributes of the profile.
+        '''
+        d = {field: getattr(self, field) for field in ('wall_s',) + self.fields}
+        d.update(moves=self.moves, read_calls=self.read_calls, round_trip_s=self.round_trip_s)
+        return d
+
+    def __str__(self):
+        lines = ['%-16s %10s %6s' % ('phase', 'time [s]', '%')]
+        for field in self.fields:
+            t = getattr(self, field)
+            lines.append('%-16s %10.3f %6.1f' % (field[:-2], t, 100.*t/self.wall_s if self.wall_s else 0.))
+        lines.append('%-16s %10.3f %6.1f' % ('wall', self.wall_s, 100.))
+        lines.append('%i moves, %i read calls, %.1fms command round trip' % \
+                     (self.moves, self.read_calls, self.round_trip_s*1.e3))
+        return '\n'.join(lines)
+
+def _round_trip_s(axes, repeats=3):
+    # The quickest of a few position queries per transport, the
+    # median over the transports.
+    transports = {}
+    for axis in axes:
+        transports.setdefault(axis._get_transport(), axis)
+    round_trips = []
+    for axis in transports.values():
+        if issubclass(type(axis), st.AxisLinear):
+            query = axis._get_current_position_nm
+        else:
+            query = axis._get_current_position_arc_second
+        durations = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            query()
+            durations.append(time.perf_counter() - t0)
+        round_trips.append(min(durations))
+    return float(np.median(round_trips)) if round_trips else 0.
+
+def _phase(stack, t_us, round_trip_us):
+    # What a thread is doing, from its stack of open events.
+    for category, begin_us in reversed(stack):
+        if category == 'move':
+            return 'move_command' if t_us - begin_us < round_trip_us else 'motion_wait'
+        if category:
+            return category
+    return None
+
+def _attribute(events, tid_scan, t_start_us, t_stop_us, round_trip_us):
+    # Puts every instant between `t_start_us` and `t_stop_us` down
+    # to what the scan\'s thread was doing, innermost event first,
+    # or if nothing, to the most important activity of the others.
+    events = [e for e in events if e['ph'] in ('B', 'E')]
+    boundaries = [e['ts'] for e in events]
+    boundaries += [e['ts'] + round_trip_us for e in events
+                   if e['ph'] == 'B' and _categories.get(e['cat']) == 'move']
+    boundaries = sorted(set(t for t in boundaries if t_start_us < t < t_stop_us))
+    boundaries.append(t_stop_us)
+
+    times_s = dict.fromkeys(_priority + ('overhead',), 0.)
+    counts = {'move': 0, 'detector': 0}
+    stacks = {}
+    i = 0
+    t = t_start_us
+    for boundary in boundaries:
+        while i < len(events) and events[i]['ts'] <= t:
+            e = events[i]
+            stack = stacks.setdefault(e['tid'], [])
+            if e['ph'] == 'B':
+                category = _categories.get(e['cat'])
+                stack.append((category, e['ts']))
+                if category in counts:
+                    counts[category] += 1
+            elif stack:
+                stack.pop()
+            i += 1
+
+        phase = _phase(stacks.get(tid_scan, []), t, round_trip_us)
+        if phase is None:
+            others = [_phase(stack, t, round_trip_us) for tid, stack in stacks.items()
+                      if tid != tid_scan]
+            phase = next((p for p in _priority if p in others), 'overhead')
+        times_s[phase] += (boundary - t) * 1.e-6
+        t = boundary
+    return times_s, counts['move'], counts['detector']
+
+def profile(func, axes, *args, **kwargs):
+    '''
+    Runs a scan and profiles it.
+
+    Args:
+        func (function): The scan, eg `scan.scan`.
+        axes (list(Axis)): The axes the scan moves, whose round
+            trip time splits the moves.
+        *args: The arguments of `func`.
+        **kwargs: The keyword arguments of `func`.
+
+    Returns:
+        (object, ScanProfile): The result of `func` and the
+            profile.
+    '''
+    axes = [axis for axis in axes if issubclass(type(axis), (st.AxisLinear, st.AxisRotate))]
+    round_trip_s = _round_trip_s(axes)
+
+    was_enabled = trace.is_enabled()
+    start = trace.count()
+    trace.enable()
+    try:
+        t_start_us = trace.timestamp_us()
+        result = func(*args, **kwargs)
+        t_stop_us = trace.timestamp_us()
+    finally:
+        if not was_enabled:
+            trace.disable()
+    events = trace.get_events(start)
+    if not was_enabled:
+        # Leave the trace as it was.
+        trace.clear(start)
+
+    times_s, moves, read_calls = _attribute(events, threading.get_ident(), t_start_us, t_stop_us,
+                                            round_trip_s*1.e6)
+    return result, ScanProfile((t_stop_us - t_start_us)*1.e-6, times_s, moves, read_calls, round_trip_s)
@@ -0,0 +1,194 @@
+import abc
+import json
+import os
+import numpy as np
+
+def record_dtype(dimensions):
+    '''
+    The dtype of a scan record.
+
+    Args:
+        dimensions (int): The number of coordinates per record.
+
+    Returns:
+        np.dtype: A structured dtype with `coords`, `power` and
+            `timestamp` fields.
+    '''
+    return np.dtype([('coords', '<f8', (dimensions,)),
+                     ('power', '<f8'),
+                     ('timestamp', '<f8')])
+
+class ScanSink(object, metaclass=abc.ABCMeta):
+    '''
+    Interface for objects that store scan results as they are
+    measured.
+
+    A sink is given to `Scan.set_sink` or
+    `ScannerDesign.set_sink`, after which every reading is
+    appended to it as a (coordinates, power, timestamp) record.
+    The scans read their records back with `read` rather than
+    keeping a copy of them in memory.
+    '''
+    num_records = 0
+    @abc.abstractmethod
+    def write(self, coords, power, timestamp):
+        '''
+        Appends a record.
+
+        Args:
+            coords (np.array): The absolute coordinates of the
+                reading.
+            power (float): The power reading.
+            timestamp (float): The time of the reading in [s]
+                since the epoch.
+        '''
+        pass
+
+    @abc.abstractmethod
+    def read(self, start=0):
+        '''
+        Reads the records back.
+
+        Args:
+            start (int): The first record to read, eg
+                `num_records` before a scan started.
+
+        Returns:
+            np.array: The records as a structured array (see
+                `record_dtype`).
+        '''
+        pass
+
+    def flush(self):
+        '''
+        Makes sure all the records written so far are stored.
+        '''
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class MemorySink(ScanSink):
+    '''
+    Keeps the records in memory.  Mostly useful for testing.
+    '''
+    def __init__(self):
+        self.records = []
+
+    @property
+    def num_records(self):
+        return len(self.records)
+
+    def write(self, coords, power, timestamp):
+        self.records.append((np.array(coords, dtype=float), power, timestamp))
+
+    def read(self, start=0):
+        records = self.records[start:]
+        if not records:
+            return np.zeros(0, dtype=record_dtype(0))
+        a = np.zeros(len(records), dtype=record_dtype(len(records[0][0])))
+        for i, r in enumerate(records):
+            a[i] = r
+        return a
+
+class ChunkedBinarySink(ScanSink):
+    '''
+    Appends records to a raw binary file in chunks.
+
+    Records are fixed size (see `record_dtype`) and are buffered
+    and written to the file `chunk_size` at a time.  A JSON
+    sidecar, `filename + \'.json\'`, describes the records, so
+    the file can be read back with `read` even if the scan was
+    interrupted; at most the last unwritten chunk is lost.
+
+    Args:
+        filename (str): The file to write the records to.  It is
+            overwritten.
+        chunk_size (int): The number of records to buffer before
+            writing to the file.
+        fsync (bool): If `True`, each chunk is also synced to
+            disk rather than just handed to the operating system.
+    '''
+    def __init__(self, filename, chunk_size=256, fsync=False):
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.fsync = fsync
+        self._fs = open(filename, 'wb')
+        self._buffer = None
+        self._n = 0
+        self.num_records = 0
+
+    def __del__(self):
+        # `__init__` may have failed to open the file.
+        if getattr(self, '_fs', None):
+            self.close()
+
+    def _open(self, dimensions):
+        self.dimensions = dimensions
+        self._buffer = np.zeros(self.chunk_size, dtype=record_dtype(dimensions))
+        with open(self.filename + '.json', 'w') as fs:
+            json.dump({'dimensions': dimensions, 'fields': ['coords', 'power', 'timestamp']}, fs)
+
+    def write(self, coords, power, timestamp):
+        if self._buffer is None:
+            self._open(len(coords))
+        elif len(coords) != self.dimensions:
+            raise ValueError('Record has %i coordinates but the sink stores %i.' \
+                             % (len(coords), self.dimensions))
+
+        self._buffer[self._n] = (coords, power, timestamp)
+        self._n += 1
+        self.num_records += 1
+        if self._n == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._n and not self._fs.closed:
+            self._fs.write(self._buffer[:self._n].tobytes())
+            self._fs.flush()
+            if self.fsync:
+                os.fsync(self._fs.fileno())
+            self._n = 0
+
+    def read(self, start=0):
+        '''
+        Memory-maps the records written so far; see `read`.
+        '''
+        if self._buffer is None:
+            return np.zeros(0, dtype=record_dtype(0))
+        self.flush()
+        return read(self.filename)[start:]
+
+    def close(self):
+        if not self._fs.closed:
+            self.flush()
+            self._fs.close()
+
+def read(filename):
+    '''
+    Memory-maps a file written by `ChunkedBinarySink`.
+
+    The records are not loaded into memory until they are
+    accessed.  Any trailing partial record, from a write that was
+    interrupted, is ignored.
+
+    Args:
+        filename (str): The file the sink wrote to.
+
+    Returns:
+        np.memmap: A structured array of the records with
+            `coords`, `power` and `timestamp` fields.
+    '''
+    with open(filename + '.json', 'r') as fs:
+        header = json.load(fs)
+    dtype = record_dtype(header['dimensions'])
+    count = os.path.getsize(filename) // dtype.itemsize
+    if not count:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode='r', shape=(count,))
@@ -1,18 +1,86 @@
 import abc
+import functools
 import copy
 import os
+import time
+import threading
 import numpy as np
 import tqdm
 from collections import deque
+from concurrent import futures
 from . import stage as st
+from . import optimiser as opt
+from . import peak_estimator as pe
+from . import trajectory
+from . import scan_profiler
 from .luminos_stage import luminos_stage as ls
 from ..utils import gnuplot as gp
+from ..utils import trace
 
 
 def _unique(seq):
     seen = set()
     return [seen.add(x) or x for x in seq if x not in seen]
 
+def _get_axis_pos(axis):
+    # The (cached) position of an axis in the units scans use.
+    if issubclass(type(axis), st.AxisLinear):
+        return axis.get_current_position_um(cached=True)
+    return axis.get_current_position_degree(cached=True)
+
+def _run_concurrently(calls):
+    '''
+    Runs each `(func, args)` in `calls` in its own thread and
+    waits for them all to finish.
+
+    Returns:
+        list: The results of the calls, in order.
+    '''
+    if not calls:
+        return []
+    with futures.ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        fs = [executor.submit(func, *args) for func, args in calls]
+        return [f.result() for f in fs]
+
+def _motion_profile_um(t_s, velocity_um_s, acceleration_um_s2=None):
+    '''
+    Distance travelled after `t_s` seconds by an axis starting
+    from rest and accelerating to a constant velocity.
+
+    Args:
+        t_s (float, np.array): Time(s) since the move started.
+        velocity_um_s (float): The cruise velocity in [um/s].
+        acceleration_um_s2 (float, None): The acceleration in
+            [um/s^2].  If `None`, the axis is assumed to reach
+            its cruise velocity instantly.
+
+    Returns:
+        float, np.array: The signed distance(s) travelled in [um].
+    '''
+    t_s = np.asarray(t_s, dtype=float)
+    if not acceleration_um_s2:
+        return velocity_um_s * t_s
+    v = abs(velocity_um_s)
+    t_accel = v / acceleration_um_s2
+    d = np.where(t_s < t_accel,
+                 0.5 * acceleration_um_s2 * t_s**2,
+                 v * (t_s - 0.5*t_accel))
+    return np.sign(velocity_um_s) * d
+
+def _motion_time_s(distance_um, velocity_um_s, acceleration_um_s2=None):
+    '''
+    Time taken to travel `distance_um` from rest with the
+    profile described in `_motion_profile_um`.
+    '''
+    distance_um = abs(distance_um)
+    v = abs(velocity_um_s)
+    if not acceleration_um_s2:
+        return distance_um / v
+    d_accel = v**2 / (2.*acceleration_um_s2)
+    if distance_um <= d_accel:
+        return np.sqrt(2.*distance_um / acceleration_um_s2)
+    return v / acceleration_um_s2 + (distance_um - d_accel) / v
+
 class ScannerDesign:
     '''
     A list-style object containing a group of `scan` objects.
@@ -20,11 +88,13 @@ class ScannerDesign:
     Supports performing various nested scans and chains of scans.
     '''
     def __init__(self):
-        self._get_pos_list = []
+        self._axes_list = []
         self._set_pos_list = []
 
         self._steps = deque()
         self._scan_types = deque()
+        self._step_options = {}
+        self.stopped = None
 
     def _add(self, scans):
         '''
@@ -40,7 +110,7 @@ class ScannerDesign:
         self._scan_types.append('scans')
 
         for scan in scans:
-            self._get_pos_list_add(scan._get_pos_funcs)
+            self._axes_list_add(scan.axes)
             self._set_pos_list_add(scan._move_funcs)
 
     def _add_nested(self, nested_scan, outer_scan):
@@ -56,9 +126,9 @@ class ScannerDesign:
         self._steps.append((nested_scan, outer_scan))
         self._scan_types.append('nested')
 
-        self._get_pos_list_add(nested_scan._get_pos_funcs)
+        self._axes_list_add(nested_scan.axes)
         self._set_pos_list_add(nested_scan._move_funcs)
-        self._get_pos_list_add(outer_scan._get_pos_funcs)
+        self._axes_list_add(outer_scan.axes)
         self._set_pos_list_add(outer_scan._move_funcs)
 
     def _add_nested_each_max(self, nested_scans, outer_scan):
@@ -75,15 +145,139 @@ class ScannerDesign:
         self._scan_types.append('nested_goto_max')
 
         for nested_scan in nested_scans:
-            self._get_pos_list_add(nested_scan._get_pos_funcs)
+            self._axes_list_add(nested_scan.axes)
             self._set_pos_list_add(nested_scan._move_funcs)
-        self._get_pos_list_add(outer_scan._get_pos_funcs)
+        self._axes_list_add(outer_scan.axes)
         self._set_pos_list_add(outer_scan._move_funcs)
 
-    def _get_pos_list_add(self, get_pos_list):
-        self._get_pos_list.extend(get_pos_list)
-        self._get_pos_list = _unique(self._get_pos_list)
-        return self._get_pos_list
+    def _add_alternating(self, scans, max_rounds=5, tolerance=0.01):
+        '''
+        Adds an alternating scan step.  Each scan in `scans`
+        should move a different stage.  The scans are run in turn,
+        each going to its maximum while the others hold theirs,
+        until a round improves the power by less than `tolerance`.
+
+        This replaces a nested scan costing N_1*N_2 moves by one
+        costing about k*(N_1+N_2) moves for k rounds.  Moves of
+        the different stages outside the scans themselves, such as
+        applying offsets and restoring positions, are made in
+        parallel threads.
+
+        The step returns the same structure as a nested step with
+        `scans[0]` outermost: the coordinates of each scan at every
+        reading followed by the readings, and the coordinates of
+        each scan at the maximum followed by the maximum power.
+
+        Args:
+            scans(list(Scan)): The scans to alternate between.
+                `Optimiser` objects can be used too.
+            max_rounds(int): The maximum number of rounds.
+            tolerance(float): The relative power improvement below
+                which the rounds stop.
+        '''
+        self._step_options[len(self._steps)] = {'max_rounds': max_rounds,
+                                                'tolerance': tolerance}
+        self._steps.append((scans, None))
+        self._scan_types.append('alternating')
+
+        for scan in scans:
+            self._axes_list_add(scan.axes)
+            self._set_pos_list_add(scan._move_funcs)
+
+    def _scans(self):
+        '''
+        All the `Scan` objects used by the design, in the
+        order they were added.
+        '''
+        scans = []
+        for inner, outer in self._steps:
+            if isinstance(inner, Scan):
+                scans.append(inner)
+            else:
+                scans.extend(inner)
+            if outer:
+                scans.append(outer)
+        return _unique(scans)
+
+    def set_pipeline(self, pipeline=True, settle_s=0., latch_s=None):
+        '''
+        Enables or disables pipelined move/measure execution for
+        every scan in the design.  See `Scan.set_pipeline`.
+
+        Outer scans of nested steps always run serially since their
+        per-point function moves the stages.
+        '''
+        for scan in self._scans():
+            if isinstance(scan, Scan):
+                scan.set_pipeline(pipeline, settle_s, latch_s)
+
+    def set_fly(self, fly=True, velocity_um_s=None, acceleration_um_s2=None):
+        '''
+        Enables or disables fly-scanning for every scan in the
+        design.  See `Scan.set_fly`.
+        '''
+        for scan in self._scans():
+            if isinstance(scan, Scan):
+                scan.set_fly(fly, velocity_um_s, acceleration_um_s2)
+
+    def set_clip(self, clip=True):
+        '''
+        Sets whether every scan in the design clips its pattern
+        to the limits of the axes.  See `Scan.set_clip`.
+        '''
+        for scan in self._scans():
+            if isinstance(scan, Scan):
+                scan.set_clip(clip)
+
+    def set_sink(self, sink):
+        '''
+        Streams the readings of every scan in the design to a
+        sink.  See `Scan.set_sink`.
+
+        The readings of the scans nested in a `_add_nested` step
+        are recorded with the coordinates of the outer scan
+        prepended to their own.
+        '''
+        for scan in self._scans():
+            if isinstance(scan, Scan):
+                scan.set_sink(sink)
+
+    def set_stop(self, threshold_W=None, expected_max_W=None, fraction=0.9, drop_dB=None):
+        '''
+        Sets the stop criteria of every scan in the design.  See
+        `Scan.set_stop`.
+
+        Once a scan reaches the threshold, the rest of the design,
+        including the remaining points of any outer scan, is
+        skipped and `stopped` is set to \'threshold\'.
+        '''
+        for scan in self._scans():
+            if isinstance(scan, Scan):
+                scan.set_stop(threshold_W, expected_max_W, fraction, drop_dB)
+
+    def set_peak_estimator(self, method='argmax'):
+        '''
+        Sets the peak estimator of every scan in the design.  See
+        `Scan.set_peak_estimator`.
+
+        Nested steps estimate the peak over the outer and inner
+        coordinates together, and steps going to the maximum of
+        each inner scan estimate it over the outer coordinates from
+        the best power at each of their points.
+        '''
+        for scan in self._scans():
+            if isinstance(scan, Scan):
+                scan.set_peak_estimator(method)
+
+    def _threshold_reached(self, scans):
+        if any([getattr(s, 'stopped', None) == 'threshold' for s in scans]):
+            self.stopped = 'threshold'
+        return self.stopped is not None
+
+    def _axes_list_add(self, axes_list):
+        self._axes_list.extend(axes_list)
+        self._axes_list = _unique(self._axes_list)
+        return self._axes_list
 
     def _set_pos_list_add(self, set_pos_list):
         self._set_pos_list.extend(set_pos_list)
@@ -91,7 +285,14 @@ class ScannerDesign:
         return self._set_pos_list
 
     def _get_stages_pos(self):
-        pos = [get_pos() for get_pos in self._get_pos_list]
+        # Refresh stale axes a stage at a time, so stages that can
+        # read all their axes at once do so.
+        stages = _unique([axis._stage for axis in self._axes_list if axis._stage])
+        for stage in stages:
+            names = [name for name, axis in stage.axes_physical.items()
+                     if axis in self._axes_list]
+            stage._sync_positions(names, True)
+        pos = [_get_axis_pos(axis) for axis in self._axes_list]
         return pos
 
     def _restore_stages_pos(self, pos):
@@ -106,6 +307,8 @@ class ScannerDesign:
         coords_pows = []
         for scan in scans:
             coords_pows.append(scan.scan(goto_max))
+            if self._threshold_reached([scan]):
+                break
 
         # Measure power at end of scans.
         pow_final_uW = scans[-1].power_meter.get_power_uW()
@@ -126,24 +329,46 @@ class ScannerDesign:
                 s_tmp[i] = copy.copy(s.offsets)
                 s.offsets = []
 
-        # Do scan.
-        coords_for_each, coords_pows = outer_scan.traverse_pattern(scan.scan,
-            kwargs={'goto_max': False})
+        # Check the scan at every point of the outer scan before
+        # starting, rather than failing part way through.
+        outer_coords = outer_scan._get_coords()
+        outer_axes = outer_scan._axes_moved()
+        starts = np.tile([get_pos() for get_pos in scan._get_pos_funcs], (len(outer_coords), 1))
+        for i, axis in enumerate(scan._axes_moved()):
+            if axis in outer_axes:
+                starts[:, i] = outer_coords[:, outer_axes.index(axis)]
+        scan._get_coords(starts)
+
+        # Do scan.  With a sink, the readings are read back from it
+        # afterwards rather than kept.
+        sink = scan.sink
+        start = sink.num_records if sink else 0
+        def scan_at_point():
+            scan._sink_prefix = outer_scan._coord
+            (coords, powers), _ = scan.scan(goto_max=False)
+            return None if sink else (coords, powers)
+        try:
+            coords_for_each, coords_pows = outer_scan.traverse_pattern(scan_at_point,
+                pipeline=False, stop=lambda r: self._threshold_reached([scan]))
+        finally:
+            scan._sink_prefix = []
         print()
 
-        # Sort all coords from both scans.
-        coords_sorted = []
-        for coord_for_each, coord_pow in zip(coords_for_each, coords_pows):
-            for c, p in zip(coord_pow[0][0], coord_pow[0][1]):
-                comb = (coord_for_each, c, p)
-                coords_sorted.append(comb)
-        coords_sorted_T =  np.array(coords_sorted).T
-        idx_max_pow = np.argmax(coords_sorted_T[2])
+        # Combine the coords from both scans.
+        if sink:
+            records = sink.read(start)
+            coords_comb = records['coords']
+            powers = records['power']
+        else:
+            coords_comb = np.concatenate([np.hstack((np.tile(c_o, (len(p), 1)), c))
+                                          for c_o, (c, p) in zip(coords_for_each, coords_pows)])
+            powers = np.concatenate([p for _, p in coords_pows])
+        n = outer_scan.pattern_flat.shape[1]
+        coords_sorted_T = (coords_comb[:, :n], coords_comb[:, n:], powers)
 
         # Determine the max power coordinates, and the max power.
-        for_every_coord_max_pow = coords_sorted_T[0][idx_max_pow]
-        scan_coord_max_pow = coords_sorted_T[1][idx_max_pow]
-        max_pow = coords_sorted_T[2][idx_max_pow]
+        for_every_coord_max_pow, scan_coord_max_pow, max_pow = \
+            self._get_coord_max_power_nested(scan, outer_scan, coords_comb, powers)
 
         # If goto_max not set or below threshold, restore original positions.
         pow_final_uW = scan.power_meter.get_power_uW()
@@ -158,51 +383,148 @@ class ScannerDesign:
         r = coords_sorted_T, (for_every_coord_max_pow, scan_coord_max_pow, max_pow)
 
         # Restore offsets
-        if s_tmp[0] != None:
+        if s_tmp[0] is not None:
             outer_scan.offsets = s_tmp[0]
-        if s_tmp[1] != None:
+        if s_tmp[1] is not None:
             scan.offsets = s_tmp[1]
 
         return r
 
+    def _get_coord_max_power_nested(self, scan, outer_scan, coords, powers):
+        # The peak of a nested scan, from one estimator over the
+        # outer and inner coordinates together, split back into the
+        # outer coordinates, the inner coordinates and the power.
+        coord, power = scan._peak_estimator(np.asarray(coords), powers)
+        axes = outer_scan._axes_moved() + scan._axes_moved()
+        if len(axes) == len(coord):
+            coord = trajectory.validate(axes, coord, clip=True)
+        n = outer_scan.pattern_flat.shape[1]
+        return coord[:n], coord[n:], power
+
     def _scan_nested_each_max(self, scans, outer_scan, goto_max=False):
         # Get initial pos.
         pos_init = self._get_stages_pos()
 
         # Do scan.
-        max_pow_pos = []
-        max_pows = []
         def scan_all():
             for scan in scans:
+                scan._sink_prefix = outer_scan._coord
                 _, coord_max_pow = scan.scan(goto_max=True)
-            max_pow_pos.append(self._get_stages_pos())
-            max_pows.append(coord_max_pow[1])
-            return coord_max_pow
-
-        outer_scan.traverse_pattern(scan_all)
-
-        # Find max.
-        idx_mp = np.argmax(max_pows)
+                if scan.stopped == 'threshold':
+                    break
+            return self._get_stages_pos(), coord_max_pow[1]
+
+        try:
+            coords, results = outer_scan.traverse_pattern(scan_all, pipeline=False,
+                stop=lambda r: self._threshold_reached(scans))
+        finally:
+            for scan in scans:
+                scan._sink_prefix = []
+
+        # Find max, from the best power at each point of the outer
+        # scan, and take the positions of the inner scans' axes from
+        # the point nearest it.
+        max_pow_coord, max_pow = outer_scan._get_coord_max_power(
+            coords, np.array([r[1] for r in results]))
+        idx_mp = np.argmin(np.sum((coords - max_pow_coord)**2, axis=1))
+        max_pow_pos = list(results[idx_mp][0])
+        for axis, p in zip(outer_scan._axes_moved(), max_pow_coord):
+            if axis in self._axes_list:
+                max_pow_pos[self._axes_list.index(axis)] = p
 
         # Move to max pos if specified.
         if goto_max:
             self._restore_stages_pos(pos_init)
-            self._restore_stages_pos(max_pow_pos[idx_mp])
+            self._restore_stages_pos(max_pow_pos)
         else:
             self._restore_stages_pos(pos_init)
 
-        return max_pow_pos[idx_mp], max_pows[idx_mp]
+        return max_pow_pos, max_pow
 
-    def scan(self, goto_max=True):
-        for (scans, outer_scan), scan_type in zip(self._steps, self._scan_types):
-            if scan_type == 'nested':
-                res = self._scan_nested(scans, outer_scan, goto_max)
-            elif scan_type == 'nested_goto_max':
-                res = self._scan_nested_each_max(scans, outer_scan, goto_max)
-            elif scan_type == 'scans':
-                res = self._scan(scans, goto_max)
-            else:
-                assert False
+    def _scan_alternating(self, scans, goto_max=True, max_rounds=5, tolerance=0.01):
+        # Get initial pos of each scan's axes.
+        pos_init = [np.array([get_pos() for get_pos in s._get_pos_funcs]) for s in scans]
+
+        # Apply offsets once, moving all the stages together.
+        s_tmp = [None]*len(scans)
+        moves = []
+        for i, (s, pos) in enumerate(zip(scans, pos_init)):
+            if len(getattr(s, 'offsets', [])):
+                moves.append((s._move_abs, (pos + s.offsets,)))
+                s_tmp[i] = copy.copy(s.offsets)
+                s.offsets = []
+        _run_concurrently(moves)
+
+        # Alternate until the power stops improving.  Every reading
+        # is kept with the positions of all the scans' axes, the
+        # other scans holding theirs.
+        coords_pows = []
+        max_pows = []
+        for _ in range(max_rounds):
+            for k, s in enumerate(scans):
+                held = [np.array([get_pos() for get_pos in s_j._get_pos_funcs]) for s_j in scans]
+                r = s.scan(goto_max=True)
+                (coords, powers), _ = r
+                powers = np.asarray(powers, dtype=float)
+                coords_all = [np.asarray(coords) if j == k else np.tile(pos, (len(powers), 1))
+                              for j, pos in enumerate(held)]
+                coords_pows.append((coords_all, powers))
+                if self._threshold_reached([s]):
+                    break
+            max_pow = r[1][1]
+            converged = len(max_pows) and max_pow - max_pows[-1] <= tolerance*abs(max_pows[-1])
+            max_pows.append(max_pow)
+            if converged or self.stopped:
+                break
+
+        max_pow_pos = [np.array([get_pos() for get_pos in s._get_pos_funcs]) for s in scans]
+
+        if not goto_max:
+            _run_concurrently([(s._move_abs, (pos,)) for s, pos in zip(scans, pos_init)])
+
+        # Restore offsets
+        for s, offsets in zip(scans, s_tmp):
+            if offsets is not None:
+                s.offsets = offsets
+
+        # The same structure as `_scan_nested` returns.
+        coords_T = [np.concatenate([c[j] for c, _ in coords_pows]) for j in range(len(scans))]
+        powers_T = np.concatenate([p for _, p in coords_pows])
+        return tuple(coords_T) + (powers_T,), tuple(max_pow_pos) + (max_pows[-1],)
+
+    @trace.traced('scan', lambda a: type(a[0]).__name__ + '.scan')
+    def scan(self, goto_max=True, profile=False):
+        '''
+        Runs every step of the design.
+
+        Args:
+            goto_max(bool): If `True`, finish at the maximum power
+                found.  If `False`, return to the starting position.
+            profile(bool): If `True`, also return a
+                `scan_profiler.ScanProfile` of where the time of
+                the scans went.
+
+        Returns:
+            The result of the last step, and, if `profile`, the
+                profile.
+        '''
+        if profile:
+            return scan_profiler.profile(self.scan, self._axes_list, goto_max)
+        self.stopped = None
+        for i, ((scans, outer_scan), scan_type) in enumerate(zip(self._steps, self._scan_types)):
+            with trace.span('step %i %s' % (i, scan_type), 'scan'):
+                if scan_type == 'nested':
+                    res = self._scan_nested(scans, outer_scan, goto_max)
+                elif scan_type == 'nested_goto_max':
+                    res = self._scan_nested_each_max(scans, outer_scan, goto_max)
+                elif scan_type == 'scans':
+                    res = self._scan(scans, goto_max)
+                elif scan_type == 'alternating':
+                    res = self._scan_alternating(scans, goto_max, **self._step_options[i])
+                else:
+                    assert False
+            if self.stopped:
+                break
 
         return res
 
@@ -236,8 +558,13 @@ class Scan(metaclass=abc.ABCMeta):
 
     A scan object consists of a set of axes, a pattern function
     defining the path of the axes, as well as a power meter.
+
+    If a `path_planner.PathPlanner` is given, the points of the
+    pattern are visited in the order it plans rather than the
+    order `_pattern()` generates them in.  Results are always
+    returned in the order of `pattern_flat`.
     '''
-    def __init__(self, axes, power_meter, offsets=[], *args, **kwargs):
+    def __init__(self, axes, power_meter, offsets=[], *args, path_planner=None, **kwargs):
         for axis in axes:
             assert issubclass(type(axis), st.Axis) or not axis
 
@@ -250,9 +577,15 @@ class Scan(metaclass=abc.ABCMeta):
         self.pattern = self.__class__._pattern(*args, **kwargs)
 
         # Flat array of coords
-        flat_shape = (np.product(self.pattern.shape[:-1]), self.pattern.shape[-1])
+        flat_shape = (np.prod(self.pattern.shape[:-1]), self.pattern.shape[-1])
         self.pattern_flat = np.copy(self.pattern).reshape(flat_shape)
 
+        # Order to visit the points of `pattern_flat` in.
+        if path_planner:
+            self._path_order = path_planner.plan(self.pattern_flat)
+        else:
+            self._path_order = np.arange(self.pattern_flat.shape[0])
+
         # Determine if move_abs_um or move_abs_degree
         self._move_funcs = []
         self._get_pos_funcs = []
@@ -260,15 +593,23 @@ class Scan(metaclass=abc.ABCMeta):
         for axis in axes:
             if issubclass(type(axis), st.AxisLinear):
                 self._move_funcs.append(axis.move_abs_um)
-                self._get_pos_funcs.append(axis.get_current_position_um)
+                self._get_pos_funcs.append(functools.partial(axis.get_current_position_um, cached=True))
                 self._min_max.append((axis.get_position_absolute_min_um(),
                                       axis.get_position_absolute_max_um()))
             elif issubclass(type(axis), st.AxisRotate):
                 self._move_funcs.append(axis.move_abs_degree)
-                self._get_pos_funcs.append(axis.get_current_position_degree)
+                self._get_pos_funcs.append(functools.partial(axis.get_current_position_degree, cached=True))
                 self._min_max.append((axis.get_position_absolute_min_degree(),
                                       axis.get_position_absolute_max_degree()))
 
+        self._coord = None
+        self.set_clip(False)
+        self.set_pipeline(False)
+        self.set_fly(False)
+        self.set_sink(None)
+        self.set_stop()
+        self.set_peak_estimator('argmax')
+
     @staticmethod
     @abc.abstractmethod
     def _pattern(*args, **kwargs):
@@ -287,7 +628,134 @@ class Scan(metaclass=abc.ABCMeta):
         '''
         pass
 
-    def traverse_pattern(self, func=None, args=[], kwargs={}):
+    def set_pipeline(self, pipeline=True, settle_s=0., latch_s=None):
+        '''
+        Enables or disables pipelined move/measure execution.
+
+        When pipelined, the function called at each point (normally
+        the power meter read) runs on a worker thread, and the
+        stages are moved to the next point once the reading has
+        latched, while the rest of the read, such as the bus round
+        trip of the reply, completes.
+
+        Args:
+            pipeline(bool): `True` to pipeline, `False` to move and
+                measure strictly one after the other.
+            settle_s(float): Time [s] to wait after each move before
+                measuring.
+            latch_s(float, None): Time [s] the measurement needs to
+                be left alone after it has started, before the stages
+                may be moved to the next point.  This should be set to
+                the detector's integration (and averaging) time.  It
+                must be given to pipeline, as there is nothing to
+                overlap with the next move without it.
+        '''
+        assert not pipeline or (latch_s is not None and latch_s > 0.), \
+            'A positive latch time must be given to pipeline.'
+        self.pipeline = pipeline
+        self.settle_s = settle_s
+        self.latch_s = latch_s
+
+    def set_clip(self, clip=True):
+        '''
+        Sets what is done with a pattern that would take an axis
+        beyond its limits.
+
+        The whole pattern is checked, with reversed axes and
+        offsets accounted for, before the first move, so a scan
+        is never abandoned part way through.
+
+        Args:
+            clip(bool): `True` to clip the pattern to the limits of
+                the axes, `False` to refuse to scan it and throw a
+                `ValueError`.
+        '''
+        self.clip = clip
+
+    def set_sink(self, sink):
+        '''
+        Streams the power readings of `scan` to a sink.
+
+        Each reading is written to the sink as soon as it is
+        measured, as a record of its absolute coordinates, power
+        and timestamp, so the data of a long scan survives the
+        scan being interrupted.  When fly-scanning, every raw
+        reading is recorded at its reconstructed position.
+
+        Args:
+            sink(scan_sink.ScanSink, None): The sink to write to,
+                or `None` to stop recording.
+        '''
+        self.sink = sink
+        self._sink_prefix = []
+
+    def _record(self, coord, power, timestamp):
+        if self.sink:
+            self.sink.write(np.concatenate((self._sink_prefix, coord)), power, timestamp)
+
+    def set_stop(self, threshold_W=None, expected_max_W=None, fraction=0.9, drop_dB=None):
+        '''
+        Sets criteria for `scan` to stop before the whole pattern
+        has been traversed.  The scan still goes to the maximum of
+        the points it measured.
+
+        After a scan, `stopped` is \'threshold\' if it stopped
+        because the power reached the threshold, \'drop\' if it
+        stopped because the power dropped, and `None` otherwise.
+        Designs abort all their remaining scans when one of their
+        scans reaches the threshold.
+
+        Args:
+            threshold_W(float, None): Stop once the power reaches
+                this level.
+            expected_max_W(float, None): Stop once the power
+                reaches `fraction` of this expected maximum.
+            fraction(float): See `expected_max_W`.
+            drop_dB(float, None): Stop once the power falls this
+                many [dB] below the maximum measured so far in the
+                scan, ie once the scan has gone past the peak.
+                Only suits patterns that pass the peak once, such
+                as `Line`.
+        '''
+        thresholds = []
+        if threshold_W is not None:
+            thresholds.append(threshold_W)
+        if expected_max_W is not None:
+            thresholds.append(fraction*expected_max_W)
+        self.stop_threshold_W = min(thresholds) if thresholds else None
+        self.stop_drop_dB = drop_dB
+        self.stopped = None
+
+    def set_peak_estimator(self, method='argmax'):
+        '''
+        Sets how the maximum power position is found from the scan
+        data.
+
+        \'argmax\' takes the point with the highest reading, so the
+        result is quantised to the pattern.  \'paraboloid\' and
+        \'gaussian\' fit the readings around it and take the peak
+        of the fit, which lets coarse patterns land between their
+        points.  See `peak_estimator`.
+
+        Args:
+            method(str): \'argmax\', \'paraboloid\' or \'gaussian\'.
+        '''
+        self.peak_estimator = method
+        self._peak_estimator = pe.get_estimator(method)
+
+    def _check_stop(self, power):
+        if self.stop_threshold_W is not None and power >= self.stop_threshold_W:
+            self.stopped = 'threshold'
+        elif self.stop_drop_dB is not None:
+            self._running_max_W = max(self._running_max_W, power)
+            if self._running_max_W > 0. and \
+                    power < self._running_max_W * 10.**(-self.stop_drop_dB/10.):
+                self.stopped = 'drop'
+        return self.stopped is not None
+
+    @trace.traced('scan', lambda a: type(a[0]).__name__ + '.traverse_pattern')
+    def traverse_pattern(self, func=None, args=[], kwargs={}, pipeline=None, record=False,
+                         stop=None):
         '''
         Sequentially move the stages to each point in the pattern
         returned by `_pattern()`, calling `func(*args, **kwargs)`
@@ -297,51 +765,353 @@ class Scan(metaclass=abc.ABCMeta):
             func(function): The function to call at each point.
             args(list): The arguments to pass to `func`.
             kwargs(dict): The kwargs to pass to `func`.
+            pipeline(bool, None): Whether to overlap `func` with the
+                move to the next point.  If `None`, the setting from
+                `set_pipeline` is used.  Must be `False` if `func`
+                moves any stages.
+            record(bool): If `True`, each result is written to the
+                sink set by `set_sink` as soon as it is measured.
+                `func` must then return a number.  If a sink is
+                set, the results are not also kept in memory, and
+                `None` is returned in place of their list; read them
+                back from the sink.
+            stop(function, None): Called with each result of
+                `func`; the traversal ends as soon as it returns
+                `True`.
 
         Returns:
             (list, list): The first list is a flattened version
                 of the pattern coordinates, and the second list
-                contains the results of calling func.
+                contains the results of calling func.  If the
+                traversal was stopped, only the points visited are
+                included.
         '''
+        if pipeline is None:
+            pipeline = self.pipeline
+
+        coords = self._get_coords()
+        sinking = bool(func and record and self.sink)
+
+        # Visit the points in the planned order, but return the
+        # results in the pattern's order.
+        _luminos_xy_speeds = self._set_luminos_xy_speeds()
+        try:
+            if func and pipeline:
+                results_path = self._traverse_pipelined(coords[self._path_order], func, args,
+                                                        kwargs, record, stop, sinking)
+            else:
+                results_path = []
+                # Python floats are quicker than NumPy scalars through
+                # the axes\' unit conversions.
+                for coord in tqdm.tqdm(coords[self._path_order].tolist(), ncols=80):
+                    self._move_abs(coord)
+                    result = None
+                    if func:
+                        if self.settle_s:
+                            time.sleep(self.settle_s)
+                        result = func(*args, **kwargs)
+                        if record:
+                            self._record(coord, result, time.time())
+                    results_path.append(None if sinking else result)
+                    if stop and stop(result):
+                        break
+        finally:
+            self._restore_luminos_xy_speeds(_luminos_xy_speeds)
+        visited = np.sort(self._path_order[:len(results_path)])
+        if sinking:
+            results = None
+        else:
+            results = [None]*coords.shape[0]
+            for i, r in zip(self._path_order, results_path):
+                results[i] = r
+            results = [results[i] for i in visited]
+        coords = coords[visited]
+
+        return coords, results
+
+    def _set_luminos_xy_speeds(self):
         # Backup and set xy axis speeds.
         _luminos_xy_speeds = deque()
-        _luminos_xy_accel = deque()
         for axis in self.axes:
             if issubclass(type(axis), (ls.LuminosAxisX, ls.LuminosAxisY)):
                 _luminos_xy_speeds.append(axis.get_speed())
                 _luminos_xy_speeds.append(axis.get_acceleration())
                 axis.set_speed(3000)
                 axis.set_acceleration(100)
+        return _luminos_xy_speeds
 
-        axes_pos = np.array([get_pos() for get_pos in self._get_pos_funcs])
-
-        # Apply offset
-        if len(self.offsets):
-            axes_pos += self.offsets
-
-        coords = np.array([coord+axes_pos for coord in self.pattern_flat])
-
-        for (min, max), coords_axis, axis in zip(self._min_max, coords.T, self.axes):
-            assert np.all(min <= coords_axis), \
-                'Pattern exceeds %s-axis minimum range.' % axis.name
-            assert np.all(coords_axis <= max), \
-                'Pattern exceeds %s-axis maximum range.' % axis.name
-
-        results = [None]*coords.shape[0]
-        for i, coord in enumerate(tqdm.tqdm(coords, ncols=80)):
-            self._move_abs(coord)
-            if func:
-                results[i] = func(*args, **kwargs)
-
+    def _restore_luminos_xy_speeds(self, _luminos_xy_speeds):
         # Restore xy axis speeds.
         for axis in self.axes:
             if issubclass(type(axis), (ls.LuminosAxisX, ls.LuminosAxisY)):
                 axis.set_speed(_luminos_xy_speeds.popleft())
                 axis.set_acceleration(_luminos_xy_speeds.popleft())
 
-        return coords, results
+    def _get_coords(self, axes_pos=None):
+        '''
+        The absolute coordinates of the pattern around the
+        current position, after applying the offsets, checked (or
+        clipped) against the limits of the axes.
 
-    def scan(self, goto_max=True):
+        Args:
+            axes_pos(np.array, None): The positions to take the
+                pattern around instead of the current position,
+                one per row, say, for each point of an outer scan.
+                The offsets are not applied to them.
+
+        Returns:
+            np.array: The coordinates, `(points, axes)`, or
+                `(positions, points, axes)` if `axes_pos` is given.
+        '''
+        if axes_pos is None:
+            axes_pos = np.array([get_pos() for get_pos in self._get_pos_funcs])
+
+            # Apply offset
+            if len(self.offsets):
+                axes_pos += self.offsets
+            coords = self.pattern_flat + axes_pos
+        else:
+            coords = self.pattern_flat + np.asarray(axes_pos)[:, None, :]
+
+        return trajectory.validate(self._axes_moved(), coords, self.clip)
+
+    def _axes_moved(self):
+        # The axes `_move_abs` moves, one per coordinate.
+        return [axis for axis in self.axes if issubclass(type(axis), (st.AxisLinear, st.AxisRotate))]
+
+    def _traverse_pipelined(self, coords, func, args, kwargs, record=False, stop=None,
+                            sinking=False):
+        # With `sinking`, the results are only recorded, and `None`
+        # is kept for each.
+        results = []
+
+        def measure(latched):
+            latched.set()
+            return time.time(), func(*args, **kwargs)
+
+        def collect(i):
+            t, result = pending.result()
+            results.append(None if sinking else result)
+            if record:
+                self._record(coords[i], result, t)
+            return stop and stop(result)
+
+        # Measure on the power meter's transport thread, as
+        # `instruments_async.AsyncPowerMeter` does, so the reads stay
+        # in order with any others.
+        executor = st._get_executor(self.power_meter or self)
+        pending = None
+        try:
+            for i, coord in enumerate(tqdm.tqdm(coords, ncols=80)):
+                self._move_abs(coord)
+                if self.settle_s:
+                    time.sleep(self.settle_s)
+
+                # The previous measurement must have finished before
+                # the next one starts, otherwise it would be taken at
+                # the wrong point.
+                if pending and collect(i-1):
+                    pending = None
+                    break
+
+                # Don't move on until the detector has latched the
+                # reading for this point.
+                latched = threading.Event()
+                pending = executor.submit(measure, latched)
+                latched.wait()
+                time.sleep(self.latch_s)
+
+            if pending:
+                collect(coords.shape[0]-1)
+                pending = None
+        finally:
+            # Don't leave a reading running if a move failed.
+            if pending:
+                futures.wait([pending])
+
+        return results
+
+    def set_fly(self, fly=True, velocity_um_s=None, acceleration_um_s2=None):
+        '''
+        Enables or disables fly-scanning.
+
+        When fly-scanning, each row of the pattern is executed as
+        a single constant velocity move while the power meter is
+        read continuously.  The position of every reading is
+        reconstructed from its host timestamp and the motion
+        profile, and the readings are then interpolated onto the
+        pattern points.  Only patterns whose rows move a single
+        linear axis, such as `Rectangle` and `Line`, can be flown.
+
+        Args:
+            fly(bool): `True` to fly-scan, `False` to stop at
+                every point.
+            velocity_um_s(float): The velocity [um/s] to move
+                along each row at.
+            acceleration_um_s2(float, None): The acceleration
+                [um/s^2] of the row axis.  If `None`, it is read
+                from the axis, if the axis knows it.  The axis is
+                given a run-up of this length before each row so
+                the row itself is at constant velocity.
+        '''
+        if fly:
+            assert velocity_um_s and velocity_um_s > 0., \
+                'A positive fly-scan velocity must be given.'
+        self.fly = fly
+        self.fly_velocity_um_s = velocity_um_s
+        self.fly_acceleration_um_s2 = acceleration_um_s2
+        self.fly_samples = []
+
+    def _fly_rows(self):
+        '''
+        Splits `pattern_flat` into rows that can each be flown as
+        one constant velocity move.
+
+        Returns:
+            (int, np.array): The index of the axis that moves
+                along the rows, and an array with the indices into
+                `pattern_flat` of each row.
+        '''
+        if self.pattern.ndim == 3:
+            num_rows, row_len = self.pattern.shape[:2]
+        else:
+            num_rows, row_len = 1, self.pattern_flat.shape[0]
+        rows = np.arange(num_rows*row_len).reshape(num_rows, row_len)
+
+        rows_coords = self.pattern_flat[rows]
+        moving = np.any(np.ptp(rows_coords, axis=1) > 1.e-9, axis=0)
+        if np.count_nonzero(moving) != 1:
+            raise ValueError('Pattern rows must move along a single axis to be flown.')
+        fast = int(np.argmax(moving))
+        if not issubclass(type(self.axes[fast]), st.AxisLinear):
+            raise ValueError('Only linear axes can be flown.')
+
+        for row_coords in rows_coords[:, :, fast]:
+            d = np.diff(row_coords)
+            if not (np.all(d > 0.) or np.all(d < 0.)):
+                raise ValueError('Pattern rows must be monotonic to be flown.')
+
+        return fast, rows
+
+    @trace.traced('scan', lambda a: type(a[0]).__name__ + '.traverse_pattern_fly')
+    def traverse_pattern_fly(self, func, args=[], kwargs={}, record=False, stop=None):
+        '''
+        Fly-scan version of `traverse_pattern`.
+
+        Each row of the pattern is a single constant velocity
+        move during which `func(*args, **kwargs)` is called
+        repeatedly.  `func` must return a number.
+
+        The raw readings of each row are stored in `fly_samples`
+        as `(positions, values)` arrays, where `positions` are the
+        absolute reconstructed coordinates of each reading.  If
+        `record` is `True`, the raw readings are also written to
+        the sink set by `set_sink`.  If `stop` is given, it is
+        called with every raw reading and the traversal ends after
+        the row in which it first returns `True`.
+
+        A `ValueError` is raised if fewer readings are taken along
+        a row than it has points, say, because the velocity is too
+        high for how long `func` takes.
+
+        Returns:
+            (list, list): The first list is a flattened version
+                of the pattern coordinates, and the second list
+                contains `func`'s readings interpolated onto them.
+        '''
+        fast, rows = self._fly_rows()
+        axis = self.axes[fast]
+        coords = self._get_coords()
+
+        _luminos_xy_speeds = self._set_luminos_xy_speeds()
+        try:
+            v = self.fly_velocity_um_s
+            a = self.fly_acceleration_um_s2
+            if a is None:
+                a = axis.get_acceleration_um_s2()
+            run_up_um = v**2 / (2.*a) if a else 0.
+            lo, hi = self._min_max[fast]
+
+            # Check the overrun past the end of every row up front.
+            ends_um = coords[rows[:, -1], fast]
+            directions = np.where(ends_um > coords[rows[:, 0], fast], 1., -1.)
+            trajectory.validate([axis], (ends_um + directions*run_up_um)[:, None])
+
+            results = [None]*coords.shape[0]
+            self.fly_samples = []
+            for row in tqdm.tqdm(rows, ncols=80):
+                row_coords = coords[row]
+                start_um = row_coords[0, fast]
+                end_um = row_coords[-1, fast]
+                direction = 1. if end_um > start_um else -1.
+
+                # Run up to the start of the row.
+                pre_um = start_um - direction*run_up_um
+                pre_um = min(max(pre_um, lo), hi)
+                coord = np.copy(row_coords[0])
+                coord[fast] = pre_um
+                self._move_abs(coord)
+
+                positions_um, values, timestamps = self._fly_row(axis, pre_um, end_um, direction*v,
+                                                                 a, func, args, kwargs)
+
+                positions = np.tile(row_coords[0], (len(positions_um), 1))
+                positions[:, fast] = positions_um
+                self.fly_samples.append((positions, values))
+                if record:
+                    for position, value, timestamp in zip(positions, values, timestamps):
+                        self._record(position, value, timestamp)
+
+                # Interpolating needs the readings to be at least as
+                # dense as the pattern.
+                if len(values) < len(row):
+                    raise ValueError('Only %i readings were taken along a row of %i points; '
+                                     'lower the fly-scan velocity.' % (len(values), len(row)))
+
+                idx = np.argsort(positions_um)
+                row_values = np.interp(row_coords[:, fast], positions_um[idx], values[idx])
+                for i, value in zip(row, row_values):
+                    results[i] = value
+
+                if stop and any([stop(value) for value in values]):
+                    break
+        finally:
+            self._restore_luminos_xy_speeds(_luminos_xy_speeds)
+
+        visited = np.sort(rows[:len(self.fly_samples)].ravel())
+        return coords[visited], [results[i] for i in visited]
+
+    def _fly_row(self, axis, start_um, end_um, velocity_um_s,
+                 acceleration_um_s2, func, args, kwargs):
+        duration_s = _motion_time_s(end_um - start_um, velocity_um_s, acceleration_um_s2)
+
+        times_s = []
+        values = []
+        t_0 = time.monotonic()
+        t_0_epoch = time.time()
+        axis.move_vel_um_s(velocity_um_s)
+        while time.monotonic() - t_0 < duration_s:
+            t_a = time.monotonic()
+            values.append(func(*args, **kwargs))
+            times_s.append(0.5*(t_a + time.monotonic()) - t_0)
+        t_stop_s = time.monotonic() - t_0
+        stop_um = axis.stop_um()
+
+        # Reconstruct the positions from the motion profile, and
+        # spread any mismatch with the actual stop position (start
+        # up latency, velocity rounding) linearly over the row.
+        times_s = np.array(times_s)
+        values = np.array(values, dtype=float)
+        positions_um = start_um + _motion_profile_um(times_s, velocity_um_s, acceleration_um_s2)
+        stop_model_um = start_um + _motion_profile_um(t_stop_s, velocity_um_s, acceleration_um_s2)
+        if acceleration_um_s2:
+            stop_model_um += np.sign(velocity_um_s) * velocity_um_s**2 / (2.*acceleration_um_s2)
+        positions_um += (stop_um - stop_model_um) * times_s / t_stop_s
+
+        return positions_um, values, t_0_epoch + times_s
+
+    @trace.traced('scan', lambda a: type(a[0]).__name__ + '.scan')
+    def scan(self, goto_max=True, profile=False):
         '''
         Traverse the pattern returned by `_pattern()` and
         measure the power at each point.
@@ -351,20 +1121,42 @@ class Scan(metaclass=abc.ABCMeta):
                 power reading measured after the scan.  If `False`,
                 return the axes to their original positions (where
                 they were before starting scan).
+            profile(bool): If `True`, also return a
+                `scan_profiler.ScanProfile` of where the time of
+                the scan went.
 
         Returns:
             ((list, list), (2-tuple, float)): The first list is a
                 flattened version of the pattern coordinates, and
                 the second list contains power readings.  The 2-tuple
                 are the (x,y) coordinates of the maximum power of the
-                scan, and the float is the maximum power.
+                scan, and the float is the maximum power.  If
+                `profile`, the result and the profile.  If a sink
+                is set and the scan is not flown, the coordinates
+                and readings are read back from the sink, in the
+                order they were measured.
         '''
+        if profile:
+            return scan_profiler.profile(self.scan, self._axes_moved(), goto_max)
+
         # Store initial position.
         pos_init = np.array([get_pos() for get_pos in self._get_pos_funcs])
 
         # Traverse pattern and get max power.
-        coords, powers = self.traverse_pattern(self.power_meter.get_power_W)
-        powers = np.array(powers)
+        self.stopped = None
+        self._running_max_W = -np.inf
+        if self.fly:
+            coords, powers = self.traverse_pattern_fly(self.power_meter.get_power_W,
+                                                       record=True, stop=self._check_stop)
+        else:
+            start = self.sink.num_records if self.sink else 0
+            coords, powers = self.traverse_pattern(self.power_meter.get_power_W, record=True,
+                                                   stop=self._check_stop)
+            if powers is None:
+                records = self.sink.read(start)
+                coords = records['coords'][:, len(self._sink_prefix):]
+                powers = records['power']
+        powers = np.asarray(powers)
         coord_max_power = self._get_coord_max_power(coords, powers)
 
         # Either goto max or restore the initial position.
@@ -380,10 +1172,16 @@ class Scan(metaclass=abc.ABCMeta):
         #assert len(coord) == self.dimensions
         for point, move_abs in zip(coord, self._move_funcs):
             move_abs(point)
+        self._coord = coord
 
     def _get_coord_max_power(self, coords, powers):
-        idx = np.argmax(powers)
-        return coords[idx], powers[idx]
+        coord, power = self._peak_estimator(np.asarray(coords), powers)
+        # Fitted peaks can lie up to a step outside the pattern, so
+        # keep them within the axes' range.
+        axes = self._axes_moved()
+        if len(axes) == len(coord):
+            coord = trajectory.validate(axes, coord, clip=True)
+        return coord, power
 
     def __str__(self):
         return self.__class__.__name__ + ': dim ' + str(self.dimensions) \
@@ -397,32 +1195,45 @@ class Rectangle(Scan):
     '''
     def __init__(self, axis_1, axis_2, power_meter,
                  axis_1_pts, axis_2_pts, axis_1_step, axis_2_step,
-                 offset=(0,0), meander=True, origin='c'):
+                 offset=(0,0), meander=True, origin='c', path_planner=None):
         axes = [axis_1, axis_2]
         Scan.__init__(self, axes, power_meter, offset,
                       axis_1_pts, axis_2_pts,
                       axis_1_step, axis_2_step,
-                      meander, origin)
+                      meander, origin, path_planner=path_planner)
 
-    def scan(self, goto_max=False, plot=False):
+    def scan(self, goto_max=False, plot=False, profile=False):
+        if profile:
+            return scan_profiler.profile(self.scan, self._axes_moved(), goto_max, plot)
+        if plot:
+            # The pattern is taken around the position the scan starts at.
+            pos_init = np.array([get_pos() for get_pos in self._get_pos_funcs])
+            if len(self.offsets):
+                pos_init += self.offsets
         r = Scan.scan(self, goto_max)
         (coords, powers), _ = r
         if plot:
-            np.savetxt(plot, np.c_[self.pattern_flat.T[0], self.pattern_flat.T[1], powers], '%.6e', ',')
-            root, _ = os.path.splitext(plot)
-            filename_png = root + '.png'
-            plot_args = {
-                'filename': plot,
-                'filename_png': filename_png,
-                'axis_1': self.axes[0].name,
-                'axis_2': self.axes[1].name
-            }
-            path = os.path.abspath(__file__)
-            dir_path = os.path.dirname(path)
-            gp.Gnuplot(dir_path + '/scanner.gpi', plot_args)
-            os.system('display %s' % filename_png)
+            with trace.span('plot', 'io'):
+                self._plot_scan(plot, coords - pos_init, powers)
         return r
 
+    def _plot_scan(self, plot, pattern, powers):
+        # `pattern` are the points visited, relative to the start, so
+        # only those are plotted if the scan was stopped early.
+        np.savetxt(plot, np.c_[pattern.T[0], pattern.T[1], powers], '%.6e', ',')
+        root, _ = os.path.splitext(plot)
+        filename_png = root + '.png'
+        plot_args = {
+            'filename': plot,
+            'filename_png': filename_png,
+            'axis_1': self.axes[0].name,
+            'axis_2': self.axes[1].name
+        }
+        path = os.path.abspath(__file__)
+        dir_path = os.path.dirname(path)
+        gp.Gnuplot(dir_path + '/scanner.gpi', plot_args)
+        os.system('display %s' % filename_png)
+
     @staticmethod
     def _pattern(axis_1_pts, axis_2_pts, axis_1_step, axis_2_step, meander, *args):
         pts = []
@@ -446,7 +1257,7 @@ class Rectangle(Scan):
 
     @staticmethod
     def plot(pattern, filename='pattern.dat'):
-        flat_shape = (np.product(pattern.shape[:-1]), pattern.shape[-1])
+        flat_shape = (np.prod(pattern.shape[:-1]), pattern.shape[-1])
         pattern_flat = np.copy(pattern).reshape(flat_shape)
         np.savetxt(filename, pattern_flat)
         filename_image, _ = os.path.splitext(filename)
@@ -463,12 +1274,12 @@ class Rectangle(Scan):
 
 class RectangleXY(Rectangle):
     def __init__(self, stage, power_meter, x_pts, y_pts, x_step, y_step,
-                 offset=(0,0), meander=True, origin='c'):
+                 offset=(0,0), meander=True, origin='c', path_planner=None):
         axis_1 = stage.axes['x']
         axis_2 = stage.axes['y']
         Rectangle.__init__(self, axis_1, axis_2, power_meter,
                            y_pts, x_pts, y_step, x_step,
-                           offset, meander, origin)
+                           offset, meander, origin, path_planner)
 
     @staticmethod
     def _pattern(axis_1_pts, axis_2_pts, axis_1_step, axis_2_step, meander, origin):
@@ -512,15 +1323,15 @@ class RectangleXY(Rectangle):
 class Diamond(Rectangle):
     def __init__(self, axis_1, axis_2, power_meter,
                  axis_1_pts, axis_2_pts, axis_1_step, axis_2_step,
-                 offset=(0,0), meander=True, origin='c'):
-        Rectangle.__init__(axis_1, axis_2, power_meter,
+                 offset=(0,0), meander=True, origin='c', path_planner=None):
+        Rectangle.__init__(self, axis_1, axis_2, power_meter,
                            axis_1_pts, axis_2_pts, axis_1_step, axis_2_step,
-                           offset=(0,0), meander=True, origin='c')
+                           offset, meander, origin, path_planner)
 
     @staticmethod
     def _pattern(axis_1_pts, axis_2_pts,
                  axis_1_step, axis_2_step,
-                 meander):
+                 meander, *args):
         pattern = Rectangle._pattern(axis_1_pts, axis_2_pts,
                                      axis_1_step, axis_2_step,
                                      meander)
@@ -530,9 +1341,10 @@ class Diamond(Rectangle):
 
 
 class Line(Scan):
-    def __init__(self, axis, power_meter, axis_pts, axis_step, origin='c'):
+    def __init__(self, axis, power_meter, axis_pts, axis_step, origin='c', path_planner=None):
         self.origin = origin
-        Scan.__init__(self, [axis], power_meter, [], axis_pts, axis_step, origin)
+        Scan.__init__(self, [axis], power_meter, [], axis_pts, axis_step, origin,
+                      path_planner=path_planner)
 
     @staticmethod
     def _pattern(axis_pts, axis_step, origin='c'):
@@ -555,8 +1367,9 @@ class OptimiseRectZ(ScannerDesign):
                  offset=(0,0)):
         ScannerDesign.__init__(self)
 
-        # Always step backwards in z.
-        if axis_z_step >= 0:
+        # Always step backwards in z, unless z approaches every
+        # point from one side anyway (see `AxisLinear.set_backlash`).
+        if axis_z_step >= 0 and not stage.z.get_approach():
             axis_z_step = -axis_z_step
 
         rect = Rectangle(stage.x, stage.y, power_meter, axis_x_pts,
@@ -569,9 +1382,10 @@ class OptimiseRectZ(ScannerDesign):
 class Cross(Scan):
     def __init__(self, axis_1, axis_2, power_meter,
                  axis_1_pts, axis_2_pts, axis_1_step, axis_2_step,
-                 offset=(0,0)):
+                 offset=(0,0), path_planner=None):
         Scan.__init__(self, [axis_1, axis_2,], power_meter, offset,
-                      axis_1_pts, axis_2_pts, axis_1_step, axis_2_step)
+                      axis_1_pts, axis_2_pts, axis_1_step, axis_2_step,
+                      path_planner=path_planner)
 
 
     @staticmethod
@@ -591,11 +1405,11 @@ class Cross(Scan):
 class CrossXY(Cross):
     def __init__(self, stage, power_meter, axis_x_pts,
                  axis_y_pts, axis_x_step, axis_y_step,
-                 offset=(0,0)):
+                 offset=(0,0), path_planner=None):
         Cross.__init__(self, stage.x, stage.z, power_meter,
                        axis_x_pts, axis_y_pts,
                        axis_x_step, axis_y_step,
-                       offset)
+                       offset, path_planner)
 
 
 class Line2(ScannerDesign):
@@ -619,8 +1433,9 @@ class OptimiseLine2XY_Z(ScannerDesign):
                  offset=(0,0)):
         ScannerDesign.__init__(self)
 
-        # Always step backwards in z.
-        if axis_z_step >= 0:
+        # Always step backwards in z, unless z approaches every
+        # point from one side anyway (see `AxisLinear.set_backlash`).
+        if axis_z_step >= 0 and not stage.z.get_approach():
             axis_z_step = -axis_z_step
 
         line2 = Line2(stage.x, stage.y, power_meter,
@@ -632,15 +1447,154 @@ class OptimiseLine2XY_Z(ScannerDesign):
         self._add_nested_each_max(ns, lz)
 
 
+class CoarseToFine(ScannerDesign):
+    '''
+    Scans a coarse grid, recentres on its maximum and repeats
+    with the steps shrinking geometrically until they reach the
+    target resolution.
+
+    Each level scans the same number of points, so the number of
+    moves grows with the logarithm of the ratio of the coarse
+    step to the resolution rather than with the square of the
+    number of points a single fine grid would need.  For a level
+    to always contain the maximum of the level before, it must
+    span at least two of that level\'s steps.
+
+    Args:
+        axis_1 (Axis): The first axis.
+        axis_2 (Axis): The second axis.
+        power_meter (PowerMeter): The power meter to maximise.
+        axis_1_pts (int): The number of points along `axis_1` of
+            each level.
+        axis_2_pts (int): The number of points along `axis_2` of
+            each level.
+        axis_1_step (float): The step of the coarse level along
+            `axis_1`.
+        axis_2_step (float): The step of the coarse level along
+            `axis_2`.
+        axis_1_resolution (float): The step of the final level
+            along `axis_1`.
+        axis_2_resolution (float): The step of the final level
+            along `axis_2`.
+        shrink (float): The factor the steps are multiplied by
+            from one level to the next.
+        pattern (str): \'rect\' to scan `Rectangle` grids or
+            \'cross\' to scan `Cross` patterns.
+        offset (tuple): Offset applied before the coarse level.
+        meander (bool): Whether the `Rectangle` grids meander.
+    '''
+    def __init__(self, axis_1, axis_2, power_meter,
+                 axis_1_pts, axis_2_pts, axis_1_step, axis_2_step,
+                 axis_1_resolution, axis_2_resolution,
+                 shrink=0.5, pattern='rect', offset=(0,0), meander=True):
+        ScannerDesign.__init__(self)
+
+        assert 0. < shrink < 1., 'Shrink factor must be between 0 and 1.'
+        for pts in (axis_1_pts, axis_2_pts):
+            assert (pts-1)*shrink >= 2., 'Levels do not overlap; increase points or shrink.'
+        assert pattern in ('rect', 'cross'), 'Unknown pattern `%s`.' % pattern
+
+        num_levels = 1
+        for step, resolution in ((axis_1_step, axis_1_resolution),
+                                 (axis_2_step, axis_2_resolution)):
+            if step > resolution:
+                num_levels = max(num_levels,
+                                 int(np.ceil(np.log(resolution/step) / np.log(shrink))) + 1)
+
+        self.levels = []
+        for level in range(num_levels):
+            step_1 = max(axis_1_step * shrink**level, axis_1_resolution)
+            step_2 = max(axis_2_step * shrink**level, axis_2_resolution)
+            level_offset = offset if level == 0 else (0,0)
+            if pattern == 'rect':
+                s = Rectangle(axis_1, axis_2, power_meter, axis_1_pts, axis_2_pts,
+                              step_1, step_2, level_offset, meander)
+            else:
+                s = Cross(axis_1, axis_2, power_meter, axis_1_pts, axis_2_pts,
+                          step_1, step_2, level_offset)
+            self.levels.append(s)
+
+        self._add(self.levels)
+
+    @trace.traced('scan', lambda a: type(a[0]).__name__ + '.scan')
+    def scan(self, goto_max=True, profile=False):
+        '''
+        Scans every level, going to the maximum of each before
+        scanning the next.
+
+        Args:
+            goto_max(bool): If `True`, finish at the maximum of the
+                finest level.  If `False`, return to the starting
+                position.
+            profile(bool): If `True`, also return a
+                `scan_profiler.ScanProfile` of where the time of
+                the scans went.
+
+        Returns:
+            list: The result of `Scan.scan` for each level; the
+                last is the finest.  Levels after one that reaches
+                the stop threshold are skipped.  If `profile`, the
+                results and the profile.
+        '''
+        if profile:
+            return scan_profiler.profile(self.scan, self._axes_list, goto_max)
+        pos_init = self._get_stages_pos()
+        self.stopped = None
+        coords_pows = []
+        for level in self.levels:
+            coords_pows.append(level.scan(goto_max=True))
+            if self._threshold_reached([level]):
+                break
+        if not goto_max:
+            self._restore_stages_pos(pos_init)
+        return coords_pows
+
+
 class ScanRoutines(object):
-    def __init__(self, stages, power_meter):
+    '''
+    Common alignment and imaging routines for an input and
+    output stage.
+
+    The alignment routines scan coarse-to-fine (see
+    `CoarseToFine`) by default: `goto_max_rect_*` and
+    `goto_max_cross_*` cover the span of their grid in levels of
+    `coarse_to_fine_pts` points down to its step, and
+    `find_waveguide_*` refine the maximum of their search down to
+    `resolution_um`.  Pass `coarse_to_fine=False` for the single
+    fixed-step grid.
+
+    Args:
+        stages (Stages): The stages; must have an `input` and an
+            `output` stage.
+        power_meter (PowerMeter): The power meter to read.
+        pipeline (bool): If `True`, the power meter is read while
+            the stages move to the next point.  See
+            `Scan.set_pipeline`.
+        settle_s (float): Time [s] to wait after each move before
+            reading the power meter.
+        latch_s (float, None): Time [s] the power meter reading must
+            be left alone before the next move is issued, normally
+            its integration time.  Must be given if `pipeline`.
+    '''
+    # The points along each axis of every coarse-to-fine level.
+    coarse_to_fine_pts = 5
+
+    def __init__(self, stages, power_meter, pipeline=False, settle_s=0., latch_s=None):
         self.inp = stages.input
         self.out = stages.output
         self.pm = power_meter
+        self.pipeline = pipeline
+        self.settle_s = settle_s
+        self.latch_s = latch_s
+
+    def _configure(self, scan):
+        scan.set_pipeline(self.pipeline, self.settle_s, self.latch_s)
+        return scan
 
     def _take_image(self, stage, x_pts, y_pts, x_step_um, y_step_um,
                     filename=None, goto_max=False, meander=False):
         r = RectangleXY(stage, self.pm, x_pts, y_pts, x_step_um, y_step_um, (0,0), meander, 'c')
+        self._configure(r)
         pos_pows =  r.scan(goto_max, filename)
         return pos_pows
 
@@ -654,19 +1608,172 @@ class ScanRoutines(object):
         return self._take_image(self.out, x_pts, y_pts, x_step_um, y_step_um,
                                 filename, goto_max, False)
 
-    def _goto_max_rect(self, stage, x_pts, y_pts, x_step_um, y_step_um):
-        c = RectangleXY(stage, self.pm, x_pts, y_pts, x_step_um, y_step_um, meander=False)
+    def _coarse_to_fine(self, axis_1, axis_2, step_1_um, step_2_um, resolution_1_um,
+                        resolution_2_um, pattern='rect', meander=True):
+        # Scans coarse-to-fine, returning the result of the finest
+        # level in the form a single `Scan` returns it.
+        pts = self.coarse_to_fine_pts
+        c = CoarseToFine(axis_1, axis_2, self.pm, pts, pts, step_1_um, step_2_um,
+                         resolution_1_um, resolution_2_um, pattern=pattern, meander=meander)
+        self._configure(c)
+        return c.scan(True)[-1]
+
+    def _goto_max_grid(self, stage, axis_1, axis_2, x_pts, y_pts, x_step_um, y_step_um,
+                       coarse_to_fine, pattern, meander=True):
+        # Covers the span of the grid down to its step in levels of
+        # `coarse_to_fine_pts` points, unless the grid is no bigger.
+        pts = self.coarse_to_fine_pts
+        if coarse_to_fine and max(x_pts, y_pts) > pts:
+            return self._coarse_to_fine(axis_1, axis_2,
+                                        max((x_pts-1)*x_step_um/(pts-1), x_step_um),
+                                        max((y_pts-1)*y_step_um/(pts-1), y_step_um),
+                                        x_step_um, y_step_um, pattern, meander)
+        if pattern == 'rect':
+            c = RectangleXY(stage, self.pm, x_pts, y_pts, x_step_um, y_step_um, meander=meander)
+        else:
+            c = CrossXY(stage, self.pm, x_pts, y_pts, x_step_um, y_step_um)
+        self._configure(c)
         pos_pows = c.scan(True)
         return pos_pows
 
-    def goto_max_rect_input(self, x_pts, y_pts, x_step_um, y_step_um):
-        return self._goto_max_rect(self.inp, x_pts, y_pts, x_step_um, y_step_um)
+    def _goto_max_rect(self, stage, x_pts, y_pts, x_step_um, y_step_um, coarse_to_fine=True):
+        # Rows all run the same way so the axes settle the same way
+        # at every point, unless the axes already approach every
+        # point from one side (see `AxisLinear.set_backlash`), in
+        # which case the quicker meander is used.
+        meander = bool(stage.x.get_approach() and stage.y.get_approach())
+        return self._goto_max_grid(stage, stage.x, stage.y, x_pts, y_pts, x_step_um, y_step_um,
+                                   coarse_to_fine, 'rect', meander)
 
-    def goto_max_rect_output(self, x_pts, y_pts, x_step_um, y_step_um):
-        return self._goto_max_rect(self.out, x_pts, y_pts, x_step_um, y_step_um)
+    def goto_max_rect_input(self, x_pts, y_pts, x_step_um, y_step_um, coarse_to_fine=True):
+        '''
+        Goes to the maximum power within a rectangle of the input
+        stage.
+
+        Args:
+            x_pts (int): The points of the grid along x.
+            y_pts (int): The points of the grid along y.
+            x_step_um (float): The step of the grid along x.
+            y_step_um (float): The step of the grid along y.
+            coarse_to_fine (bool): If `True`, the rectangle is
+                scanned coarse-to-fine down to the step of the
+                grid (see `ScanRoutines`), otherwise every point of
+                the grid is measured.
+
+        Returns:
+            ((np.array, np.array), (np.array, float)): The result
+                of the grid, or of the finest coarse-to-fine level.
+        '''
+        return self._goto_max_rect(self.inp, x_pts, y_pts, x_step_um, y_step_um, coarse_to_fine)
+
+    def goto_max_rect_output(self, x_pts, y_pts, x_step_um, y_step_um, coarse_to_fine=True):
+        '''
+        Same as `goto_max_rect_input` for the output stage.
+        '''
+        return self._goto_max_rect(self.out, x_pts, y_pts, x_step_um, y_step_um, coarse_to_fine)
+
+    def _goto_max_optimise(self, stage, axes, steps_um, tolerances_um, max_moves,
+                           method, bounds_um=None):
+        o = opt.get_optimiser(method)([stage.axes[a] for a in axes], self.pm,
+                                      steps_um, tolerances_um, max_moves, bounds_um)
+        pos_pows = o.scan(True)
+        return pos_pows
+
+    def goto_max_optimise_input(self, step_um=1., tolerance_um=0.05, max_moves=50,
+                                method='pattern', axes=('x', 'y')):
+        '''
+        Maximises the power by moving the input stage with a
+        direct-search optimiser rather than a grid scan.
+
+        Args:
+            step_um (float, list(float)): The initial step size.
+            tolerance_um (float, list(float)): The final step size.
+            max_moves (int): The maximum number of moves to use.
+            method (str): 'pattern', 'nelder-mead' or
+                'coordinate'.  See `optimiser.get_optimiser`.
+            axes (tuple(str)): The names of the stage axes to
+                move.
+        '''
+        return self._goto_max_optimise(self.inp, axes, step_um, tolerance_um,
+                                       max_moves, method)
+
+    def goto_max_optimise_output(self, step_um=1., tolerance_um=0.05, max_moves=50,
+                                 method='pattern', axes=('x', 'y')):
+        '''
+        Same as `goto_max_optimise_input` for the output stage.
+        '''
+        return self._goto_max_optimise(self.out, axes, step_um, tolerance_um,
+                                       max_moves, method)
+
+    def _goto_max_rect_search(self, stage, x_pts, y_pts, x_step_um, y_step_um,
+                              method, max_moves):
+        # Search the same region as the equivalent grid, starting
+        # with steps a quarter of its size and finishing below the
+        # grid's resolution, for at most the grid's number of moves.
+        x_span_um = (x_pts-1) * x_step_um
+        y_span_um = (y_pts-1) * y_step_um
+        bounds_um = [(-x_span_um/2., x_span_um/2.), (-y_span_um/2., y_span_um/2.)]
+        steps_um = [max(x_span_um/4., x_step_um), max(y_span_um/4., y_step_um)]
+        tolerances_um = [x_step_um/2., y_step_um/2.]
+        if max_moves is None:
+            max_moves = x_pts * y_pts
+        return self._goto_max_optimise(stage, ('x', 'y'), steps_um, tolerances_um,
+                                       max_moves, method, bounds_um)
+
+    def goto_max_rect_search_input(self, x_pts, y_pts, x_step_um, y_step_um,
+                                   method='pattern', max_moves=None):
+        '''
+        Drop-in replacement for `goto_max_rect_input` that uses a
+        direct-search optimiser within the same rectangle instead
+        of measuring every point of the grid.
+        '''
+        return self._goto_max_rect_search(self.inp, x_pts, y_pts, x_step_um, y_step_um,
+                                          method, max_moves)
+
+    def goto_max_rect_search_output(self, x_pts, y_pts, x_step_um, y_step_um,
+                                    method='pattern', max_moves=None):
+        '''
+        Drop-in replacement for `goto_max_rect_output` that uses a
+        direct-search optimiser within the same rectangle instead
+        of measuring every point of the grid.
+        '''
+        return self._goto_max_rect_search(self.out, x_pts, y_pts, x_step_um, y_step_um,
+                                          method, max_moves)
+
+    def _align(self, stage, span_um, resolution_um, pts, shrink, pattern):
+        step_um = span_um / (pts-1)
+        c = CoarseToFine(stage.x, stage.y, self.pm, pts, pts, step_um, step_um,
+                         resolution_um, resolution_um, shrink, pattern)
+        self._configure(c)
+        pos_pows = c.scan(True)
+        return pos_pows
+
+    def align_input(self, span_um=8., resolution_um=0.1, pts=5, shrink=0.5, pattern='rect'):
+        '''
+        Aligns the input stage with a coarse-to-fine scan (see
+        `CoarseToFine`), giving the span and resolution rather
+        than a grid, and the result of every level.
+
+        Args:
+            span_um (float): The width of the coarse grid.
+            resolution_um (float): The step of the finest grid.
+            pts (int): The number of points along each axis of
+                every grid.
+            shrink (float): The factor the step shrinks by at each
+                level.
+            pattern (str): \'rect\' or \'cross\'.
+        '''
+        return self._align(self.inp, span_um, resolution_um, pts, shrink, pattern)
+
+    def align_output(self, span_um=8., resolution_um=0.1, pts=5, shrink=0.5, pattern='rect'):
+        '''
+        Same as `align_input` for the output stage.
+        '''
+        return self._align(self.out, span_um, resolution_um, pts, shrink, pattern)
 
     def _goto_max_line2XY(self, stage, x_pts, y_pts, x_step_um, y_step_um):
         c = Line2(stage.x, stage.y, self.pm, x_pts, y_pts, x_step_um, y_step_um)
+        self._configure(c)
         pos_pows = c.scan(True)
         return pos_pows
 
@@ -680,6 +1787,7 @@ class ScanRoutines(object):
                           y_step_um, z_step_um):
         o = OptimiseLine2XY_Z(self.pm, stage, x_pts, y_pts, z_pts,
                               x_step_um, y_step_um, z_step_um)
+        self._configure(o)
         pos_pows = o.scan(True)
         return pos_pows
 
@@ -693,6 +1801,7 @@ class ScanRoutines(object):
                           y_step_um, z_step_um):
         o = OptimiseRectZ(self.pm, stage, x_pts, y_pts, z_pts,
                           x_step_um, y_step_um, z_step_um)
+        self._configure(o)
         pos_pows = o.scan(True)
         return pos_pows
 
@@ -702,19 +1811,65 @@ class ScanRoutines(object):
     def goto_max_rect_z_output(self, x_pts, y_pts, z_pts, x_step_um, y_step_um, z_step_um):
         return self._goto_max_rect_z(self.out, x_pts, y_pts, z_pts, x_step_um, y_step_um, z_step_um)
 
-    def _goto_max_cross(self, stage, x_pts, y_pts, x_step_um, y_step_um):
-        c = CrossXY(stage, self.pm, x_pts, y_pts, x_step, y_step)
-        pos_pows = c.scan(True)
-        return pos_pows
+    def _goto_max_cross(self, stage, x_pts, y_pts, x_step_um, y_step_um, coarse_to_fine=True):
+        # The same axes as `CrossXY`.
+        return self._goto_max_grid(stage, stage.x, stage.z, x_pts, y_pts, x_step_um, y_step_um,
+                                   coarse_to_fine, 'cross')
 
-    def goto_max_cross_input(self, x_pts, y_pts, x_step_um, y_step_um):
-        return self._goto_max_cross(self.inp, x_pts, y_pts, x_step_um, y_step_um)
+    def goto_max_cross_input(self, x_pts, y_pts, x_step_um, y_step_um, coarse_to_fine=True):
+        '''
+        Same as `goto_max_rect_input` using a cross.
+        '''
+        return self._goto_max_cross(self.inp, x_pts, y_pts, x_step_um, y_step_um, coarse_to_fine)
 
-    def goto_max_cross_output(self, x_pts, y_pts, x_step_um, y_step_um):
-        return self._goto_max_cross(self.out, x_pts, y_pts, x_step_um, y_step_um)
+    def goto_max_cross_output(self, x_pts, y_pts, x_step_um, y_step_um, coarse_to_fine=True):
+        '''
+        Same as `goto_max_rect_input` using a cross on the output
+        stage.
+        '''
+        return self._goto_max_cross(self.out, x_pts, y_pts, x_step_um, y_step_um, coarse_to_fine)
+
+    def _refine_waveguide(self, r, scans, x_step_um, y_step_um, resolution_um, pattern):
+        # Refines the maximum found by `find_waveguide_*`, one stage
+        # after the other, from half the search step down to
+        # `resolution_um`, keeping the structure of the result.
+        if resolution_um >= min(x_step_um, y_step_um):
+            return r
+        coords_pows, _ = r
+        maxima = []
+        for s in scans:
+            (_, _), (coord, power) = self._coarse_to_fine(s.axes[0], s.axes[1],
+                                                          x_step_um/2., y_step_um/2.,
+                                                          resolution_um, resolution_um,
+                                                          pattern)
+            maxima.append(coord)
+        return coords_pows, tuple(maxima) + (power,)
 
     def find_waveguide_rect(self, x_pts=7, y_pts=7, x_step_um=1, y_step_um=1,
-                            offset=(0,-3)):
+                            offset=(0,-3), concurrent=False, coarse_to_fine=True,
+                            resolution_um=0.1):
+        '''
+        Finds a waveguide by scanning the input and output stages
+        over rectangles.
+
+        If `concurrent` is `False`, the full output scan is done at
+        every point of the input scan.  If `True`, the input and
+        output scans alternate (see `ScannerDesign._add_alternating`),
+        which scales with the sum rather than the product of the
+        number of points.
+
+        If `coarse_to_fine`, the search is the coarse level: the
+        input and then the output stage are then scanned
+        coarse-to-fine from half its step down to `resolution_um`,
+        and the maximum returned is theirs.
+
+        Returns:
+            ((np.array, np.array, np.array), (np.array, np.array, float)):
+                Either way, the input coordinates, output
+                coordinates and power of every reading, then the
+                input and output coordinates of the maximum power
+                and the maximum power.
+        '''
         r_inp = RectangleXY(self.inp, self.pm,
                             x_pts, y_pts, x_step_um, y_step_um,
                             offset, True, 'c')
@@ -722,11 +1877,23 @@ class ScanRoutines(object):
                             x_pts, y_pts, x_step_um, y_step_um,
                             offset, True, 'c')
         sd = ScannerDesign()
-        sd._add_nested(r_out, r_inp)
-        return sd.scan(True)
+        if concurrent:
+            sd._add_alternating([r_inp, r_out])
+        else:
+            sd._add_nested(r_out, r_inp)
+        self._configure(sd)
+        r = sd.scan(True)
+        if coarse_to_fine:
+            r = self._refine_waveguide(r, [r_inp, r_out], x_step_um, y_step_um,
+                                       resolution_um, 'rect')
+        return r
 
     def find_waveguide_cross(self, x_pts=7, y_pts=7, x_step_um=3, y_step_um=3,
-                            offset=(0,-3)):
+                            offset=(0,-3), concurrent=False, coarse_to_fine=True,
+                            resolution_um=0.1):
+        '''
+        Same as `find_waveguide_rect` using crosses.
+        '''
         r_inp = CrossXY(self.inp, self.pm,
                         x_pts, y_pts, x_step_um, y_step_um,
                         offset)
@@ -734,8 +1901,16 @@ class ScanRoutines(object):
                         x_pts, y_pts, x_step_um, y_step_um,
                         offset)
         sd = ScannerDesign()
-        sd._add_nested(r_out, r_inp)
-        return sd.scan(True)
+        if concurrent:
+            sd._add_alternating([r_inp, r_out])
+        else:
+            sd._add_nested(r_out, r_inp)
+        self._configure(sd)
+        r = sd.scan(True)
+        if coarse_to_fine:
+            r = self._refine_waveguide(r, [r_inp, r_out], x_step_um, y_step_um,
+                                       resolution_um, 'cross')
+        return r
 
     def centre_x_y(self):
         self.inp.x.move_abs_um(250)
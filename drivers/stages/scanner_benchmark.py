@@ -0,0 +1,212 @@
+'''
+Benchmarks the alignment routines on simulated hardware.
+
+Each benchmark starts from the same misaligned position and
+reports the time taken, the number of commands sent to the
+stages and power meter, the number of moves and the power
+reached.  Run with:
+
+    python -m drivers.stages.scanner_benchmark
+'''
+import argparse
+import time
+from . import scanner as sc
+from . import stage_simulated as ss
+from ..power_meters import power_meter_simulated as pms
+
+def make_rig(latency_s=1.e-3, read_s=1.e-3, speed_um_s=2000., acceleration_um_s2=None,
+             misalignment_um=(1.3, -0.8, 0.9, 1.1), waist_um=2.5, noise_W=0., backlash_um=0.):
+    '''
+    Builds a simulated input, output and chip stage rig.
+
+    The power meter reads the coupling through the input and
+    output stages; x and y are misaligned by `misalignment_um`
+    from the starting position of 250um and z is best a few
+    microns back from the start.
+
+    Args:
+        latency_s (float): The round trip time in [s] of every
+            stage and power meter command.
+        read_s (float): The power meter integration time in [s].
+        speed_um_s (float): The speed of every axis in [um/s].
+        acceleration_um_s2 (float, None): The acceleration of
+            every axis in [um/s^2].
+        misalignment_um (tuple(float)): The (input x, input y,
+            output x, output y) offsets of the aligned position.
+        waist_um (float): The mode radius in x and y in [um].
+        noise_W (float): The power meter noise in [W].
+        backlash_um (float): The backlash of every linear axis in
+            [um].
+
+    Returns:
+        (SimulatedStages, SimulatedPowerMeter): The stages and
+            the power meter.
+    '''
+    stages = ss.SimulatedStages(latency_s, speed_um_s, acceleration_um_s2,
+                                backlash_um=backlash_um)
+    axes = [stages.input.x, stages.input.y, stages.output.x, stages.output.y,
+            stages.input.z, stages.output.z]
+    centres = [250.+m for m in misalignment_um] + [246., 246.]
+    waists = [waist_um]*4 + [20., 20.]
+    power_meter = pms.SimulatedPowerMeter(axes, centres, waists, noise_W=noise_W,
+                                          transport=ss.SimulatedTransport(latency_s),
+                                          read_s=read_s)
+    return stages, power_meter
+
+def _routines(**kwargs):
+    return lambda stages, power_meter: sc.ScanRoutines(stages, power_meter, **kwargs)
+
+def _pipelined_rect(stages, power_meter):
+    # The simulated power meter latches at the end of its
+    # integration time, so the next move can overlap the reply.
+    routines = sc.ScanRoutines(stages, power_meter, pipeline=True,
+                               latch_s=max(power_meter.read_s, 1.e-6))
+    return routines.goto_max_rect_input(9, 9, 1., 1.)
+
+def _fly_rect(stages, power_meter):
+    r = sc.RectangleXY(stages.input, power_meter, 9, 9, 1., 1., meander=False)
+    r.set_fly(True, 50.)
+    return r.scan(True)
+
+def _rect_approach(stages, power_meter):
+    # Backlash taken up by approaching from one side, so the
+    # rectangle can meander.
+    for axis in (stages.input.x, stages.input.y):
+        axis.set_backlash(0.5, 1)
+    return sc.ScanRoutines(stages, power_meter).goto_max_rect_input(9, 9, 1., 1.)
+
+def _rect_gaussian(stages, power_meter):
+    r = sc.RectangleXY(stages.input, power_meter, 5, 5, 1.5, 1.5)
+    r.set_peak_estimator('gaussian')
+    return r.scan(True)
+
+def _line(stages, power_meter):
+    r = sc.Line(stages.input.x, power_meter, 9, 1.)
+    return r.scan(True)
+
+def _diamond(stages, power_meter):
+    r = sc.Diamond(stages.input.x, stages.input.y, power_meter, 9, 9, 1., 1.)
+    return r.scan(True)
+
+def _centre_x_y(stages, power_meter):
+    # The rig starts centred, so the stages are moved away first
+    # without counting those moves.
+    for axis in (stages.input.x, stages.input.y, stages.output.x, stages.output.y):
+        axis.move_abs_um(200.)
+    stages.reset_counters()
+    return sc.ScanRoutines(stages, power_meter).centre_x_y()
+
+# (name, function(stages, power_meter)) of every benchmark.
+benchmarks = [
+    ('goto_max_rect 9x9',
+     lambda s, p: _routines()(s, p).goto_max_rect_input(9, 9, 1., 1.)),
+    ('goto_max_rect 9x9 grid',
+     lambda s, p: _routines()(s, p).goto_max_rect_input(9, 9, 1., 1., False)),
+    ('goto_max_rect 9x9 pipelined', _pipelined_rect),
+    ('goto_max_rect 9x9 fly', _fly_rect),
+    ('goto_max_rect 9x9 meander approach', _rect_approach),
+    ('goto_max_rect 5x5 gaussian fit', _rect_gaussian),
+    ('goto_max_cross 9x9',
+     lambda s, p: _routines()(s, p).goto_max_cross_input(9, 9, 1., 1.)),
+    ('goto_max_cross 9x9 grid',
+     lambda s, p: _routines()(s, p).goto_max_cross_input(9, 9, 1., 1., False)),
+    ('line 9', _line),
+    ('diamond 9x9', _diamond),
+    ('goto_max_line2XY 9x9',
+     lambda s, p: _routines()(s, p).goto_max_line2XY_input(9, 9, 1., 1.)),
+    ('goto_max_rect_search pattern',
+     lambda s, p: _routines()(s, p).goto_max_rect_search_input(9, 9, 1., 1., 'pattern')),
+    ('goto_max_optimise nelder-mead',
+     lambda s, p: _routines()(s, p).goto_max_optimise_input(1., 0.05, 50, 'nelder-mead')),
+    ('align (coarse-to-fine)',
+     lambda s, p: _routines()(s, p).align_input(8., 0.1)),
+    ('goto_max_rect_z 5x5x5',
+     lambda s, p: _routines()(s, p).goto_max_rect_z_input(5, 5, 5, 1., 1., 2.)),
+    ('goto_max_line2XY_z 7x7x5',
+     lambda s, p: _routines()(s, p).goto_max_line2XY_z_input(7, 7, 5, 1., 1., 2.)),
+    ('find_waveguide_rect 5x5 nested',
+     lambda s, p: _routines()(s, p).find_waveguide_rect(5, 5, 1., 1., (0, 0))),
+    ('find_waveguide_rect 5x5 alternating',
+     lambda s, p: _routines()(s, p).find_waveguide_rect(5, 5, 1., 1., (0, 0), True)),
+    ('find_waveguide_rect 5x5 nested grid',
+     lambda s, p: _routines()(s, p).find_waveguide_rect(5, 5, 1., 1., (0, 0), False, False)),
+    ('find_waveguide_cross 5x5 nested',
+     lambda s, p: _routines()(s, p).find_waveguide_cross(5, 5, 1., 1., (0, 0))),
+    ('find_waveguide_cross 5x5 alternating',
+     lambda s, p: _routines()(s, p).find_waveguide_cross(5, 5, 1., 1., (0, 0), True)),
+    # Without a file, the image is not plotted or displayed.
+    ('take_image_input 9x9',
+     lambda s, p: _routines()(s, p).take_image_input(9, 9, 1., 1., None)),
+    ('take_image_output 9x9',
+     lambda s, p: _routines()(s, p).take_image_output(9, 9, 1., 1., None)),
+    ('centre_x_y', _centre_x_y),
+]
+
+def run(benchmarks=benchmarks, **rig_kwargs):
+    '''
+    Runs benchmarks, each on a freshly built rig.
+
+    Args:
+        benchmarks (list(tuple(str, function))): The benchmarks
+            to run.
+        **rig_kwargs: Passed to `make_rig`.
+
+    Returns:
+        list(dict): For each benchmark, its `name`, the wall
+            `time_s` taken, the number of `commands` sent, the
+            number of stage `moves`, the number of power meter
+            `readings` and the `power_W` reached.
+    '''
+    results = []
+    for name, benchmark in benchmarks:
+        stages, power_meter = make_rig(**rig_kwargs)
+        stages.reset_counters()
+        power_meter.transport.reset()
+
+        t_0 = time.monotonic()
+        benchmark(stages, power_meter)
+        t_s = time.monotonic() - t_0
+
+        results.append({
+            'name': name,
+            'time_s': t_s,
+            'commands': stages.get_commands() + power_meter.transport.commands,
+            'moves': stages.get_moves(),
+            'readings': power_meter.readings,
+            'power_W': power_meter.get_coupling(),
+        })
+    return results
+
+def format_results(results):
+    '''
+    Formats the results of `run` as a table.
+    '''
+    lines = ['%-36s %9s %9s %7s %9s %11s' % ('benchmark', 'time [s]', 'commands',
+                                             'moves', 'readings', 'power [uW]')]
+    for r in results:
+        lines.append('%-36s %9.3f %9i %7i %9i %11.3f' % (r['name'], r['time_s'], r['commands'],
+                                                         r['moves'], r['readings'],
+                                                         r['power_W']*1.e6))
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the alignment routines on '
+                                                 'simulated hardware.')
+    parser.add_argument('--latency-s', type=float, default=1.e-3,
+                        help='Round trip time of every command [s].')
+    parser.add_argument('--read-s', type=float, default=1.e-3,
+                        help='Power meter integration time [s].')
+    parser.add_argument('--speed-um-s', type=float, default=2000.,
+                        help='Axis speed [um/s].')
+    parser.add_argument('--noise-W', type=float, default=0.,
+                        help='Power meter noise [W].')
+    parser.add_argument('--backlash-um', type=float, default=0.,
+                        help='Backlash of every linear axis [um].')
+    parser.add_argument('--filter', default='',
+                        help='Only run benchmarks whose name contains this.')
+    args = parser.parse_args()
+
+    selected = [b for b in benchmarks if args.filter in b[0]]
+    print(format_results(run(selected, latency_s=args.latency_s, read_s=args.read_s,
+                             speed_um_s=args.speed_um_s, noise_W=args.noise_W,
+                             backlash_um=args.backlash_um)))
@@ -1,11 +1,154 @@
 import abc
+import array
 import math
 import numpy as np
 import time
 import os
 import json
 import copy
+import threading
+import weakref
+import tqdm
+from concurrent import futures
 from . import logger as log
+from . import stage_state
+from . import trajectory
+from ..utils import trace
+
+# One single worker executor per transport, so non-blocking
+# commands sent over the same transport run in order.
+_executors = weakref.WeakKeyDictionary()
+_executors_lock = threading.Lock()
+
+def _get_executor(transport):
+    with _executors_lock:
+        if transport not in _executors:
+            _executors[transport] = futures.ThreadPoolExecutor(max_workers=1)
+        return _executors[transport]
+
+def release_executor(transport):
+    '''
+    Shuts down the worker thread of a transport, once its queued
+    commands have run, eg when the transport is closed.  A later
+    non-blocking command starts a new one.
+
+    Args:
+        transport (object): The transport, see `Axis._get_transport`.
+    '''
+    with _executors_lock:
+        executor = _executors.pop(transport, None)
+    if executor:
+        executor.shutdown(wait=True)
+
+def _trace_move_name(a):
+    # Not every axis sets a name, eg `PicomotorAxisABC`.
+    return 'move ' + (getattr(a[0], 'name', None) or type(a[0]).__name__)
+
+def _move_async(axis, position, relative=False):
+    if issubclass(type(axis), AxisLinear):
+        if relative:
+            return axis.move_rel_um_async(position)
+        return axis.move_abs_um_async(position)
+    elif issubclass(type(axis), AxisRotate):
+        if relative:
+            return axis.move_rel_degree_async(position)
+        return axis.move_abs_degree_async(position)
+    raise TypeError('Cannot move `%s` asynchronously.' % axis.__class__.__name__)
+
+def move_many(groups, relative=False):
+    '''
+    Moves several axes, concurrently where possible.
+
+    The groups are moved one after another, and the axes within a
+    group move concurrently, so moves that must finish first, such
+    as retracting the fibres in z, go in an earlier group.  Axes
+    that share a transport (say, the axes of one Luminos stage)
+    still move one after another.
+
+    Args:
+        groups (list(dict)): Groups of moves, each a dictionary
+            mapping an `Axis` to its target position, in [um] for
+            linear axes and [degree] for rotational axes.  `None`
+            keys are ignored.
+        relative (bool): If `True`, the positions are relative
+            moves rather than absolute positions.
+
+    Every move is checked against the limits of its axis before
+    the first group is moved, so a `ValueError` leaves all the
+    axes where they were.
+
+    Returns:
+        list(dict): For each group, the position of each axis
+            after its move.
+    '''
+    trajectory.validate_moves(groups, relative)
+    return _move_groups(groups, relative)
+
+def _move_groups(groups, relative=False):
+    # `move_many` without the limit checks, for moves that have
+    # already been checked.
+    results = []
+    for group in groups:
+        fs = {}
+        for axis, position in group.items():
+            if axis:
+                fs[axis] = _move_async(axis, position, relative)
+        # Let every move of the group finish before raising any
+        # error, so no axis is left moving.
+        futures.wait(list(fs.values()))
+        results.append({axis: f.result() for axis, f in fs.items()})
+    return results
+
+def run_parallel(calls, desc=None, cleanup=None):
+    '''
+    Runs calls each in its own thread, say, to home or set up
+    stages on separate serial ports, so they take as long as the
+    slowest rather than all of them together.
+
+    A progress bar shows the calls as they finish.  Every call
+    runs to the end even if others fail, and the failures are
+    then raised together.
+
+    Args:
+        calls (dict): The functions to call, without arguments, by
+            name, eg 'input'.
+        desc (str, None): The description for the progress bar.
+        cleanup (function, None): If any call fails, called as
+            `cleanup(name, result)` with the result of each call
+            that succeeded, say, to close its serial port.
+
+    Returns:
+        dict: The result of each call, by name.
+
+    Raises:
+        RuntimeError: If any call fails, naming every failure.
+    '''
+    results = {}
+    errors = {}
+    with futures.ThreadPoolExecutor(max_workers=max(len(calls), 1)) as executor:
+        fs = {executor.submit(func): name for name, func in calls.items()}
+        with tqdm.tqdm(total=len(fs), desc=desc, ncols=80) as progress:
+            for f in futures.as_completed(fs):
+                name = fs[f]
+                try:
+                    results[name] = f.result()
+                except Exception as e:
+                    errors[name] = e
+                progress.set_postfix_str('%s %s' % (name, 'failed' if name in errors else 'done'))
+                progress.update()
+
+    if errors:
+        if cleanup:
+            for name, result in results.items():
+                try:
+                    cleanup(name, result)
+                except Exception:
+                    pass
+        failed = [name for name in calls if name in errors]
+        msg = '; '.join('%s: %s' % (name, errors[name]) for name in failed)
+        raise RuntimeError('%i of %i failed (%s).' % (len(errors), len(calls), msg)) \
+            from errors[failed[0]]
+    return {name: results[name] for name in calls}
 
 class abstractstatic(staticmethod):
     '''
@@ -34,7 +177,9 @@ class Stages(object, metaclass=abc.ABCMeta):
             `Stage` class.
         filename (str, file, None): A string or open filestream
             to save the x, y and z coordinates of the stage to.
-            If `None`, doesn\'t store any data.
+            If `None`, doesn\'t store any data.  A name ending in
+            `.bin` logs binary records with timestamps instead (see
+            `logger.LoggerBinary`).
     '''
     def __init__(self, stages_dict, filename=None):
         self.stages_dict = stages_dict
@@ -68,6 +213,22 @@ class Stages(object, metaclass=abc.ABCMeta):
         '''
         return self._pop_pos_xyz(self.pos_xyz_um_stack, retract_fibres)
 
+    def move_many(self, groups, relative=False):
+        '''
+        Moves axes of any of the stages, concurrently where
+        possible.  See `move_many`.
+
+        Args:
+            groups (list(dict)): Groups of moves, each mapping an
+                `Axis` of any stage to its position.
+            relative (bool): If `True`, the moves are relative.
+
+        Returns:
+            list(dict): For each group, the position of each axis
+                after its move.
+        '''
+        return move_many(groups, relative)
+
 class Stages2(Stages, metaclass=abc.ABCMeta):
     '''
     Interface class for a set of two stages; an
@@ -79,14 +240,14 @@ class Stages2(Stages, metaclass=abc.ABCMeta):
         self.output = stages_dict['output']
 
         if filename:
-            logger = log.LoggerStages2(filename, self)
+            logger = log.get_logger(log.LoggerStages2, filename, self)
             self.input._set_logger(logger)
             self.output._set_logger(logger)
 
     def _push_pos_xyz(self, stack):
         xyz = {}
-        xyz['in'] = self.input.get_current_position_um()
-        xyz['out'] = self.output.get_current_position_um()
+        xyz['in'] = self.input.get_current_position_um(cached=True)
+        xyz['out'] = self.output.get_current_position_um(cached=True)
         stack.append(xyz)
         return stack
 
@@ -97,18 +258,13 @@ class Stages2(Stages, metaclass=abc.ABCMeta):
 
         # Pull fibres away from chip.
         if retract_fibres:
-            self.input.z.move_rel_um(-50)
-            self.output.z.move_rel_um(-50)
-
-        # Move everything into place.
-        self.input.x.move_abs_um(x_in)
-        self.input.y.move_abs_um(y_in)
-        self.output.x.move_abs_um(x_out)
-        self.output.y.move_abs_um(y_out)
+            self.move_many([{self.input.z: -50, self.output.z: -50}], relative=True)
 
-        # Move input and output fibres to their correct position.
-        self.input.z.move_abs_um(z_in)
-        self.output.z.move_abs_um(z_out)
+        # Move everything into place, then move input and output
+        # fibres to their correct position.
+        self.move_many([{self.input.x: x_in, self.input.y: y_in,
+                         self.output.x: x_out, self.output.y: y_out},
+                        {self.input.z: z_in, self.output.z: z_out}])
 
         return stack
 
@@ -124,7 +280,7 @@ class Stages3(Stages, metaclass=abc.ABCMeta):
         self.output = stages_dict['output']
 
         if filename:
-            logger = log.LoggerStages3(filename, self)
+            logger = log.get_logger(log.LoggerStages3, filename, self)
             self.chip._set_logger(logger)
             self.input._set_logger(logger)
             self.output._set_logger(logger)
@@ -175,20 +331,14 @@ class Stages3(Stages, metaclass=abc.ABCMeta):
         '''
         x_move_rel_um = self._ctr_in_out_x_axes(x_ctr_around_line_um)
 
-        # Pull fibres away.
-        self.input.z.move_rel_um(-20.)
-        self.output.z.move_rel_um(-20.)
-
-        # Centre everything.
-        x_in = self.input.x.move_rel_um(x_move_rel_um)
-        x_out = self.output.x.move_rel_um(x_move_rel_um)
-        z_chip = self.chip.z.move_rel_um(x_move_rel_um)
-
-        # Put fibres back.
-        self.input.z.move_rel_um(20.)
-        self.output.z.move_rel_um(20.)
+        # Pull fibres away, centre everything and put fibres back.
+        r = self.move_many([{self.input.z: -20., self.output.z: -20.},
+                            {self.input.x: x_move_rel_um, self.output.x: x_move_rel_um,
+                             self.chip.z: x_move_rel_um},
+                            {self.input.z: 20., self.output.z: 20.}], relative=True)
+        ctr = r[1]
 
-        return x_in, x_out, z_chip
+        return ctr[self.input.x], ctr[self.output.x], ctr[self.chip.z]
 
     def ctr_in_out_y_axes(self, y_ctr_around_line_um=None):
         '''
@@ -213,20 +363,14 @@ class Stages3(Stages, metaclass=abc.ABCMeta):
         '''
         y_move_rel_um = self._ctr_in_out_y_axes(y_ctr_around_line_um)
 
-        # Pull fibres away.
-        self.input.z.move_rel_um(-20.)
-        self.output.z.move_rel_um(-20.)
+        # Pull fibres away, centre everything and put fibres back.
+        r = self.move_many([{self.input.z: -20., self.output.z: -20.},
+                            {self.input.y: y_move_rel_um, self.output.y: y_move_rel_um,
+                             self.chip.y: y_move_rel_um},
+                            {self.input.z: 20., self.output.z: 20.}], relative=True)
+        ctr = r[1]
 
-        # Centre everything.
-        y_in = self.input.y.move_rel_um(y_move_rel_um)
-        y_out = self.output.y.move_rel_um(y_move_rel_um)
-        y_chip = self.chip.y.move_rel_um(y_move_rel_um)
-
-        # Put fibres back.
-        self.input.z.move_rel_um(20.)
-        self.output.z.move_rel_um(20.)
-
-        return y_in, y_out, y_chip
+        return ctr[self.input.y], ctr[self.output.y], ctr[self.chip.y]
 
     def ctr_in_out_xy_axes(self, x_ctr_around_line_um=None, y_ctr_around_line_um=None):
         '''
@@ -237,23 +381,17 @@ class Stages3(Stages, metaclass=abc.ABCMeta):
         x_move_rel_um = self._ctr_in_out_x_axes(x_ctr_around_line_um)
         y_move_rel_um = self._ctr_in_out_y_axes(y_ctr_around_line_um)
 
-        # Pull fibres away.
-        self.input.z.move_rel_um(-20.)
-        self.output.z.move_rel_um(-20.)
-
-        # Centre everything.
-        x_in = self.input.x.move_rel_um(x_move_rel_um)
-        x_out = self.output.x.move_rel_um(x_move_rel_um)
-        z_chip = self.chip.z.move_rel_um(x_move_rel_um)
-        y_in = self.input.y.move_rel_um(y_move_rel_um)
-        y_out = self.output.y.move_rel_um(y_move_rel_um)
-        y_chip = self.chip.y.move_rel_um(y_move_rel_um)
-
-        # Put fibres back.
-        self.input.z.move_rel_um(20.)
-        self.output.z.move_rel_um(20.)
+        # Pull fibres away, centre everything and put fibres back.
+        r = self.move_many([{self.input.z: -20., self.output.z: -20.},
+                            {self.input.x: x_move_rel_um, self.output.x: x_move_rel_um,
+                             self.chip.z: x_move_rel_um,
+                             self.input.y: y_move_rel_um, self.output.y: y_move_rel_um,
+                             self.chip.y: y_move_rel_um},
+                            {self.input.z: 20., self.output.z: 20.}], relative=True)
+        ctr = r[1]
 
-        return x_in, x_out, z_chip, y_in, y_out, y_chip
+        return ctr[self.input.x], ctr[self.output.x], ctr[self.chip.z], \
+            ctr[self.input.y], ctr[self.output.y], ctr[self.chip.y]
 
     def move_rel_um_x_long(self, move_rel_x_um, move_rel_output_x_um=None, x_ctr_around_line_um=None):
         '''
@@ -286,8 +424,15 @@ class Stages3(Stages, metaclass=abc.ABCMeta):
             float: The output stage\'s  (x,y,z) coordinates.
             float: The chip stage\'s (x,y,z) coordinates.
         '''
+        r = self.move_many([self._x_long_moves(move_rel_x_um, move_rel_output_x_um,
+                                               x_ctr_around_line_um)], relative=True)[0]
+
+        return r[self.input.x], r[self.output.x], r[self.chip.z]
+
+    def _x_long_moves(self, move_rel_x_um, move_rel_output_x_um=None, x_ctr_around_line_um=None):
+        # The relative moves of `move_rel_um_x_long`.
         if not move_rel_output_x_um:
-            move_rel_x_um = move_rel_output_x_um
+            move_rel_output_x_um = move_rel_x_um
 
         assert abs(move_rel_x_um - move_rel_output_x_um) < self.input.x.get_position_absolute_max_um(), \
                 'Difference between x moves is too large.'
@@ -298,11 +443,9 @@ class Stages3(Stages, metaclass=abc.ABCMeta):
         x_move_rel_long_in = x_move_rel_long_chip - move_rel_x_um
         x_move_rel_long_out = x_move_rel_long_chip - move_rel_output_x_um
 
-        c = self.chip.z.move_rel_um(x_move_rel_um + x_move_rel_long_chip)
-        i = self.input.x.move_rel_um(x_move_rel_um + x_move_rel_long_in)
-        o = self.output.x.move_rel_um(x_move_rel_um + x_move_rel_long_out)
-
-        return i, o, c
+        return {self.chip.z: x_move_rel_um + x_move_rel_long_chip,
+                self.input.x: x_move_rel_um + x_move_rel_long_in,
+                self.output.x: x_move_rel_um + x_move_rel_long_out}
 
     def move_rel_um_c_long(self, move_rel_c_um, move_rel_output_c_um=None, c_ctr_around_line_um=None):
         '''
@@ -314,26 +457,26 @@ class Stages3(Stages, metaclass=abc.ABCMeta):
         x_rel_in_um, y_rel_in_um, z_rel_in_um = self.input.c._get_xyz_rel_move_um(move_rel_c_um)
         x_rel_out_um, y_rel_out_um, z_rel_out_um = self.output.c._get_xyz_rel_move_um(move_rel_output_c_um)
 
-        # Move rel in z if negative movement.
-        if z_rel_in_um < 0.:
-            zi = self.input.z.move_rel_um(z_rel_in_um)
-        if z_rel_out_um < 0.:
-            zo = self.output.z.move_rel_um(z_rel_out_um)
-
-        # Move chip
-        xi, xo, c = self.move_rel_um_x_long(x_rel_in_um, x_rel_out_um, c_ctr_around_line_um)
-
-        # Move rel in z if positive movement.
-        if z_rel_in_um >= 0.:
-            zi = self.input.z.move_rel_um(z_rel_in_um)
-        if z_rel_out_um >= 0.:
-            zo = self.output.z.move_rel_um(z_rel_out_um)
-
-        # Move rel in y.
-        self.input.y.move_rel_um(y_rel_in_um)
-        self.output.y.move_rel_um(y_rel_out_um)
-
-        return (xi,zi), (xo,zo), c
+        # Move rel in z first if negative movement and last if
+        # positive, moving the chip in between, then move rel in y.
+        # `move_many` checks the whole sequence before moving.
+        z_first = {}
+        z_last = {}
+        for axis, z_rel_um in ((self.input.z, z_rel_in_um), (self.output.z, z_rel_out_um)):
+            if z_rel_um < 0.:
+                z_first[axis] = z_rel_um
+            else:
+                z_last[axis] = z_rel_um
+        r = self.move_many([z_first,
+                            self._x_long_moves(x_rel_in_um, x_rel_out_um, c_ctr_around_line_um),
+                            z_last,
+                            {self.input.y: y_rel_in_um, self.output.y: y_rel_out_um}],
+                           relative=True)
+        z = dict(r[0])
+        z.update(r[2])
+
+        return (r[1][self.input.x], z[self.input.z]), (r[1][self.output.x], z[self.output.z]), \
+            r[1][self.chip.z]
 
     def move_rel_um_xc_long(self, move_rel_xc_um, move_rel_output_xc_um=None, xc_ctr_around_line_um=None):
         '''
@@ -350,9 +493,9 @@ class Stages3(Stages, metaclass=abc.ABCMeta):
 
     def _push_pos_xyz(self, stack):
         xyz = {}
-        xyz['in'] = self.input.get_current_position_um()
-        xyz['out'] = self.output.get_current_position_um()
-        xyz['chip'] = self.chip.get_current_position_um()
+        xyz['in'] = self.input.get_current_position_um(cached=True)
+        xyz['out'] = self.output.get_current_position_um(cached=True)
+        xyz['chip'] = self.chip.get_current_position_um(cached=True)
         stack.append(xyz)
         return stack
 
@@ -364,21 +507,14 @@ class Stages3(Stages, metaclass=abc.ABCMeta):
 
         # Pull fibres away from chip.
         if retract_fibres:
-            self.input.z.move_rel_um(-50)
-            self.output.z.move_rel_um(-50)
-
-        # Move everything into place.
-        self.input.x.move_abs_um(x_in)
-        self.input.y.move_abs_um(y_in)
-        self.output.x.move_abs_um(x_out)
-        self.output.y.move_abs_um(y_out)
-        self.chip.x.move_abs_um(x_chip)
-        self.chip.y.move_abs_um(y_chip)
-        self.chip.z.move_abs_um(z_chip)
-
-        # Move input and output fibres to their correct position.
-        self.input.z.move_abs_um(z_in)
-        self.output.z.move_abs_um(z_out)
+            self.move_many([{self.input.z: -50, self.output.z: -50}], relative=True)
+
+        # Move everything into place, then move input and output
+        # fibres to their correct position.
+        self.move_many([{self.input.x: x_in, self.input.y: y_in,
+                         self.output.x: x_out, self.output.y: y_out,
+                         self.chip.x: x_chip, self.chip.y: y_chip, self.chip.z: z_chip},
+                        {self.input.z: z_in, self.output.z: z_out}])
 
         return stack
 
@@ -405,6 +541,9 @@ class Stage(object, metaclass=abc.ABCMeta):
             and cx).
         axes_physics (dict): Dictionary of all physical axes
             (does not includes c, xc and cx).
+        state (StageState): The positions and limits of the
+            physical axes as arrays; `state.get_view()` gives the
+            positions without copying.
 
     Args:
         axis (dict): A dictionary continaing the all the
@@ -422,7 +561,9 @@ class Stage(object, metaclass=abc.ABCMeta):
             axis.  If `None`, no `c` axis will be created.
         filename (str, file, None): A string or open filestream
             to save the x, y and z coordinates of the stage to.
-            If `None`, doesn\'t store any data.
+            If `None`, doesn\'t store any data.  A name ending in
+            `.bin` logs binary records with timestamps instead (see
+            `logger.LoggerBinary`).
         reverse_axis_x (bool): Reverses the x-axis\'s direction;
             0 -> x_max and x_max becomes 0.
         reverse_axis_y (bool): Reverses the y-axis\'s direction;
@@ -457,6 +598,10 @@ class Stage(object, metaclass=abc.ABCMeta):
             self.axes[y_axis_motor], self.axes[z_axis_motor]
 
         self.axes_physical = copy.copy(self.axes)
+        for axis in self.axes_physical.values():
+            if axis:
+                axis._stage = self
+        self.state = stage_state.StageState(self.axes_physical)
 
         if None not in (C1, C2, C1_z_chip, C2_z_chip):
             c1 = copy.copy(C1)
@@ -476,7 +621,7 @@ class Stage(object, metaclass=abc.ABCMeta):
             setattr(self, axis_str, axis)
 
         if filename:
-            logger = log.LoggerStage(filename, self)
+            logger = log.get_logger(log.LoggerStage, filename, self)
             self._set_logger(logger)
 
     def __del__(self):
@@ -498,65 +643,106 @@ class Stage(object, metaclass=abc.ABCMeta):
         self.z._set_logger(logger)
         return logger
 
-    def get_current_position_nm(self):
+    def release_executors(self):
+        '''
+        Shuts down the worker threads the axes\' non-blocking
+        commands run on; see `release_executor`.
+        '''
+        for axis in self.axes_physical.values():
+            if axis:
+                release_executor(axis._get_transport())
+                release_executor(axis)
+
+    def get_current_position_nm(self, cached=False):
         '''
         Gets the current position of the stages in [nm].
 
+        Args:
+            cached (bool): If `True`, use the axes\' cached
+                positions where they are fresh.  See
+                `Axis.set_position_cache`.
+
         Returns:
             float: x-coordinate.
             float: y-coordinate.
             float: z-coordinate.
         '''
-        if self.x:
-            x = self.x.get_current_position_nm()
-        else:
-            x = None
-        if self.y:
-            y = self.y.get_current_position_nm()
-        else:
-            y = None
-        if self.z:
-            z = self.z.get_current_position_nm()
-        else:
-            z = None
-        return (x, y, z)
+        return self._get_position(('x', 'y', 'z'), cached, True)
 
-    def get_current_position_arc_second(self):
+    def get_current_position_arc_second(self, cached=False):
         '''
         Gets the current position of the stages in [arc second].
 
+        Args:
+            cached (bool): If `True`, use the axes\' cached
+                positions where they are fresh.
+
         Returns:
             float: roll-coordinate.
             float: pitch-coordinate.
             float: yaw-coordinate.
         '''
-        if self.roll:
-            r = self.roll.get_current_position_arc_second()
-        else:
-            r = None
-        if self.pitch:
-            p = self.pitch.get_current_position_arc_second()
-        else:
-            p = None
-        if self.yaw:
-            y = self.yaw.get_current_position_arc_second()
-        else:
-            y = None
-        return (r, p, y)
+        return self._get_position(('roll', 'pitch', 'yaw'), cached, True)
 
-    def get_current_position_um(self):
-        return tuple(v/1000. if v != None else None \
-                for v in self.get_current_position_nm())
+    def get_current_position_um(self, cached=False):
+        return self._get_position(('x', 'y', 'z'), cached)
+
+    def get_current_position_degree(self, cached=False):
+        return self._get_position(('roll', 'pitch', 'yaw'), cached)
 
-    def get_current_position_degree(self):
-        return tuple(v/3600. if v != None else None \
-                for v in self.get_current_position_arc_second())
+    def get_current_position_um_degree(self, cached=False):
+        return self._get_position(('x', 'y', 'z', 'roll', 'pitch', 'yaw'), cached)
 
-    def get_current_position_um_degree(self):
-        um = list(self.get_current_position_um())
-        deg = list(self.get_current_position_degree())
-        um.extend(deg)
-        return tuple(um)
+    def _get_position(self, axes_names, cached, native=False):
+        # Converts the axes' positions together; axes the stage
+        # doesn't have are `None`.
+        self._sync_positions(axes_names, cached)
+        names = [name for name in axes_names if self.axes_physical[name]]
+        position = iter(self.state.get_position_point(names, native))
+        return tuple(next(position) if self.axes_physical[name] else None
+                     for name in axes_names)
+
+    def sync_position(self, axes_names=None):
+        '''
+        Reads the position of the axes from the hardware into
+        their caches.
+
+        Stages that can read all their axes at once should
+        override this.
+
+        Args:
+            axes_names (list(str), None): The names of the axes
+                to read, eg `[\'x\', \'y\']`.  If `None`, all the
+                physical axes are read.  Stages reading all their
+                axes at once may read more than these.
+        '''
+        if axes_names is None:
+            axes_names = self.axes_physical.keys()
+        for name in axes_names:
+            axis = self.axes_physical[name]
+            if axis:
+                axis.sync_position()
+
+    def _sync_positions(self, axes_names, cached):
+        # Reads the positions of the axes with one `sync_position`
+        # call if any is needed.
+        axes = [self.axes_physical[name] for name in axes_names if self.axes_physical[name]]
+        if not cached or any(axis._position_cache_stale() for axis in axes):
+            self.sync_position(axes_names)
+        else:
+            for axis in axes:
+                axis.position_cache_hits += 1
+
+    def _move_abs(self, axes_names, positions, native):
+        # Converts and checks every target together, before any
+        # axis moves.  Positions that are `None` or 0 aren't moved
+        # to.
+        names = [name for name, p in zip(axes_names, positions) if p]
+        if names:
+            coords = [p for p in positions if p]
+            position_absolute = self.state.to_absolute_point(coords, names, native)
+            for name, p in zip(names, position_absolute):
+                self.axes_physical[name]._move_to(p)
 
     def set_c_axis(self, C1, C2, C1_z_chip, C2_z_chip, c1_c2_distance_mask_um=None):
         '''
@@ -584,12 +770,7 @@ class Stage(object, metaclass=abc.ABCMeta):
                                   C1, C2, c1_c2_distance_mask_um)
 
     def move_abs_nm(self, pos_x, pos_y, pos_z):
-        if pos_x:
-            self.x.move_abs_nm(pos_x)
-        if pos_y:
-            self.y.move_abs_nm(pos_y)
-        if pos_z:
-            self.z.move_abs_nm(pos_z)
+        self._move_abs(('x', 'y', 'z'), (pos_x, pos_y, pos_z), True)
         return pos_x, pos_y, pos_z
 
     def move_abs_um(self, pos_x, pos_y, pos_z):
@@ -602,12 +783,7 @@ class Stage(object, metaclass=abc.ABCMeta):
         return self.move_abs_nm(pos_x, pos_y, pos_z)
 
     def move_abs_arc_second(self, pos_roll, pos_pitch, pos_yaw):
-        if pos_roll:
-            self.roll.move_abs_arc_second(pos_roll)
-        if pos_pitch:
-            self.pitch.move_abs_arc_second(pos_pitch)
-        if pos_yaw:
-            self.yaw.move_abs_arc_second(pos_yaw)
+        self._move_abs(('roll', 'pitch', 'yaw'), (pos_roll, pos_pitch, pos_yaw), True)
         return pos_roll, pos_pitch, pos_yaw
 
     def move_abs_degree(self, pos_roll, pos_pitch, pos_yaw):
@@ -620,10 +796,30 @@ class Stage(object, metaclass=abc.ABCMeta):
         return self.move_abs_arc_second(pos_roll, pos_pitch, pos_yaw)
 
     def move_abs_um_degree(self, pos_x, pos_y, pos_z, pos_roll, pos_pitch, pos_yaw):
-        r1 = list(self.move_abs_um(pos_x, pos_y, pos_z))
-        r2 = list(self.move_abs_degree(pos_roll, pos_pitch, pos_yaw))
-        r1.extend(r2)
-        return r1
+        positions = (pos_x, pos_y, pos_z, pos_roll, pos_pitch, pos_yaw)
+        self._move_abs(('x', 'y', 'z', 'roll', 'pitch', 'yaw'), positions, False)
+        return list(positions)
+
+    def move_many(self, groups, relative=False):
+        '''
+        Moves several axes of the stage, concurrently where
+        possible.  See `move_many`.
+
+        Args:
+            groups (list(dict)): Groups of moves, each mapping an
+                axis name, such as \'x\' or \'roll\', to its
+                position in [um] or [degree].
+            relative (bool): If `True`, the moves are relative.
+
+        Returns:
+            list(dict): For each group, the position of each axis,
+                by name, after its move.
+        '''
+        groups_axes = [{self.axes[name]: position for name, position in group.items()}
+                       for group in groups]
+        results = move_many(groups_axes, relative)
+        return [{name: r[self.axes[name]] for name in group}
+                for group, r in zip(groups, results)]
 
     def write_position_um_to_json(self, filename):
         pos = self.get_current_position_um()
@@ -652,17 +848,62 @@ class Stage(object, metaclass=abc.ABCMeta):
 class Axis(object, metaclass=abc.ABCMeta):
     '''
     Interface class used to define an arbitrary axis.
+
+    The axis caches its position (`_position_absolute`), which
+    is updated by every move and re-read from the hardware
+    according to `set_position_cache`.
+
+    Once the axis belongs to a `Stage`, its position is held in
+    the stage\'s `StageState` arrays.
+
+    Attributes:
+        position_cache_hits (int): The number of position reads
+            answered from the cache.
+        position_cache_misses (int): The number of position reads
+            that went to the hardware.
     '''
+    __slots__ = ('__weakref__', 'name', 'axis_reversed', '_logger', '_stage',
+                 'position_cache_hits', 'position_cache_misses', '_position_cache_moves',
+                 '_position_cache_time', '_position_cache_valid', '_position_cache_max_moves',
+                 '_position_cache_max_age_s', '_positions', '_position_index',
+                 '_position_absolute_start')
+
     def __init__(self, reverse_axis=False, logger=None, update_position_absolute=100):
+        # Subclasses read `_position_absolute` from the hardware
+        # before calling this.
         self.axis_reversed = reverse_axis
-        self._update_position_absolute_limit = update_position_absolute
-        self._update_position_absolute_counter = 0
         self._logger = logger
+        # The `Stage` the axis belongs to, if any.
+        self._stage = None
+        self.position_cache_hits = 0
+        self.position_cache_misses = 0
+        self._position_cache_moves = 0
+        self._position_cache_time = time.monotonic()
+        self._position_cache_valid = True
+        self.set_position_cache(update_position_absolute)
 
     def _get_current_position(self):
         # This function doesn't reverse with the axis for the parent.
         return self._position_absolute
 
+    @property
+    def _position_absolute(self):
+        return self._positions[self._position_index]
+
+    @_position_absolute.setter
+    def _position_absolute(self, position_absolute):
+        try:
+            self._positions[self._position_index] = position_absolute
+        except AttributeError:
+            # Until the axis joins a stage it holds its own position.
+            self._bind_position(array.array('d', [position_absolute]), 0)
+
+    def _bind_position(self, positions, index):
+        # Holds the position in `positions[index]`, eg a
+        # `StageState` array.
+        self._positions = positions
+        self._position_index = index
+
     def _set_logger(self, logger):
         self._logger = logger
         return self._logger
@@ -671,23 +912,153 @@ class Axis(object, metaclass=abc.ABCMeta):
         self._logger = None
         return self._logger
 
-    def _update_position_absolute(self):
-        if self._update_position_absolute:
-            if self._update_position_absolute_counter >= self._update_position_absolute_limit:
-                self._position_absolute = self._get_current_position()
-                self._update_position_absolute_counter = 0
-            self._update_position_absolute_counter += 1
+    def set_position_cache(self, max_moves=100, max_age_s=None):
+        '''
+        Sets when the cached position is re-read from the hardware.
+
+        Moves update the cache with the position commanded, so the
+        cache only drifts from the hardware if moves are lost or
+        the axis is moved by something else.
+
+        Args:
+            max_moves (int, None): Re-read the position after this
+                many moves.  `0` re-reads after every move, ie the
+                cache always holds the hardware position.  `None`
+                never re-reads because of moves.
+            max_age_s (float, None): Re-read the position on a
+                cached read if it was last read from the hardware
+                longer ago than this in [s].  `None` for no limit.
+        '''
+        self._position_cache_max_moves = max_moves
+        self._position_cache_max_age_s = max_age_s
+
+    def _set_position_cache(self, position_absolute):
+        self._position_absolute = position_absolute
+        self._position_cache_moves = 0
+        self._position_cache_time = time.monotonic()
+        self._position_cache_valid = True
         return self._position_absolute
 
+    def _position_cache_stale(self):
+        if not self._position_cache_valid:
+            return True
+        if self._position_cache_max_moves is not None and self._position_cache_moves and \
+                self._position_cache_moves >= self._position_cache_max_moves:
+            return True
+        if self._position_cache_max_age_s is not None and \
+                time.monotonic() - self._position_cache_time > self._position_cache_max_age_s:
+            return True
+        return False
+
+    def sync_position(self):
+        '''
+        Reads the position from the hardware into the cache.
+        '''
+        self.position_cache_misses += 1
+        return self._set_position_cache(self._get_current_position())
+
+    def invalidate_position_cache(self):
+        '''
+        Marks the cached position as stale, so the next read goes
+        to the hardware.  Call this if the axis may have been
+        moved by something other than this object.
+        '''
+        self._position_cache_valid = False
+
+    def reset_position_cache_stats(self):
+        self.position_cache_hits = 0
+        self.position_cache_misses = 0
+
+    def _get_position_absolute(self, cached=False):
+        if cached and not self._position_cache_stale():
+            self.position_cache_hits += 1
+            return self._position_absolute
+        return self.sync_position()
+
+    def _update_position_absolute(self):
+        # Called after every move.
+        self._position_cache_moves += 1
+        if self._position_cache_max_moves is not None and \
+                self._position_cache_moves >= self._position_cache_max_moves:
+            self.sync_position()
+
     def position_absolute_within_bounds(self, position):
         raise NotImplementedError
 
+    def _get_transport(self):
+        '''
+        The object, such as a serial port, that commands to the
+        axis are sent over.  Non-blocking commands to axes that
+        share a transport run one after another, and those to axes
+        on different transports run concurrently.
+
+        Returns:
+            object: The transport; by default the axis itself.
+        '''
+        return self
+
+    def submit(self, func, *args, **kwargs):
+        '''
+        Runs `func(*args, **kwargs)`, normally a method of the
+        axis, on the worker thread of the axis\' transport and
+        returns immediately.
+
+        Blocking calls on an axis shouldn\'t be made while it has
+        non-blocking calls outstanding.
+
+        Returns:
+            concurrent.futures.Future: The future result of `func`.
+        '''
+        return _get_executor(self._get_transport()).submit(func, *args, **kwargs)
+
 class AxisLinear(Axis, metaclass=abc.ABCMeta):
+    __slots__ = ('_backlash_nm', '_approach', '_backlash_direction')
+
     def __init__(self, reverse_axis=False, logger=None, update_position_absolute=100):
         # `_position absolute` is in [nm].
         self._position_absolute = self._get_current_position_nm()
         self._position_absolute_start = self._position_absolute
         super().__init__(reverse_axis, logger, update_position_absolute)
+        self.set_backlash()
+
+    def set_backlash(self, backlash_um=0., approach=None):
+        '''
+        Sets the backlash of the axis and the direction every move
+        should finish in.
+
+        Where an axis settles depends on the direction it last
+        moved in, by up to its backlash.  With an approach
+        direction set, every move finishes with at least
+        `backlash_um` of travel in that direction, so the axis
+        settles in the same place whichever way it came from.
+        Moves against the approach direction overshoot the target
+        by `backlash_um` and come back, and moves in the approach
+        direction that follow a reversal but are shorter than
+        `backlash_um` first back off to `backlash_um` short of the
+        target.  Other moves go straight to the target.
+
+        Args:
+            backlash_um (float): The backlash in [um], which is the
+                overshoot used.
+            approach (int, None): `1` to finish moves travelling in
+                the positive direction, `-1` for the negative
+                direction, as the axis is moved (ie reversed if the
+                axis is).  If `None`, moves go straight to their
+                targets.
+        '''
+        assert backlash_um >= 0., 'Backlash must not be negative.'
+        assert approach in (None, 1, -1), 'Approach must be 1, -1 or None.'
+        self._backlash_nm = backlash_um * 1000.
+        self._approach = approach
+        # The direction of the last move in absolute terms, 0 if
+        # not known.
+        self._backlash_direction = 0
+
+    def get_backlash_um(self):
+        return self._backlash_nm / 1000.
+
+    def get_approach(self):
+        return self._approach
 
     @abc.abstractmethod
     def _move_abs_nm(self, distance_from_home_nm):
@@ -725,22 +1096,7 @@ class AxisLinear(Axis, metaclass=abc.ABCMeta):
         if self.axis_reversed:
             distance_from_home_nm = self._position_absolute_max_nm - distance_from_home_nm
 
-        if distance_from_home_nm == self._position_absolute:
-            # Don't issue a move or log if the position hasn't changed.
-            r = distance_from_home_nm
-        else:
-            self._position_absolute = distance_from_home_nm
-            self._position_absolute = self.position_absolute_within_bounds(self._position_absolute)
-            r = self._move_abs_nm(self._position_absolute)
-
-            if self._logger:
-                self._logger.log()
-
-        if self._update_position_absolute_counter == self._update_position_absolute:
-            self._update_position_absolute()
-        self._update_position_absolute_counter += 1
-
-        return r
+        return self._move_to(self.position_absolute_within_bounds(distance_from_home_nm))
 
     def _move_rel(self, distance_nm):
         if self.axis_reversed:
@@ -750,16 +1106,86 @@ class AxisLinear(Axis, metaclass=abc.ABCMeta):
             # Don't issue a move or log if the position hasn't changed.
             r = distance_nm
         else:
-            self._position_absolute += distance_nm
-            self._position_absolute = self.position_absolute_within_bounds(self._position_absolute)
-            r = self._move_abs_nm(self._position_absolute)
-            self._update_position_absolute()
+            r = self._move_to(self.position_absolute_within_bounds(self._position_absolute + distance_nm))
+        return r
+
+    @trace.traced('stage', _trace_move_name,
+                  lambda a: {'position_absolute_nm': a[1]})
+    def _move_to(self, position_absolute_nm):
+        # Moves to an absolute position already checked against the
+        # limits, eg by `Stage`.
+        positions, i = self._positions, self._position_index
+        position_nm = positions[i]
+        if position_absolute_nm == position_nm:
+            # Don't issue a move or log if the position hasn't changed.
+            return position_absolute_nm
+        positions[i] = position_absolute_nm
+        if self._approach:
+            r = self._move_approach_nm(position_nm, position_absolute_nm)
+        else:
+            r = self._move_abs_nm(position_absolute_nm)
+        self._update_position_absolute()
 
-            if self._logger:
-                self._logger.log()
+        if self._logger:
+            self._logger.log()
 
         return r
 
+    def _move_approach_nm(self, position_nm, target_nm):
+        # Moves to `target_nm` finishing in the approach direction
+        # (see `set_backlash`), with the least overshoot that takes
+        # up the backlash.
+        approach = -self._approach if self.axis_reversed else self._approach
+        distance_nm = target_nm - position_nm
+        if distance_nm*approach < 0. or \
+                (self._backlash_direction != approach and abs(distance_nm) < self._backlash_nm):
+            pre_nm = target_nm - approach*self._backlash_nm
+            pre_nm = min(max(pre_nm, self._position_absolute_min_nm), self._position_absolute_max_nm)
+            if pre_nm != target_nm:
+                self._move_abs_nm(pre_nm)
+        self._backlash_direction = approach
+        return self._move_abs_nm(target_nm)
+
+    def _move_vel_nm_s(self, velocity_nm_s):
+        '''
+        Starts moving the axis at a constant velocity and
+        returns without waiting for the axis to stop.
+
+        Axes that support continuous motion should override
+        this and `_stop`.
+
+        Args:
+            velocity_nm_s (float): The velocity in [nm/s]; the
+                sign gives the direction.
+
+        Returns:
+            float: The velocity in [nm/s] the axis is moving at.
+        '''
+        raise NotImplementedError('%s-axis does not support constant velocity moves.' \
+                                  % self.name)
+
+    def _stop(self):
+        '''
+        Stops the axis.
+
+        Returns:
+            float: The absolute position in [nm] the axis
+                stopped at.
+        '''
+        raise NotImplementedError('%s-axis does not support constant velocity moves.' \
+                                  % self.name)
+
+    def _get_acceleration_nm_s2(self):
+        '''
+        Gets the acceleration the axis uses when starting and
+        stopping.
+
+        Returns:
+            float, None: The acceleration in [nm/s^2], or `None`
+                if it is not known.
+        '''
+        return None
+
     def _get_current_position(self):
         # This function doesn't reverse with the axis for the parent.
         return self._get_current_position_nm()
@@ -774,10 +1200,10 @@ class AxisLinear(Axis, metaclass=abc.ABCMeta):
         Returns:
             float: The absolute position passed in.
         '''
-        if position_absolute < self.get_position_absolute_min_nm():
+        if position_absolute < self._position_absolute_min_nm:
             raise ValueError('%s-axis target movement `%.3f` [um] is too small.' \
                              % (self.name, position_absolute/1000.))
-        if position_absolute > self.get_position_absolute_max_nm():
+        if position_absolute > self._position_absolute_max_nm:
             raise ValueError('%s-axis target movement `%.3f` [um] is too large.' \
                              % (self.name, position_absolute/1000.))
         return position_absolute
@@ -837,30 +1263,121 @@ class AxisLinear(Axis, metaclass=abc.ABCMeta):
         r = self.move_rel_nm(distance_mm * 1e6)
         return r / 1e6
 
-    def get_current_position_nm(self):
+    def move_abs_um_async(self, distance_from_home_um):
+        '''
+        Non-blocking version of `move_abs_um`.
+
+        Returns:
+            concurrent.futures.Future: The future position of the
+                axis in [um] after the movement.
+        '''
+        return self.submit(self.move_abs_um, distance_from_home_um)
+
+    def move_rel_um_async(self, distance_um):
+        '''
+        Non-blocking version of `move_rel_um`.
+
+        Returns:
+            concurrent.futures.Future: The future position of the
+                axis in [um] after the movement.
+        '''
+        return self.submit(self.move_rel_um, distance_um)
+
+    def move_vel_nm_s(self, velocity_nm_s):
+        '''
+        Starts moving the axis at a constant velocity in [nm/s].
+
+        The function returns immediately; the axis keeps moving
+        until `stop_nm` is called or it reaches a limit.
+
+        Args:
+            velocity_nm_s (float): The velocity in [nm/s]; the
+                sign gives the direction.
+
+        Returns:
+            float: The velocity in [nm/s] the axis is moving at.
+        '''
+        if self.axis_reversed:
+            velocity_nm_s *= -1.
+        self.invalidate_position_cache()
+        self._backlash_direction = (velocity_nm_s > 0.) - (velocity_nm_s < 0.)
+        v = self._move_vel_nm_s(velocity_nm_s)
+        if self.axis_reversed:
+            v *= -1.
+        return v
+
+    def move_vel_um_s(self, velocity_um_s):
+        '''
+        Convenience function for `move_vel_nm_s` in [um/s].
+        '''
+        return self.move_vel_nm_s(velocity_um_s * 1000.) / 1000.
+
+    def stop_nm(self):
+        '''
+        Stops a constant velocity move.
+
+        Returns:
+            float: The position of the axis in [nm] after
+                stopping.
+        '''
+        self._set_position_cache(self._stop())
+        if self._logger:
+            self._logger.log()
+
+        pos_abs_nm = self._position_absolute
+        if self.axis_reversed:
+            pos_abs_nm = self._position_absolute_max_nm - pos_abs_nm
+        return pos_abs_nm
+
+    def stop_um(self):
+        '''
+        Convenience function for `stop_nm` in [um].
+        '''
+        return self.stop_nm() / 1000.
+
+    def get_acceleration_um_s2(self):
+        '''
+        Gets the acceleration the axis uses when starting and
+        stopping in [um/s^2].
+
+        Returns:
+            float, None: The acceleration in [um/s^2], or `None`
+                if it is not known.
+        '''
+        a = self._get_acceleration_nm_s2()
+        if a is not None:
+            a /= 1000.
+        return a
+
+    def get_current_position_nm(self, cached=False):
         '''
         Gets the current position of the axis in [nm].
 
+        Args:
+            cached (bool): If `True`, return the cached position
+                unless it is stale (see `set_position_cache`)
+                rather than querying the hardware.
+
         Returns:
             float: The current position of the axis (relative
                 to home) in [nm].
         '''
-        pos_abs_nm = self._get_current_position()
+        pos_abs_nm = self._get_position_absolute(cached)
         if self.axis_reversed:
             pos_abs_nm = self._position_absolute_max_nm - pos_abs_nm
         return pos_abs_nm
 
-    def get_current_position_um(self):
+    def get_current_position_um(self, cached=False):
         '''
         Convenience function for `get_current_position_nm` in [um].
         '''
-        return self.get_current_position_nm() / 1000.
+        return self.get_current_position_nm(cached) / 1000.
 
-    def get_current_position_mm(self):
+    def get_current_position_mm(self, cached=False):
         '''
         Convenience function for `get_current_position_nm` in [mm].
         '''
-        return self.get_current_position_nm() / 1e6
+        return self.get_current_position_nm(cached) / 1e6
 
     def get_absolute_position_start_nm(self):
         '''
@@ -917,6 +1434,8 @@ class AxisRotate(Axis, metaclass=abc.ABCMeta):
     '''
     Interface class for a rotational axis (roll, pitch or yaw).
     '''
+    __slots__ = ()
+
     def __init__(self, reverse_axis=False, logger=None, update_position_absolute=100):
         # `_position absolute` is in [arcsecond].
         self._position_absolute = self._get_current_position_arc_second()
@@ -959,20 +1478,7 @@ class AxisRotate(Axis, metaclass=abc.ABCMeta):
         if self.axis_reversed:
             angle_from_home_arc_second = self._position_absolute_max_arc_second - angle_from_home_arc_second
 
-        if angle_from_home_arc_second == self._position_absolute:
-            # Don't issue a move or log if the position hasn't changed.
-            r = angle_from_home_arc_second
-        else:
-            self._position_absolute = angle_from_home_arc_second
-            self._position_absolute = self.position_absolute_within_bounds(self._position_absolute)
-            r = self._move_abs_arc_second(self._position_absolute)
-
-            if self._logger:
-                self._logger.log()
-
-        self._update_position_absolute()
-
-        return r
+        return self._move_to(self.position_absolute_within_bounds(angle_from_home_arc_second))
 
     def _move_rel(self, angle_arc_second):
         if self.axis_reversed:
@@ -982,10 +1488,24 @@ class AxisRotate(Axis, metaclass=abc.ABCMeta):
             # Don't issue a move or log if the position hasn't changed.
             r = angle_arc_second
         else:
-            self._position_absolute += angle_arc_second
-            self._position_absolute = self.position_absolute_within_bounds(self._position_absolute)
-            r = self._move_abs_arc_second(self._position_absolute)
-            self._update_position_absolute()
+            r = self._move_to(self.position_absolute_within_bounds(self._position_absolute + angle_arc_second))
+        return r
+
+    @trace.traced('stage', _trace_move_name,
+                  lambda a: {'position_absolute_arc_second': a[1]})
+    def _move_to(self, position_absolute_arc_second):
+        # Moves to an absolute position already checked against the
+        # limits, eg by `Stage`.
+        positions, i = self._positions, self._position_index
+        if position_absolute_arc_second == positions[i]:
+            # Don't issue a move or log if the position hasn't changed.
+            return position_absolute_arc_second
+        positions[i] = position_absolute_arc_second
+        r = self._move_abs_arc_second(position_absolute_arc_second)
+        self._update_position_absolute()
+
+        if self._logger:
+            self._logger.log()
 
         return r
 
@@ -1003,10 +1523,10 @@ class AxisRotate(Axis, metaclass=abc.ABCMeta):
         Returns:
             float: The absolute position passed in.
         '''
-        if position_absolute < self.get_position_absolute_min_arc_second():
+        if position_absolute < self._position_absolute_min_arc_second:
             raise ValueError('%s-axis target movement `%.3f` [degree] is too small.' \
                              % (self.name, position_absolute/3600.))
-        if position_absolute > self.get_position_absolute_max_arc_second():
+        if position_absolute > self._position_absolute_max_arc_second:
             raise ValueError('%s-axis target movement `%.3f` [degree] is too large.' \
                              % (self.name, position_absolute/3600.))
         return position_absolute
@@ -1051,24 +1571,49 @@ class AxisRotate(Axis, metaclass=abc.ABCMeta):
         '''
         return self._move_rel(angle_degree * 3600.) / 3600.
 
-    def get_current_position_arc_second(self):
+    def move_abs_degree_async(self, angle_from_home_degree):
+        '''
+        Non-blocking version of `move_abs_degree`.
+
+        Returns:
+            concurrent.futures.Future: The future position of the
+                axis in [degree] after the movement.
+        '''
+        return self.submit(self.move_abs_degree, angle_from_home_degree)
+
+    def move_rel_degree_async(self, angle_degree):
+        '''
+        Non-blocking version of `move_rel_degree`.
+
+        Returns:
+            concurrent.futures.Future: The future position of the
+                axis in [degree] after the movement.
+        '''
+        return self.submit(self.move_rel_degree, angle_degree)
+
+    def get_current_position_arc_second(self, cached=False):
         '''
         Gets the current position of the axis in [arc second].
 
+        Args:
+            cached (bool): If `True`, return the cached position
+                unless it is stale (see `set_position_cache`)
+                rather than querying the hardware.
+
         Returns:
             float: The current position of the axis (relative
                 to home) in [arc second].
         '''
-        pos_abs_arc_second = self._get_current_position()
+        pos_abs_arc_second = self._get_position_absolute(cached)
         if self.axis_reversed:
             pos_abs_arc_second = self._position_absolute_max_arc_second - pos_abs_arc_second
         return pos_abs_arc_second
 
-    def get_current_position_degree(self):
+    def get_current_position_degree(self, cached=False):
         '''
         Convenience function for `get_current_position_arc_second` in [degree].
         '''
-        return self.get_current_position_arc_second() / 3600.
+        return self.get_current_position_arc_second(cached) / 3600.
 
     def get_absolute_position_start_arc_second(self):
         '''
@@ -1130,6 +1675,8 @@ class AxisX(AxisLinear, metaclass=abc.ABCMeta):
     Attributes:
         name (str): The name of the axis, \'x\'.
     '''
+    __slots__ = ()
+
     def __init__(self, reverse_axis=False, logger=None, update_position_absolute=100):
         self.name = 'x'
         super().__init__(reverse_axis, logger, update_position_absolute)
@@ -1143,6 +1690,8 @@ class AxisY(AxisLinear, metaclass=abc.ABCMeta):
     Attributes:
         name (str): The name of the axis, \'y\'.
     '''
+    __slots__ = ()
+
     def __init__(self, reverse_axis=False, logger=None, update_position_absolute=100):
         self.name = 'y'
         super().__init__(reverse_axis, logger, update_position_absolute)
@@ -1156,6 +1705,8 @@ class AxisZ(AxisLinear, metaclass=abc.ABCMeta):
     Attributes:
         name (str): The name of the axis, \'z\'.
     '''
+    __slots__ = ()
+
     def __init__(self, reverse_axis=False, logger=None, update_position_absolute=100):
         self.name = 'z'
         super().__init__(reverse_axis, logger, update_position_absolute)
@@ -1169,6 +1720,8 @@ class AxisRoll(AxisRotate, metaclass=abc.ABCMeta):
     Attributes:
         name (str): The name of the axis, \'roll\'.
     '''
+    __slots__ = ()
+
     def __init__(self, reverse_axis=False, logger=None, update_position_absolute=100):
         self.name = 'roll'
         super().__init__(reverse_axis, logger, update_position_absolute)
@@ -1182,6 +1735,8 @@ class AxisYaw(AxisRotate, metaclass=abc.ABCMeta):
     Attributes:
         name (str): The name of the axis, \'yaw\'.
     '''
+    __slots__ = ()
+
     def __init__(self, reverse_axis=False, logger=None, update_position_absolute=100):
         self.name = 'pitch'
         super().__init__(reverse_axis, logger, update_position_absolute)
@@ -1195,6 +1750,8 @@ class AxisPitch(AxisRotate, metaclass=abc.ABCMeta):
     Attributes:
         name (str): The name of the axis, \'pitch\'.
     '''
+    __slots__ = ()
+
     def __init__(self, reverse_axis=False, logger=None, update_position_absolute=100):
         self.name = 'yaw'
         super().__init__(reverse_axis, logger, update_position_absolute)
@@ -1234,16 +1791,89 @@ class AxisChip(object):
         c = self._get_xyz_rel_move_um(rel_move_nm/1000.)
         return tuple(v*1000. for v in c)
 
+    def get_path_um(self, distances_rel_um, start_um=None):
+        '''
+        The (x,y,z) positions of points along the axis.
+
+        Args:
+            distances_rel_um (np.array): The distances in [um] of
+                the points along the axis from `start_um`.
+            start_um (tuple(float, float, float), None): The
+                (x,y,z) [um] to measure from.  If `None`, the
+                current position.
+
+        Returns:
+            np.array: The `(points, 3)` positions of the x, y and
+                z axes in [um].
+        '''
+        if start_um is None:
+            start_um = [axis.get_current_position_um(cached=True)
+                        for axis in (self.x_axis, self.y_axis, self.z_axis)]
+        distances_rel_um = np.asarray(distances_rel_um, dtype=float)
+        return np.asarray(start_um, dtype=float) + distances_rel_um[..., None]*self._v
+
+    def validate_path_um(self, distances_rel_um, start_um=None, clip=False):
+        '''
+        Checks points along the axis against the limits of the x,
+        y and z axes.  See `trajectory.validate`.
+
+        Returns:
+            np.array: The `(points, 3)` positions of the x, y and
+                z axes in [um], clipped if `clip`.
+        '''
+        return trajectory.validate((self.x_axis, self.y_axis, self.z_axis),
+                                   self.get_path_um(distances_rel_um, start_um), clip)
+
+    def _get_move_groups(self, x, y, z, z_rel):
+        # The x, y and z moves as `move_many` groups: z retracts
+        # (negative) before x and y move, and approaches after.
+        xy = {self.x_axis: x, self.y_axis: y}
+        if z_rel < 0.:
+            return [{self.z_axis: z}, xy]
+        return [xy, {self.z_axis: z}]
+
     def move_rel_um(self, distance_rel_um):
         x_rel, y_rel, z_rel = self._get_xyz_rel_move_um(distance_rel_um)
-        if z_rel < 0.:
-            z_rel = self.z_axis.move_rel_um(z_rel)
-            x_rel = self.x_axis.move_rel_um(x_rel)
-        else:
-            x_rel = self.x_axis.move_rel_um(x_rel)
-            z_rel = self.z_axis.move_rel_um(z_rel)
-        y_rel = self.y_axis.move_rel_um(y_rel)
-        return np.linalg.norm((x_rel, y_rel, z_rel))
+        r = move_many(self._get_move_groups(x_rel, y_rel, z_rel, z_rel), relative=True)
+        r = {**r[0], **r[1]}
+        return np.linalg.norm((r[self.x_axis], r[self.y_axis], r[self.z_axis]))
+
+    def traverse_um(self, distances_rel_um, func=None, args=[], kwargs={}, clip=False):
+        '''
+        Moves to each point of a line along the axis in turn,
+        calling `func(*args, **kwargs)` at each, say, to read a
+        power meter.
+
+        The (x,y,z) positions of the whole line are computed and
+        checked against the limits of the axes at once before the
+        first move.  At each point the x and y moves are made
+        concurrently, with z retracting before or approaching
+        after them.
+
+        Args:
+            distances_rel_um (np.array): The distances in [um] of
+                the points along the axis from the current position.
+            func(function, None): The function to call at each
+                point.
+            args(list): The arguments to pass to `func`.
+            kwargs(dict): The kwargs to pass to `func`.
+            clip(bool): If `True`, the line is clipped to the limits
+                of the axes rather than rejected.
+
+        Returns:
+            (np.array, list): The `(points, 3)` positions of the x,
+                y and z axes in [um], and the results of `func`.
+        '''
+        start_um = [axis.get_current_position_um(cached=True)
+                    for axis in (self.x_axis, self.y_axis, self.z_axis)]
+        path_um = self.validate_path_um(distances_rel_um, start_um, clip)
+        z_rels_um = np.diff(path_um[:, 2], prepend=start_um[2])
+
+        results = []
+        for (x, y, z), z_rel in zip(path_um.tolist(), z_rels_um.tolist()):
+            _move_groups(self._get_move_groups(x, y, z, z_rel))
+            results.append(func(*args, **kwargs) if func else None)
+        return path_um, results
 
     def move_rel_nm(self, distance_rel_nm):
         return self.move_rel_um(distance_rel_nm/1000.)
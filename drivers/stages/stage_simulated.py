@@ -0,0 +1,319 @@
+import threading
+import time
+from . import stage as st
+from . import path_planner as pp
+
+class SimulatedTransport(object):
+    '''
+    A simulated communication link, such as a serial port,
+    shared by the devices on it.
+
+    Every command holds the link for `latency_s` plus however
+    long the device takes to carry it out, so commands to devices
+    on the same link are serialised just as they would be on a
+    real bus.
+
+    Args:
+        latency_s (float): The round trip time in [s] of a
+            command.
+
+    Attributes:
+        commands (int): The number of commands sent.
+        busy_s (float): The total time in [s] the link has been
+            busy.
+    '''
+    def __init__(self, latency_s=0.):
+        self.latency_s = latency_s
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''
+        Resets the command and busy time counters.
+        '''
+        self.commands = 0
+        self.busy_s = 0.
+
+    def command(self, duration_s=0., measure=None):
+        '''
+        Sends a command, blocking until it has been carried out.
+
+        Args:
+            duration_s (float): The time in [s] the device takes
+                to carry out the command, on top of the latency.
+            measure (function, None): Called once the device has
+                carried out the command, before the reply comes
+                back, eg to take the reading of a power meter at
+                the end of its integration time.
+
+        Returns:
+            The result of `measure`, if given.
+        '''
+        with self._lock:
+            if duration_s > 0.:
+                time.sleep(duration_s)
+            r = measure() if measure else None
+            if self.latency_s > 0.:
+                time.sleep(self.latency_s)
+            self.commands += 1
+            self.busy_s += self.latency_s + duration_s
+        return r
+
+class _SimulatedAxisLinear(st.AxisLinear):
+    '''
+    Implements the hardware side of `AxisLinear` for the
+    simulated axes.
+
+    Moves take the time given by a `path_planner.AxisCostModel`
+    of the axis.  Constant velocity moves are modelled without
+    acceleration.
+
+    The axis can have backlash: the load (what the power meter
+    sees) lags the motor (what the axis reports) by up to half the
+    backlash either way, depending on the direction the motor
+    last moved in.
+    '''
+    __slots__ = ('transport', 'cost_model', 'moves', '_min_nm', '_max_nm', '_hw_position_nm',
+                 '_hw_backlash_nm', '_hw_load_nm', '_velocity_nm_s', '_velocity_t_0')
+
+    def __init__(self, transport, position_um=0., min_um=0., max_um=500.,
+                 speed_um_s=1000., acceleration_um_s2=None, reverse_axis=False,
+                 logger=None, update_position_absolute=100, backlash_um=0.):
+        self.transport = transport
+        self.cost_model = pp.AxisCostModel(speed_um_s, acceleration_um_s2)
+        self._min_nm = min_um * 1.e3
+        self._max_nm = max_um * 1.e3
+        self._hw_position_nm = position_um * 1.e3
+        self._hw_backlash_nm = backlash_um * 1.e3
+        self._hw_load_nm = self._hw_position_nm
+        self._velocity_nm_s = 0.
+        self._velocity_t_0 = None
+        self.moves = 0
+        super().__init__(reverse_axis, logger, update_position_absolute)
+
+    def _simulated_position_nm(self):
+        if self._velocity_t_0 is None:
+            return self._hw_position_nm
+        t = time.monotonic() - self._velocity_t_0
+        position_nm = self._hw_position_nm + self._velocity_nm_s*t
+        return min(max(position_nm, self._min_nm), self._max_nm)
+
+    def _simulated_load_nm(self):
+        # Moves are monotonic, so the load ends up wherever the
+        # motor last pushed it to.
+        h = 0.5 * self._hw_backlash_nm
+        position_nm = self._simulated_position_nm()
+        return min(max(self._hw_load_nm, position_nm - h), position_nm + h)
+
+    def simulated_position_um(self):
+        '''
+        The true position of the load on the axis in [um],
+        including during constant velocity moves.
+        '''
+        return self._simulated_load_nm() / 1.e3
+
+    def _get_transport(self):
+        return self.transport
+
+    def _move_abs_nm(self, distance_from_home_nm):
+        distance_um = (distance_from_home_nm - self._hw_position_nm) / 1.e3
+        self.transport.command(float(self.cost_model.move_time_s(distance_um)))
+        self._hw_position_nm = distance_from_home_nm
+        self._hw_load_nm = self._simulated_load_nm()
+        self.moves += 1
+        return distance_from_home_nm
+
+    def _get_current_position_nm(self):
+        self.transport.command()
+        return self._simulated_position_nm()
+
+    @property
+    def _position_absolute_min_nm(self):
+        return self._min_nm
+
+    @property
+    def _position_absolute_max_nm(self):
+        return self._max_nm
+
+    def _move_vel_nm_s(self, velocity_nm_s):
+        self.transport.command()
+        self._hw_position_nm = self._simulated_position_nm()
+        self._hw_load_nm = self._simulated_load_nm()
+        self._velocity_nm_s = velocity_nm_s
+        self._velocity_t_0 = time.monotonic()
+        self.moves += 1
+        return velocity_nm_s
+
+    def _stop(self):
+        self.transport.command()
+        self._hw_position_nm = self._simulated_position_nm()
+        self._hw_load_nm = self._simulated_load_nm()
+        self._velocity_t_0 = None
+        self._velocity_nm_s = 0.
+        return self._hw_position_nm
+
+    def _get_acceleration_nm_s2(self):
+        a = self.cost_model.acceleration_um_s2
+        return a * 1.e3 if a else None
+
+class _SimulatedAxisRotate(st.AxisRotate):
+    '''
+    Implements the hardware side of `AxisRotate` for the
+    simulated axes.  Speeds are in [degree/s].
+    '''
+    __slots__ = ('transport', 'cost_model', 'moves', '_min_arc_second', '_max_arc_second',
+                 '_hw_position_arc_second')
+
+    def __init__(self, transport, position_degree=0., min_degree=-5., max_degree=5.,
+                 speed_degree_s=10., acceleration_degree_s2=None, reverse_axis=False,
+                 logger=None, update_position_absolute=100):
+        self.transport = transport
+        self.cost_model = pp.AxisCostModel(speed_degree_s, acceleration_degree_s2)
+        self._min_arc_second = min_degree * 3600.
+        self._max_arc_second = max_degree * 3600.
+        self._hw_position_arc_second = position_degree * 3600.
+        self.moves = 0
+        super().__init__(reverse_axis, logger, update_position_absolute)
+
+    def simulated_position_degree(self):
+        '''
+        The true position of the axis in [degree].
+        '''
+        return self._hw_position_arc_second / 3600.
+
+    def _get_transport(self):
+        return self.transport
+
+    def _move_abs_arc_second(self, distance_from_home_arc_second):
+        distance_degree = (distance_from_home_arc_second - self._hw_position_arc_second) / 3600.
+        self.transport.command(float(self.cost_model.move_time_s(distance_degree)))
+        self._hw_position_arc_second = distance_from_home_arc_second
+        self.moves += 1
+        return distance_from_home_arc_second
+
+    def _get_current_position_arc_second(self):
+        self.transport.command()
+        return self._hw_position_arc_second
+
+    @property
+    def _position_absolute_min_arc_second(self):
+        return self._min_arc_second
+
+    @property
+    def _position_absolute_max_arc_second(self):
+        return self._max_arc_second
+
+class SimulatedAxisX(_SimulatedAxisLinear, st.AxisX):
+    __slots__ = ()
+
+class SimulatedAxisY(_SimulatedAxisLinear, st.AxisY):
+    __slots__ = ()
+
+class SimulatedAxisZ(_SimulatedAxisLinear, st.AxisZ):
+    __slots__ = ()
+
+class SimulatedAxisRoll(_SimulatedAxisRotate, st.AxisRoll):
+    __slots__ = ()
+
+class SimulatedAxisPitch(_SimulatedAxisRotate, st.AxisPitch):
+    __slots__ = ()
+
+class SimulatedAxisYaw(_SimulatedAxisRotate, st.AxisYaw):
+    __slots__ = ()
+
+class SimulatedStage(st.Stage):
+    '''
+    A simulated x, y, z stage whose axes share one transport,
+    as the axes of a Luminos stage share a serial port.
+
+    Args:
+        latency_s (float): The round trip time in [s] of a
+            command.
+        position_um (tuple(float, float, float)): The starting
+            (x, y, z) position in [um].
+        range_um (float): The travel of each axis in [um].
+        speed_um_s (float): The speed of each axis in [um/s].
+        acceleration_um_s2 (float, None): The acceleration of
+            each axis in [um/s^2].
+        rotate (bool): If `True`, also create roll, pitch and yaw
+            axes.
+        backlash_um (float): The backlash of each linear axis in
+            [um].
+    '''
+    def __init__(self, latency_s=0., position_um=(250., 250., 250.), range_um=500.,
+                 speed_um_s=1000., acceleration_um_s2=None, rotate=False, filename=None,
+                 backlash_um=0.):
+        self.transport = SimulatedTransport(latency_s)
+        axes = {}
+        for name, cls, position in zip(('x', 'y', 'z'),
+                                       (SimulatedAxisX, SimulatedAxisY, SimulatedAxisZ),
+                                       position_um):
+            axes[name] = cls(self.transport, position, 0., range_um, speed_um_s,
+                             acceleration_um_s2, backlash_um=backlash_um)
+        if rotate:
+            for name, cls in (('roll', SimulatedAxisRoll), ('pitch', SimulatedAxisPitch),
+                              ('yaw', SimulatedAxisYaw)):
+                axes[name] = cls(self.transport)
+        st.Stage.__init__(self, axes, filename=filename)
+
+    def get_moves(self):
+        '''
+        Returns:
+            int: The number of moves made by all the axes.
+        '''
+        return sum([axis.moves for axis in self.axes_physical.values() if axis])
+
+    def reset_counters(self):
+        for axis in self.axes_physical.values():
+            if axis:
+                axis.moves = 0
+        self.transport.reset()
+
+class SimulatedStages(st.Stages3):
+    '''
+    A simulated set of input, output and chip stages.
+
+    Args:
+        latency_s (float): The round trip time in [s] of a
+            command on each stage\'s transport.
+        speed_um_s (float): The speed of every axis in [um/s].
+        acceleration_um_s2 (float, None): The acceleration of
+            every axis in [um/s^2].
+        backlash_um (float): The backlash of every linear axis in
+            [um].
+    '''
+    def __init__(self, latency_s=0., speed_um_s=1000., acceleration_um_s2=None, filename=None,
+                 backlash_um=0.):
+        stages = {
+            'input': SimulatedStage(latency_s, speed_um_s=speed_um_s,
+                                    acceleration_um_s2=acceleration_um_s2,
+                                    backlash_um=backlash_um),
+            'output': SimulatedStage(latency_s, speed_um_s=speed_um_s,
+                                     acceleration_um_s2=acceleration_um_s2,
+                                     backlash_um=backlash_um),
+            'chip': SimulatedStage(latency_s, speed_um_s=speed_um_s,
+                                   acceleration_um_s2=acceleration_um_s2,
+                                   backlash_um=backlash_um),
+        }
+        st.Stages3.__init__(self, stages, filename)
+
+    def _stages(self):
+        return [self.input, self.output, self.chip]
+
+    def get_commands(self):
+        '''
+        Returns:
+            int: The number of commands sent to all the stages.
+        '''
+        return sum([s.transport.commands for s in self._stages()])
+
+    def get_moves(self):
+        '''
+        Returns:
+            int: The number of moves made by all the stages.
+        '''
+        return sum([s.get_moves() for s in self._stages()])
+
+    def reset_counters(self):
+        for s in self._stages():
+            s.reset_counters()
@@ -0,0 +1,239 @@
+import array
+import numpy as np
+from . import stage as st
+
+class StageState(object):
+    '''
+    The positions and limits of the axes of a stage, held in
+    arrays so whole coordinate vectors can be converted and
+    bounds-checked at once.
+
+    Absolute positions are relative to home and not reversed, in
+    [nm] for linear axes and [arc second] for rotational axes, as
+    the axes hold them.  Coordinates are in [um] and [degree] and
+    reversed for reversed axes, as the axes are moved.
+
+    The axes read and write their positions directly in the
+    memory behind `position`, so it is always the axes\' cached
+    positions.  The memory is an `array.array`, which the axes
+    index as quickly as a Python attribute, viewed by `position`
+    without copying.
+
+    Args:
+        axes (dict): The axes of the stage by name.  Axes that are
+            `None` are left out.
+
+    Attributes:
+        names (tuple(str)): The names of the axes, in the order of
+            the arrays.
+        axes (tuple(Axis)): The axes.
+        position (np.array): The absolute position of each axis.
+        minimum (np.array): The minimum absolute position of each
+            axis.
+        maximum (np.array): The maximum absolute position of each
+            axis.
+        reversed (np.array): Whether each axis is reversed.
+        scale (np.array): The absolute units per coordinate unit of
+            each axis, 1000 for linear and 3600 for rotational axes.
+    '''
+    __slots__ = ('names', 'axes', 'position', 'minimum', 'maximum', 'reversed', 'scale',
+                 '_buffer', '_index', '_selections')
+
+    def __init__(self, axes):
+        items = [(name, axis) for name, axis in axes.items() if axis]
+        self.names = tuple(name for name, _ in items)
+        self.axes = tuple(axis for _, axis in items)
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+        n = len(self.axes)
+        self._buffer = array.array('d', bytes(8*n))
+        self.position = np.frombuffer(self._buffer, dtype=float)
+        self.minimum = np.empty(n)
+        self.maximum = np.empty(n)
+        self.reversed = np.empty(n, dtype=bool)
+        self.scale = np.empty(n)
+        for i, axis in enumerate(self.axes):
+            if isinstance(axis, st.AxisLinear):
+                self.scale[i] = 1.e3
+            else:
+                self.scale[i] = 3600.
+            self._buffer[i] = axis._position_absolute
+            axis._bind_position(self._buffer, i)
+        self.refresh()
+
+    def refresh(self):
+        '''
+        Re-reads the limits and directions of the axes.
+        '''
+        for i, axis in enumerate(self.axes):
+            if isinstance(axis, st.AxisLinear):
+                self.minimum[i] = axis._position_absolute_min_nm
+                self.maximum[i] = axis._position_absolute_max_nm
+            else:
+                self.minimum[i] = axis._position_absolute_min_arc_second
+                self.maximum[i] = axis._position_absolute_max_arc_second
+            self.reversed[i] = axis.axis_reversed
+        self._selections = {}
+
+    def index(self, names=None):
+        '''
+        The indices in the arrays of axes.
+
+        Args:
+            names (list(str), None): The names of the axes.  If
+                `None`, all the axes.
+
+        Returns:
+            np.array: The indices.
+        '''
+        if names is None:
+            return np.arange(len(self.names))
+        try:
+            return np.array([self._index[name] for name in names], dtype=int)
+        except KeyError as e:
+            raise ValueError('The stage has no %s-axis.' % e.args[0])
+
+    def _select(self, names, native):
+        # The indices, limits and the linear map
+        # `position_absolute = coords*gain + offset` of some axes,
+        # cached as scans convert the same axes over and over.
+        key = (None if names is None else tuple(names), native)
+        try:
+            return self._selections[key]
+        except KeyError:
+            pass
+        idx = self.index(names)
+        gain = np.where(self.reversed[idx], -1., 1.)
+        if not native:
+            gain *= self.scale[idx]
+        offset = np.where(self.reversed[idx], self.maximum[idx], 0.)
+        # The same as floats, for single points, which are quicker
+        # converted in Python than through NumPy calls.
+        point = list(zip(idx.tolist(), gain.tolist(), offset.tolist(),
+                         self.minimum[idx].tolist(), self.maximum[idx].tolist()))
+        selection = (idx, gain, offset, self.minimum[idx], self.maximum[idx], point)
+        self._selections[key] = selection
+        return selection
+
+    def to_absolute(self, coords, names=None, native=False):
+        '''
+        Converts coordinates to absolute positions.
+
+        Args:
+            coords (np.array): The coordinates, with the last
+                dimension over the axes, eg `(points, axes)`.
+            names (list(str), None): The names of the axes of the
+                last dimension.  If `None`, all the axes.
+            native (bool): If `True`, the coordinates are in [nm]
+                or [arc second] rather than [um] or [degree].
+
+        Returns:
+            np.array: The absolute positions, of the same shape.
+        '''
+        _, gain, offset, _, _, _ = self._select(names, native)
+        return np.asarray(coords, dtype=float)*gain + offset
+
+    def from_absolute(self, position_absolute, names=None, native=False):
+        '''
+        Converts absolute positions to coordinates.  The inverse
+        of `to_absolute`.
+        '''
+        _, gain, offset, _, _, _ = self._select(names, native)
+        return (np.asarray(position_absolute, dtype=float) - offset) / gain
+
+    def within_bounds(self, position_absolute, names=None):
+        '''
+        Checks absolute positions against the axes\' limits.
+
+        Returns:
+            np.array: `True` where the position of each axis is
+                within its limits, of the same shape as
+                `position_absolute`.
+        '''
+        _, _, _, minimum, maximum, _ = self._select(names, True)
+        position_absolute = np.asarray(position_absolute, dtype=float)
+        return (minimum <= position_absolute) & (position_absolute <= maximum)
+
+    def check_bounds(self, position_absolute, names=None):
+        '''
+        Checks absolute positions against the axes\' limits.
+
+        Will throw a `ValueError` naming the first axis and position
+        out of bounds.
+
+        Returns:
+            np.array: The absolute positions passed in.
+        '''
+        within = self.within_bounds(position_absolute, names)
+        if not within.all():
+            idx = self.index(names)
+            position_absolute = np.asarray(position_absolute, dtype=float)
+            bad = tuple(np.argwhere(~within)[0])
+            self._raise_out_of_bounds(idx[bad[-1]], position_absolute[bad])
+        return position_absolute
+
+    def _raise_out_of_bounds(self, i, position_absolute):
+        size = 'small' if position_absolute < self.minimum[i] else 'large'
+        unit = 'um' if self.scale[i] == 1.e3 else 'degree'
+        raise ValueError('%s-axis target movement `%.3f` [%s] is too %s.' \
+                         % (self.names[i], position_absolute/self.scale[i], unit, size))
+
+    def to_absolute_point(self, coords, names=None, native=False):
+        '''
+        Converts a single point to absolute positions and checks
+        them, like `to_absolute` and `check_bounds`.
+
+        Args:
+            coords (list(float)): The coordinate of each axis.
+
+        Returns:
+            list(float): The absolute positions.
+        '''
+        position_absolute = []
+        for c, (i, gain, offset, minimum, maximum) in zip(coords, self._select(names, native)[5]):
+            p = c*gain + offset
+            if not minimum <= p <= maximum:
+                self._raise_out_of_bounds(i, p)
+            position_absolute.append(p)
+        return position_absolute
+
+    def get_position_point(self, names=None, native=False):
+        '''
+        Like `get_position`, as a list of floats.
+        '''
+        buffer = self._buffer
+        return [(buffer[i] - offset) / gain
+                for i, gain, offset, _, _ in self._select(names, native)[5]]
+
+    def clip(self, position_absolute, names=None):
+        '''
+        Clips absolute positions to the axes\' limits.
+
+        Returns:
+            np.array: The clipped absolute positions.
+        '''
+        _, _, _, minimum, maximum, _ = self._select(names, True)
+        return np.clip(position_absolute, minimum, maximum)
+
+    def get_view(self):
+        '''
+        The absolute positions of the axes, without copying.
+
+        Returns:
+            np.array: A read-only view of `position`, which follows
+                the axes as they move.
+        '''
+        view = self.position.view()
+        view.flags.writeable = False
+        return view
+
+    def get_position(self, names=None, native=False):
+        '''
+        The (cached) coordinates of the axes.
+
+        Returns:
+            np.array: The coordinates in [um] or [degree], or in
+                [nm] or [arc second] if `native`.
+        '''
+        idx, gain, offset, _, _, _ = self._select(names, native)
+        return (self.position[idx] - offset) / gain
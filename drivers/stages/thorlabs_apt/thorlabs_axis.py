@@ -1,6 +1,7 @@
 import time
 from serial.tools.list_ports import comports
 from .. import stage as st
+from ...utils import latency
 
 import os
 dir_path = os.path.dirname(os.path.realpath(__file__))
@@ -8,6 +9,12 @@ import sys
 sys.path.append(dir_path)
 from thorpy.comm.port import Port
 
+# thorpy is imported top-level, so its port is instrumented here.
+Port.send_message = latency.instrument(
+    'thorpy.send_message', lambda args, kwargs, result: args[1].name)(Port.send_message)
+Port._recv_message = latency.instrument(
+    'thorpy.recv_message', lambda args, kwargs, result: result.name if result else None)(Port._recv_message)
+
 # Stages print weird response if constructed
 # in the class, so constructing them globally.
 def create_stages(serial_number):
@@ -32,6 +39,10 @@ def create_stages(serial_number):
     return axis
 
 class ThorlabsAptAxis(st.Axis):
+    # `axis` is a slot of the subclasses, as only one base of a class
+    # can add slots.
+    __slots__ = ()
+
     def __init__(self, serial_number, reverse_axis=False, logger=None,
                  update_position_absolute=100):
         self.axis = create_stages(serial_number)
@@ -39,6 +50,8 @@ class ThorlabsAptAxis(st.Axis):
         super().__init__(reverse_axis, logger, update_position_absolute)
 
 class ThorlabsAptAxisLinear(ThorlabsAptAxis, st.AxisLinear):
+    __slots__ = ('axis',)
+
     def __init__(self, serial_number, velocity_mm_s=2.5, acceleration_mm_s_s=5,
                  reverse_axis=False, logger=None,
                  update_position_absolute=100):
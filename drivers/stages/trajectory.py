@@ -0,0 +1,106 @@
+import numpy as np
+from . import stage as st
+
+def _axis_map(axis):
+    # The map `position_absolute = coord*gain + offset` and the
+    # absolute limits of an axis, from its stage's `StageState`
+    # if it has one.
+    if axis._stage is not None:
+        state = axis._stage.state
+        _, gain, offset, minimum, maximum = \
+            state._select([state.names[axis._position_index]], False)[5][0]
+        return gain, offset, minimum, maximum
+    if issubclass(type(axis), st.AxisLinear):
+        scale = 1.e3
+        minimum = axis._position_absolute_min_nm
+        maximum = axis._position_absolute_max_nm
+    else:
+        scale = 3600.
+        minimum = axis._position_absolute_min_arc_second
+        maximum = axis._position_absolute_max_arc_second
+    if axis.axis_reversed:
+        return -scale, maximum, minimum, maximum
+    return scale, 0., minimum, maximum
+
+def _unit(axis):
+    return 'um' if issubclass(type(axis), st.AxisLinear) else 'degree'
+
+def validate(axes, coords, clip=False):
+    '''
+    Checks a whole path against the limits of the axes, in one
+    pass, before any of it is moved.
+
+    The coordinates are those the axes are moved to, in [um]
+    for linear axes and [degree] for rotational axes, so the
+    reversal of reversed axes is accounted for.
+
+    Args:
+        axes (list(Axis)): The axis of each coordinate.
+        coords (np.array): The path, with the last dimension
+            over `axes`, eg `(points, axes)`.
+        clip (bool): If `True`, the path is clipped to the limits
+            of the axes rather than rejected.
+
+    Returns:
+        np.array: The path, clipped if `clip`.
+
+    Raises:
+        ValueError: If the path leaves the limits of an axis and
+            `clip` is `False`.  The first point out of bounds is
+            named.
+    '''
+    coords = np.asarray(coords, dtype=float)
+    assert coords.shape[-1] == len(axes), 'Path and axes have different dimensions.'
+    gain, offset, minimum, maximum = np.array([_axis_map(axis) for axis in axes]).T
+    position_absolute = coords*gain + offset
+
+    if clip:
+        position_absolute = np.clip(position_absolute, minimum, maximum)
+        return (position_absolute - offset) / gain
+
+    within = (minimum <= position_absolute) & (position_absolute <= maximum)
+    if not within.all():
+        point, i = np.argwhere(~within.reshape(-1, len(axes)))[0]
+        p = position_absolute.reshape(-1, len(axes))[point, i]
+        # Reversed axes are too small at their absolute maximum.
+        size = 'small' if (p < minimum[i]) != (gain[i] < 0.) else 'large'
+        raise ValueError('Point %i of the path: %s-axis target movement `%.3f` [%s] is too %s.' \
+                         % (point, axes[i].name, coords.reshape(-1, len(axes))[point, i],
+                            _unit(axes[i]), size))
+    return coords
+
+def validate_moves(groups, relative=False):
+    '''
+    Checks a sequence of moves, as taken by `stage.move_many`,
+    against the limits of the axes before any of them is made.
+
+    Relative moves are accumulated from the (cached) position of
+    each axis, so every intermediate position is checked.
+
+    Args:
+        groups (list(dict)): Groups of moves, each mapping an
+            `Axis` to its position in [um] or [degree].  `None`
+            keys are ignored.
+        relative (bool): If `True`, the moves are relative.
+
+    Raises:
+        ValueError: If any move would leave the limits of its
+            axis.
+    '''
+    positions = {}
+    for group in groups:
+        for axis, position in group.items():
+            if not axis:
+                continue
+            if relative:
+                if axis not in positions:
+                    positions[axis] = [_get_position(axis)]
+                position += positions[axis][-1]
+            positions.setdefault(axis, []).append(position)
+    for axis, path in positions.items():
+        validate([axis], np.array(path)[:, None])
+
+def _get_position(axis):
+    if issubclass(type(axis), st.AxisLinear):
+        return axis.get_current_position_um(cached=True)
+    return axis.get_current_position_degree(cached=True)
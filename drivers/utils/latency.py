@@ -0,0 +1,220 @@
+'''
+Opt-in latency instrumentation of the instrument transports.
+
+The commands sent over the transports (the Zaber binary serial
+port, the Thorlabs APT port, GPIB/serial to the Agilent
+lightwave mainframe and USBTMC) are timed, once enabled, and
+histogrammed per transport and command type, so a slow
+alignment can be put down to serial round trips, motion, GPIB or
+power meter integration:
+
+    from drivers.utils import latency
+    latency.enable()
+    ...
+    print(latency.format_stats())
+
+When disabled, which is the default, an instrumented call costs
+a single flag check.
+'''
+import bisect
+import functools
+import threading
+import time
+import numpy as np
+
+#: Edges of the histogram bins in [s], four per decade from 1us to
+#: 100s.  The first and last bins count the shorter and longer
+#: calls.
+bin_edges_s = np.logspace(-6, 2, 33)
+
+_bin_edges_s = bin_edges_s.tolist()
+_enabled = False
+_lock = threading.Lock()
+_records = {}
+
+def enable(enabled=True):
+    '''
+    Enables or disables the timing of instrumented calls.
+
+    Args:
+        enabled (bool): `True` to time calls, `False` to stop.
+    '''
+    global _enabled
+    _enabled = bool(enabled)
+
+def disable():
+    '''
+    Stops the timing of instrumented calls.  The statistics so far
+    are kept.
+    '''
+    enable(False)
+
+def is_enabled():
+    '''
+    Returns:
+        bool: Whether instrumented calls are timed.
+    '''
+    return _enabled
+
+def record(category, command, duration_s, failed=False):
+    '''
+    Adds a timed call to the statistics.
+
+    Args:
+        category (str): The transport, eg `'zaber.read'`.
+        command: The command type, eg a command number or an SCPI
+            header.
+        duration_s (float): The duration of the call in [s].
+        failed (bool): Whether the call raised.
+    '''
+    key = (category, command)
+    b = bisect.bisect_right(_bin_edges_s, duration_s)
+    with _lock:
+        r = _records.get(key)
+        if r is None:
+            r = _records[key] = [0, 0, 0., duration_s, duration_s, [0]*(len(_bin_edges_s)+1)]
+        r[0] += 1
+        r[1] += failed
+        r[2] += duration_s
+        if duration_s < r[3]:
+            r[3] = duration_s
+        if duration_s > r[4]:
+            r[4] = duration_s
+        r[5][b] += 1
+
+def instrument(category, command=None):
+    '''
+    Decorates a transport method so its calls are timed while the
+    instrumentation is enabled.
+
+    Args:
+        category (str): The transport, eg `'zaber.read'`.
+        command (function): Gets the command type of a call from
+            `(args, kwargs, result)`, where `args` includes `self`
+            and `result` is `None` if the call raised.  A successful
+            call whose command type is `None` is not recorded, eg
+            polls that read nothing.  If `None`, the calls are
+            recorded under the method name.
+
+    Returns:
+        function: The decorator.
+    '''
+    def decorator(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                duration_s = time.perf_counter() - t0
+                c = command(args, kwargs, None) if command else None
+                record(category, name if c is None else c, duration_s, True)
+                raise
+            duration_s = time.perf_counter() - t0
+            c = command(args, kwargs, result) if command else name
+            if c is not None:
+                record(category, c, duration_s)
+            return result
+        return wrapper
+    return decorator
+
+def scpi_header(cmd):
+    '''
+    The header of an SCPI command, eg `'READ?'` of
+    `'READ? 1,2'`, used as its command type.
+
+    Args:
+        cmd (str, bytes): The command.
+
+    Returns:
+        str: The header.
+    '''
+    if isinstance(cmd, (bytes, bytearray)):
+        cmd = cmd.decode('ascii', 'replace')
+    cmd = cmd.strip()
+    return cmd.split(None, 1)[0] if cmd else ''
+
+def stats(reset=False):
+    '''
+    A snapshot of the statistics of the timed calls.
+
+    Args:
+        reset (bool): If `True`, the statistics are also cleared,
+            atomically with the snapshot.
+
+    Returns:
+        dict: By `(category, command)`, a dict of `count`,
+            `failed`, `total_s`, `mean_s`, `min_s`, `max_s` and
+            `histogram`, the counts in the bins of `bin_edges_s`
+            (`len(bin_edges_s)+1` bins).
+    '''
+    with _lock:
+        records = {key: (r[0], r[1], r[2], r[3], r[4], list(r[5])) for key, r in _records.items()}
+        if reset:
+            _records.clear()
+    snapshot = {}
+    for key, (count, failed, total_s, min_s, max_s, histogram) in records.items():
+        snapshot[key] = {
+            'count': count,
+            'failed': failed,
+            'total_s': total_s,
+            'mean_s': total_s / count,
+            'min_s': min_s,
+            'max_s': max_s,
+            'histogram': np.array(histogram),
+        }
+    return snapshot
+
+def reset():
+    '''
+    Clears the statistics.
+    '''
+    with _lock:
+        _records.clear()
+
+def percentile_s(entry, q):
+    '''
+    An estimate of a percentile of the durations from a
+    histogram, to the resolution of its bins.
+
+    Args:
+        entry (dict): An entry of `stats()`.
+        q (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The upper edge of the bin holding the percentile,
+            clamped to the entry\'s minimum and maximum, in [s].
+    '''
+    cumulative = np.cumsum(entry['histogram'])
+    b = int(np.searchsorted(cumulative, q/100.*cumulative[-1]))
+    upper = bin_edges_s[b] if b < len(bin_edges_s) else entry['max_s']
+    return min(max(upper, entry['min_s']), entry['max_s'])
+
+def format_stats(snapshot=None):
+    '''
+    Formats the statistics as a table, the transports with the
+    most total time first.
+
+    Args:
+        snapshot (dict): A snapshot from `stats()`.  If `None`, a
+            snapshot is taken.
+
+    Returns:
+        str: The table.
+    '''
+    if snapshot is None:
+        snapshot = stats()
+    lines = ['%-24s %-16s %8s %6s %10s %10s %10s %10s %10s' % \
+             ('category', 'command', 'count', 'failed', 'total[s]',
+              'mean[ms]', 'p50[ms]', 'p99[ms]', 'max[ms]')]
+    items = sorted(snapshot.items(), key=lambda item: -item[1]['total_s'])
+    for (category, command), e in items:
+        lines.append('%-24s %-16s %8i %6i %10.3f %10.3f %10.3f %10.3f %10.3f' % \
+                     (category, command, e['count'], e['failed'], e['total_s'],
+                      e['mean_s']*1.e3, percentile_s(e, 50.)*1.e3,
+                      percentile_s(e, 99.)*1.e3, e['max_s']*1.e3))
+    return '\n'.join(lines)
@@ -0,0 +1,218 @@
+'''
+Timeline tracing of hardware activity, exported as Chrome
+trace-event JSON to be viewed in Perfetto (ui.perfetto.dev) or
+`chrome://tracing`.
+
+Methods decorated with `traced` record a begin and an end event,
+with the thread they ran on, while tracing is enabled, so axis
+moves, power meter reads, laser commands and scan phases can be
+seen side by side and it is clear where concurrency is lost:
+
+    from drivers.utils import trace
+    with trace.recording('scan.json'):
+        scan.scan()
+
+Tracing costs nothing when disabled: the decorated methods are
+only swapped for their tracing wrappers by `enable`, and swapped
+back by `disable`.
+'''
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+_enabled = False
+_sites = []
+_events = []
+_thread_names = {}
+_t0 = time.perf_counter()
+
+class _Traced(object):
+    # Stands in for a decorated method until its class is created,
+    # then registers it and puts the plain method in its place.
+    def __init__(self, func, cat, name, args):
+        self.func = func
+        self.wrapper = _make_wrapper(func, cat, name, args)
+
+    def __set_name__(self, owner, attr):
+        _sites.append((owner, attr, self.func, self.wrapper))
+        setattr(owner, attr, self.wrapper if _enabled else self.func)
+
+def _make_wrapper(func, cat, name, args):
+    if name is None:
+        name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*a, **kwargs):
+        n = name(a) if callable(name) else name
+        begin(n, cat, args(a) if args else None)
+        try:
+            return func(*a, **kwargs)
+        finally:
+            end(n, cat)
+    return wrapper
+
+def traced(cat, name=None, args=None):
+    '''
+    Decorates a method so its calls are traced while tracing is
+    enabled.
+
+    Args:
+        cat (str): The category of the events, eg `'stage'`.
+        name (str, function): The name of the events, or a
+            function getting it from the positional arguments
+            (including `self`).  If `None`, the qualified name of
+            the method.
+        args (function): Gets a dict of arguments to show with
+            the begin event from the positional arguments.
+
+    Returns:
+        function: The decorator.
+    '''
+    def decorator(func):
+        return _Traced(func, cat, name, args)
+    return decorator
+
+def timestamp_us():
+    '''
+    The time in [us] on the clock of the events.
+    '''
+    return (time.perf_counter() - _t0) * 1.e6
+
+def _tid():
+    tid = threading.get_ident()
+    if tid not in _thread_names:
+        _thread_names[tid] = threading.current_thread().name
+    return tid
+
+def begin(name, cat, args=None):
+    '''
+    Records the beginning of an event on the calling thread.
+
+    Args:
+        name (str): The name of the event.
+        cat (str): The category of the event.
+        args (dict): Arguments to show with the event.
+    '''
+    event = {'name': name, 'cat': cat, 'ph': 'B', 'ts': timestamp_us(), 'tid': _tid()}
+    if args:
+        event['args'] = args
+    _events.append(event)
+
+def end(name, cat):
+    '''
+    Records the end of an event begun on the calling thread.
+    '''
+    _events.append({'name': name, 'cat': cat, 'ph': 'E', 'ts': timestamp_us(), 'tid': _tid()})
+
+@contextlib.contextmanager
+def span(name, cat, args=None):
+    '''
+    Traces a block of code, if tracing is enabled.
+
+    Args:
+        name (str): The name of the event.
+        cat (str): The category of the event.
+        args (dict): Arguments to show with the event.
+    '''
+    if not _enabled:
+        yield
+        return
+    begin(name, cat, args)
+    try:
+        yield
+    finally:
+        end(name, cat)
+
+def enable(enabled=True):
+    '''
+    Enables or disables tracing.
+
+    Args:
+        enabled (bool): `True` to trace, `False` to stop.  The
+            events so far are kept.
+    '''
+    global _enabled
+    _enabled = bool(enabled)
+    for owner, attr, func, wrapper in _sites:
+        setattr(owner, attr, wrapper if _enabled else func)
+
+def disable():
+    '''
+    Stops tracing.
+    '''
+    enable(False)
+
+def is_enabled():
+    '''
+    Returns:
+        bool: Whether tracing is enabled.
+    '''
+    return _enabled
+
+def clear(start=0):
+    '''
+    Discards the events recorded.
+
+    Args:
+        start (int): The first event to discard, from `count`.
+    '''
+    del _events[start:]
+
+def count():
+    '''
+    Returns:
+        int: The number of events recorded, to mark where a
+            section of the trace begins.
+    '''
+    return len(_events)
+
+def get_events(start=0):
+    '''
+    The events recorded, in Chrome trace-event format, with
+    thread name metadata.
+
+    Args:
+        start (int): The first event, from `count`.
+
+    Returns:
+        list(dict): The events.
+    '''
+    pid = os.getpid()
+    events = [dict(event, pid=pid) for event in _events[start:]]
+    for tid, thread_name in list(_thread_names.items()):
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                       'args': {'name': thread_name}})
+    return events
+
+def save(filename):
+    '''
+    Saves the events recorded as a Chrome trace-event JSON file.
+
+    Args:
+        filename (str): The file to write.
+    '''
+    with open(filename, 'w') as fs:
+        json.dump({'traceEvents': get_events(), 'displayTimeUnit': 'ms'}, fs)
+
+@contextlib.contextmanager
+def recording(filename=None):
+    '''
+    Traces a block of code from a clear trace, saving the events
+    afterwards.
+
+    Args:
+        filename (str): The file to save the trace to.  If `None`,
+            the trace is not saved, but can be read with
+            `get_events`.
+    '''
+    clear()
+    enable()
+    try:
+        yield
+    finally:
+        disable()
+        if filename:
+            save(filename)